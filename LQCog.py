@@ -3,6 +3,8 @@ import discord
 from discord.ext import commands
 import asyncio
 import time
+from messagepipeline import get_pipeline, MessageContext, MODERATE, RESPOND
+from background import spawn
 
 class LQCog(commands.Cog):
     def __init__(self, bot):
@@ -38,7 +40,7 @@ class LQCog(commands.Cog):
                 # Adjust reputation silently
                 rep_cog = self.bot.get_cog("ReputationCog")
                 if rep_cog:
-                    rep_cog.adjust_rep(member.id, ctx.guild.id, -5)
+                    await rep_cog.adjust_rep(member.id, ctx.guild.id, -5)
 
                 # Log reason in log channel
                 log_channel = self.bot.get_channel(self.log_channel_id)
@@ -74,42 +76,50 @@ class LQCog(commands.Cog):
                 
         await ctx.message.add_reaction('\U0001f607')
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore bots
-        if message.author.bot:
-            return
+    def cog_load(self):
+        pipeline = get_pipeline(self.bot)
+        pipeline.add_stage("lq_log_channel", self.clean_log_channel, MODERATE, owner=self)
+        pipeline.add_stage("lq_query", self.answer_lq_query, RESPOND, owner=self)
 
-        # Delete user messages in log channel
-        if message.channel.id == self.log_channel_id:
-            await asyncio.sleep(3)
-            await message.delete()
-            return
+    def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
+
+    async def clean_log_channel(self, ctx: MessageContext):
+        # Delete user messages in log channel. The delete is only scheduled and the
+        # message still goes through the other cogs' stages, as it did before.
+        if ctx.channel_id == self.log_channel_id:
+            await ctx.message.delete(delay=3)
 
+    async def answer_lq_query(self, ctx: MessageContext):
+        if ctx.channel_id == self.log_channel_id:
+            return
         queries = ["what's lq", "what is lq", "whats lq", "what does lq mean"]
-        if message.content.lower().strip() in queries:
-            if self.last_use.get(message.author.id, 0) + 60 > time.time():
+        if ctx.lower in queries:
+            if self.last_use.get(ctx.author_id, 0) + 60 > time.time():
                 return
-            self.last_use[message.author.id] = time.time()
-
-            guild = message.guild
-            role = discord.utils.get(guild.roles, name="low quality")
-            lunatic = discord.utils.get(guild.roles, name="lunatic")
-
-            try:
-                if lunatic and lunatic in message.author.roles:
-                    await message.author.remove_roles(lunatic)
-
-                await message.channel.send(f"Let me show you, {message.author.mention}.")
-                await asyncio.sleep(5)
-                await message.author.add_roles(role)
-                await asyncio.sleep(30)
-                await message.author.remove_roles(role)
-
-                if lunatic:
-                    await message.author.add_roles(lunatic)
-            except discord.errors.Forbidden:
-                pass
+            self.last_use[ctx.author_id] = time.time()
+            # The demonstration takes over half a minute, so it runs outside the pipeline
+            spawn(self.bot, self.show_lq(ctx.message), "show_lq")
+
+    async def show_lq(self, message: discord.Message):
+        guild = message.guild
+        role = discord.utils.get(guild.roles, name="low quality")
+        lunatic = discord.utils.get(guild.roles, name="lunatic")
+
+        try:
+            if lunatic and lunatic in message.author.roles:
+                await message.author.remove_roles(lunatic)
+
+            await message.channel.send(f"Let me show you, {message.author.mention}.")
+            await asyncio.sleep(5)
+            await message.author.add_roles(role)
+            await asyncio.sleep(30)
+            await message.author.remove_roles(role)
+
+            if lunatic:
+                await message.author.add_roles(lunatic)
+        except discord.errors.Forbidden:
+            pass
 
 async def setup(bot):
     await bot.add_cog(LQCog(bot))
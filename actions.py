@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import discord
+
+from metrics import current_source
+
+# Priority classes: lower runs first when a route has more work than tokens
+MODERATION = 0   # Bans, kicks and deletes that protect the server
+INTERACTIVE = 1  # Direct results of a user's command or action
+BACKGROUND = 2   # Periodic sync and bulk jobs
+PRIORITY_NAMES = {MODERATION: "moderation", INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# (requests, per seconds) for each kind of route. Routes are scoped to a guild or channel
+# like Discord's own buckets; discord.py still handles any 429 that slips through.
+ROUTE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "member_edit": (10, 10.0),     # PATCH /guilds/{guild}/members/{member}
+    "member_roles": (10, 10.0),    # PUT/DELETE /guilds/{guild}/members/{member}/roles/{role}
+    "message_delete": (5, 5.0),    # DELETE /channels/{channel}/messages/{message}
+    "bulk_delete": (1, 1.0),       # POST /channels/{channel}/messages/bulk-delete
+    "dm": (5, 5.0),                # POST /users/@me/channels, then the message
+    "kick": (5, 5.0),              # DELETE /guilds/{guild}/members/{member}
+    "ban": (5, 5.0),               # PUT /guilds/{guild}/bans/{user}
+}
+GLOBAL_LIMIT = (50, 1.0)  # Discord's global per-bot limit
+BACKGROUND_RESERVE = 0.2  # Share of every bucket background work leaves for higher priorities
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, requests: int, per: float):
+        self.capacity = float(requests)
+        self.rate = requests / per
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, reserve: float = 0.0) -> float:
+        """Seconds until `cost` tokens can be taken while leaving `reserve` tokens behind."""
+        self._refill()
+        # Never ask for more than a full bucket, or small buckets (bulk delete holds 1) would never run
+        cost = min(cost, self.capacity)
+        reserve = min(reserve, self.capacity - cost)
+        needed = cost + reserve - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def take(self, cost: float):
+        self._refill()
+        self.tokens -= cost
+
+
+class Action:
+    __slots__ = ("priority", "seq", "factory", "cost", "coalesce_key", "futures", "queued_at", "source")
+
+    def __init__(self, priority: int, seq: int, factory: Callable[[], Awaitable], cost: float,
+                 coalesce_key: Optional[Hashable]):
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.cost = cost
+        self.coalesce_key = coalesce_key
+        self.futures: List[asyncio.Future] = []
+        self.queued_at = time.monotonic()
+        self.source = current_source.get()  # The cog that queued it, for REST attribution
+
+    def __lt__(self, other: "Action") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RouteStats:
+    __slots__ = ("executed", "coalesced", "errors", "max_wait")
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_wait = 0.0
+
+
+class ActionScheduler:
+    """Paces REST mutations from every cog through shared per-route token buckets.
+
+    Each route (e.g. ("member_edit", guild_id)) has a priority queue drained by its own
+    worker, so routes proceed in parallel while work on one route is ordered moderation >
+    interactive > background. Background actions never spend the last BACKGROUND_RESERVE
+    of a bucket, so bulk jobs run at the route's full steady rate without starving commands.
+    A queued action with the same coalesce key as a new one is replaced by it (latest wins)
+    and both callers get its result. Every submit returns a future that resolves to the
+    call's result or raises its exception.
+    """
+
+    def __init__(self):
+        self._queues: Dict[Tuple, List[Action]] = defaultdict(list)
+        self._buckets: Dict[Tuple, TokenBucket] = {}
+        self._workers: Dict[Tuple, asyncio.Task] = {}
+        self._queued: Dict[Hashable, Action] = {}
+        self._global = TokenBucket(*GLOBAL_LIMIT)
+        self._seq = itertools.count()
+        self.stats_by_kind: Dict[str, RouteStats] = defaultdict(RouteStats)
+
+    # -----------------
+    # Submission
+    # -----------------
+    def submit(self, route: Tuple, factory: Callable[[], Awaitable], priority: int = INTERACTIVE,
+               cost: float = 1, coalesce_key: Optional[Hashable] = None) -> asyncio.Future:
+        """Queues factory() on route; route[0] must be a ROUTE_LIMITS kind."""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        queue = self._queues[route]
+        existing = self._queued.get(coalesce_key) if coalesce_key is not None else None
+        if existing is not None:
+            existing.factory = factory
+            existing.cost = cost
+            existing.futures.append(future)
+            if priority < existing.priority:
+                existing.priority = priority
+                heapq.heapify(queue)
+            self.stats_by_kind[route[0]].coalesced += 1
+        else:
+            action = Action(priority, next(self._seq), factory, cost, coalesce_key)
+            action.futures.append(future)
+            heapq.heappush(queue, action)
+            if coalesce_key is not None:
+                self._queued[coalesce_key] = action
+        if route not in self._workers:
+            self._workers[route] = asyncio.create_task(self._drain(route))
+        return future
+
+    async def _drain(self, route: Tuple):
+        queue = self._queues[route]
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = TokenBucket(*ROUTE_LIMITS[route[0]])
+        stats = self.stats_by_kind[route[0]]
+        try:
+            while queue:
+                action = queue[0]
+                background = action.priority >= BACKGROUND
+                wait = max(
+                    bucket.delay(action.cost, bucket.capacity * BACKGROUND_RESERVE if background else 0.0),
+                    self._global.delay(action.cost, self._global.capacity * BACKGROUND_RESERVE if background else 0.0),
+                )
+                if wait > 0:
+                    # Re-check the head afterwards; a higher-priority action may have arrived
+                    await asyncio.sleep(wait)
+                    continue
+                heapq.heappop(queue)
+                if action.coalesce_key is not None:
+                    self._queued.pop(action.coalesce_key, None)
+                bucket.take(action.cost)
+                self._global.take(action.cost)
+                stats.max_wait = max(stats.max_wait, time.monotonic() - action.queued_at)
+                current_source.set(action.source)
+                try:
+                    result = await action.factory()
+                except Exception as e:
+                    stats.errors += 1
+                    for future in action.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for future in action.futures:
+                        if not future.done():
+                            future.set_result(result)
+                stats.executed += 1
+        finally:
+            del self._workers[route]
+            if not queue:
+                del self._queues[route]
+
+    # -----------------
+    # Common actions
+    # -----------------
+    def edit_nick(self, member: discord.Member, nick: Optional[str], priority: int = INTERACTIVE) -> asyncio.Future:
+        """Sets a nickname; queued edits to the same member collapse into the latest."""
+        return self.submit(("member_edit", member.guild.id), lambda: member.edit(nick=nick), priority,
+                           coalesce_key=("nick", member.guild.id, member.id))
+
+    def add_roles(self, member: discord.Member, *roles: discord.abc.Snowflake, reason: Optional[str] = None,
+                  priority: int = INTERACTIVE) -> asyncio.Future:
+        return self.submit(("member_roles", member.guild.id), lambda: member.add_roles(*roles, reason=reason),
+                           priority, cost=len(roles))
+
+    def remove_roles(self, member: discord.Member, *roles: discord.abc.Snowflake, reason: Optional[str] = None,
+                     priority: int = INTERACTIVE) -> asyncio.Future:
+        return self.submit(("member_roles", member.guild.id), lambda: member.remove_roles(*roles, reason=reason),
+                           priority, cost=len(roles))
+
+    def delete_message(self, message: discord.Message, priority: int = BACKGROUND) -> asyncio.Future:
+        return self.submit(("message_delete", message.channel.id), message.delete, priority)
+
+    def delete_messages(self, channel, messages: List[discord.abc.Snowflake],
+                        priority: int = BACKGROUND) -> asyncio.Future:
+        return self.submit(("bulk_delete", channel.id), lambda: channel.delete_messages(messages), priority)
+
+    def send_dm(self, user: discord.abc.User, content: str, priority: int = INTERACTIVE) -> asyncio.Future:
+        return self.submit(("dm",), lambda: user.send(content), priority)
+
+    def kick(self, member: discord.Member, reason: Optional[str] = None, priority: int = MODERATION) -> asyncio.Future:
+        return self.submit(("kick", member.guild.id), lambda: member.kick(reason=reason), priority)
+
+    def ban(self, member: discord.Member, reason: Optional[str] = None, priority: int = MODERATION) -> asyncio.Future:
+        return self.submit(("ban", member.guild.id), lambda: member.ban(reason=reason), priority)
+
+    # -----------------
+    # Metrics
+    # -----------------
+    def queue_depths(self) -> Dict[str, Dict[str, int]]:
+        """Queued actions per route kind, split by priority class."""
+        depths: Dict[str, Dict[str, int]] = defaultdict(lambda: {name: 0 for name in PRIORITY_NAMES.values()})
+        for route, queue in self._queues.items():
+            for action in queue:
+                depths[route[0]][PRIORITY_NAMES[action.priority]] += 1
+        return dict(depths)
+
+    def stats(self) -> List[Tuple[str, int, int, int, int, float]]:
+        """Returns (kind, queued, executed, coalesced, errors, max wait seconds) per route kind."""
+        depths = self.queue_depths()
+        kinds = sorted(set(self.stats_by_kind) | set(depths))
+        return [
+            (kind, sum(depths.get(kind, {}).values()), self.stats_by_kind[kind].executed,
+             self.stats_by_kind[kind].coalesced, self.stats_by_kind[kind].errors, self.stats_by_kind[kind].max_wait)
+            for kind in kinds
+        ]
+
+
+def _consume_exception(future: asyncio.Future):
+    # Fire-and-forget callers never await their future; don't log its exception as unretrieved
+    if not future.cancelled():
+        future.exception()
+
+
+def get_scheduler(bot) -> ActionScheduler:
+    """Returns the bot's shared action scheduler, creating it on first use."""
+    scheduler = getattr(bot, "action_scheduler", None)
+    if scheduler is None:
+        scheduler = ActionScheduler()
+        bot.action_scheduler = scheduler
+    return scheduler
@@ -1,11 +1,13 @@
 import discord
 import asyncio
-import json
 import contextlib
 from discord.ext import commands, tasks
 from collections import defaultdict, deque
 from typing import Optional, Dict, Deque, List
 from datetime import datetime, timezone, timedelta
+from messagepipeline import get_pipeline, MessageContext, TRACK
+from jsonstore import JsonStore
+from actions import get_scheduler, BACKGROUND
 
 # ==========================
 # Helper: role-gated commands
@@ -58,18 +60,13 @@ class AutoDelete(commands.Cog):
     # Config persistence
     # -----------------
     def _load_config(self) -> None:
-        try:
-            with open(self._config_path, "r", encoding="utf-8") as fp:
-                self.config = json.load(fp)
-        except FileNotFoundError:
-            self.config = {}
-        except json.JSONDecodeError:
-            # Recover from a broken file
-            self.config = {}
+        # A broken or missing file loads as an empty config
+        self._config_store = JsonStore(self._config_path, default={}, indent=2)
+        self.config = self._config_store.data
 
     async def _save_config(self) -> None:
-        with open(self._config_path, "w", encoding="utf-8") as fp:
-            json.dump(self.config, fp, indent=2)
+        # Debounced atomic write; flushed on unload
+        self._config_store.mark_dirty()
 
     # -----------------
     # Lifecycle hooks
@@ -122,8 +119,13 @@ class AutoDelete(commands.Cog):
                 if expired:
                     self.pending[chan_id].extend(expired)
 
-    def cog_unload(self):
+    def cog_load(self):
+        get_pipeline(self.bot).add_stage("autodelete", self.track_message, TRACK, owner=self)
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
         self.sweeper.cancel()
+        await self._config_store.close()
 
     # -----------------
     # Command surface
@@ -282,15 +284,11 @@ class AutoDelete(commands.Cog):
                 await ctx.message.delete()
 
     # -----------------
-    # Message listener
+    # Message stage (DMs, bots and webhooks never reach it)
     # -----------------
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        # Ignore DM / bot / webhooks
-        if not message.guild or message.author.bot:
-            return
-
-        cfg = self.config.get(str(message.channel.id))
+    async def track_message(self, ctx: MessageContext):
+        message = ctx.message
+        cfg = self.config.get(str(ctx.channel_id))
         if not cfg:
             return
 
@@ -404,7 +402,7 @@ class AutoDelete(commands.Cog):
             # Prefer raw IDs to reduce payload size
             ids = [m.id for m in chunk]
             # discord.py accepts either messages or Snowflakes
-            await channel.delete_messages(ids)
+            await get_scheduler(self.bot).delete_messages(channel, [discord.Object(id=i) for i in ids], BACKGROUND)
         except AttributeError:
             # Fallback to purge on TextChannel / Thread
             if hasattr(channel, "purge"):
@@ -424,15 +422,12 @@ class AutoDelete(commands.Cog):
                 raise
 
     async def _delete_single(self, message: discord.Message):
+        # Paced by the scheduler's per-channel bucket (5 deletions per 5 seconds)
         try:
-            await message.delete()
-            # Optimized sleep for Discord's rate limit (5 deletions per 5 seconds per channel)
-            await asyncio.sleep(1.0)
-        except (discord.NotFound, discord.Forbidden):
-            return
+            await get_scheduler(self.bot).delete_message(message, BACKGROUND)
         except discord.HTTPException:
-            # Mild backoff if we hit a rate-limit edge
-            await asyncio.sleep(2.5)
+            # NotFound / Forbidden / anything else: nothing more to do for this message
+            return
 
 
 # --------------
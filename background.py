@@ -0,0 +1,35 @@
+import asyncio
+import traceback
+from typing import Coroutine, Set
+
+
+def get_background_tasks(bot) -> Set[asyncio.Task]:
+    """Returns the bot's set of running background tasks, creating it on first use."""
+    tasks = getattr(bot, "background_tasks", None)
+    if tasks is None:
+        tasks = set()
+        bot.background_tasks = tasks
+    return tasks
+
+
+def spawn(bot, coro: Coroutine, name: str) -> asyncio.Task:
+    """Runs coro as a task the bot holds on to until it finishes, printing it if it fails.
+
+    The event loop only keeps weak references to tasks, so an unreferenced one can be
+    garbage collected mid-run, and its exception would otherwise never be seen.
+    """
+    tasks = get_background_tasks(bot)
+    task = asyncio.create_task(coro, name=name)
+    tasks.add(task)
+    task.add_done_callback(lambda done: _finished(tasks, done))
+    return task
+
+
+def _finished(tasks: Set[asyncio.Task], task: asyncio.Task):
+    tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"[Background] Task '{task.get_name()}' failed: {error}")
+        traceback.print_exception(error)
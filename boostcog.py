@@ -2,6 +2,7 @@
 import asyncio
 import discord
 from discord.ext import commands
+from actions import get_scheduler, INTERACTIVE, BACKGROUND
 
 class BoostCog(commands.Cog):
     def __init__(self, bot):
@@ -52,43 +53,46 @@ class BoostCog(commands.Cog):
         while not self.bot.is_closed():
             try:
                 for guild in self.bot.guilds:
-                    role = discord.utils.get(guild.roles, name="☆")
-                    if role is None:
-                        continue
-
-                    print(f"Checking guild: {guild.name}")
-                    updates_made = 0
-                    
-                    for member in guild.members:
-                        if member.bot:  # Skip bots
-                            continue
-                            
-                        has_role = role in member.roles
-                        has_emoji = self.boost_emoji in member.display_name
-                        
-                        if has_role and not has_emoji:
-                            new_nick = f"{member.display_name}{self.boost_emoji}"
-                            await self.safe_edit_nick(member, new_nick)
-                            updates_made += 1
-                        elif not has_role and has_emoji:
-                            new_nick = member.display_name.replace(self.boost_emoji, "")
-                            await self.safe_edit_nick(member, new_nick)
-                            updates_made += 1
-                        
-                        # Small delay to avoid rate limits
-                        await asyncio.sleep(0.2)
-                    
-                    if updates_made > 0:
-                        print(f"Made {updates_made} nickname updates in {guild.name}")
-                        
+                    await self.sync_guild_nicks(guild)
             except Exception as e:
                 print(f"Error in check_role_loop: {e}")
             
             print("Waiting 10 minutes before next check...")
             await asyncio.sleep(600)  # Check every 10 minutes
 
-    async def safe_edit_nick(self, member, new_nick):
-        """Safely edit a member's nickname with error handling"""
+    async def sync_guild_nicks(self, guild) -> int:
+        """Adds or removes the boost emoji for every member whose nickname doesn't match their role."""
+        role = discord.utils.get(guild.roles, name="☆")
+        if role is None:
+            return 0
+
+        print(f"Checking guild: {guild.name}")
+        edits = []
+
+        for member in guild.members:
+            if member.bot:  # Skip bots
+                continue
+
+            has_role = role in member.roles
+            has_emoji = self.boost_emoji in member.display_name
+
+            if has_role and not has_emoji:
+                new_nick = f"{member.display_name}{self.boost_emoji}"
+                edits.append(self.safe_edit_nick(member, new_nick, BACKGROUND))
+            elif not has_role and has_emoji:
+                new_nick = member.display_name.replace(self.boost_emoji, "")
+                edits.append(self.safe_edit_nick(member, new_nick, BACKGROUND))
+
+        # Submitted together, so the scheduler paces the whole batch instead of one edit at a time
+        await asyncio.gather(*edits)
+        updates_made = len(edits)
+
+        if updates_made > 0:
+            print(f"Made {updates_made} nickname updates in {guild.name}")
+        return updates_made
+
+    async def safe_edit_nick(self, member, new_nick, priority=INTERACTIVE):
+        """Safely edit a member's nickname with error handling, paced by the shared action scheduler"""
         try:
             # Clean up the nickname (remove extra spaces, etc.)
             new_nick = new_nick.strip()
@@ -110,7 +114,7 @@ class BoostCog(commands.Cog):
             # Debug print to see what we're trying to set
             print(f"Attempting to update: '{member.display_name}' -> '{new_nick}'")
             
-            await member.edit(nick=new_nick)
+            await get_scheduler(self.bot).edit_nick(member, new_nick, priority)
             print(f"✅ Successfully updated nickname for {member.display_name}")
             
         except discord.Forbidden:
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 import asyncio
 import random
+from actions import get_scheduler
 
 class CaptchaCog(commands.Cog):
     def __init__(self, bot):
@@ -53,7 +54,7 @@ class CaptchaCog(commands.Cog):
 
                 if attempts >= 3:
                     await dm.send("⛔ You failed the CAPTCHA and will be banned.")
-                    await member.ban(reason="Failed CAPTCHA in DM")
+                    await get_scheduler(self.bot).ban(member, reason="Failed CAPTCHA in DM")
                     return
 
             except (discord.Forbidden, discord.HTTPException):
@@ -103,7 +104,7 @@ class CaptchaCog(commands.Cog):
             await purgatory.send("⛔ Verification failed. You will be banned.")
             await asyncio.sleep(2)
             await self.cleanup(member, purgatory)
-            await member.ban(reason="Failed CAPTCHA in purgatory")
+            await get_scheduler(self.bot).ban(member, reason="Failed CAPTCHA in purgatory")
 
         except Exception as e:
             print(f"[CAPTCHA ERROR] {e}")
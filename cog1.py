@@ -2,22 +2,22 @@ import os
 import discord
 import base64
 import random
-import json
-import sqlite3
 import asyncio
 import requests
 import re
 from datetime import datetime
 from discord.ext import commands
 from io import BytesIO
+from messagepipeline import get_pipeline, MessageContext, INTERCEPT, RESPOND
+from storage import get_storage
+from jsonstore import JsonStore
 
 ALLOWED_ROLES = {"☆", "III", "II", "I"}
 
 class Cog1(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db_path = "pinned_messages.db"
-        self.init_pin_database()
+        self.db_path = "pinned_messages.db"  # Legacy database, imported into storage once
         self.invite_cache = {}
         self.tracked_invite_code = "qnDWXbzywE"
         self.role_name = "lunatic"  # Role to assign
@@ -53,58 +53,37 @@ class Cog1(commands.Cog):
 
     def load_bump_times(self):
         """Loads last bump times from file and reschedules reminders if necessary."""
-        try:
-            with open(self.bump_times_file, "r") as f:
-                loaded_data = json.load(f)
-                for guild_id, timestamp_str in loaded_data.items():
-                    # Convert string timestamp back to datetime object
-                    self.last_bump_times[guild_id] = datetime.fromisoformat(timestamp_str)
-                    
-                    # Reschedule reminders for bumps that happened less than 2 hours ago
-                    time_since_bump = datetime.now() - self.last_bump_times[guild_id]
-                    if time_since_bump.total_seconds() < self.bump_reminder_delay_seconds:
-                        remaining_delay = self.bump_reminder_delay_seconds - time_since_bump.total_seconds()
-                        print(f"Rescheduling bump reminder for guild {guild_id} in {remaining_delay:.0f} seconds.")
-                        self.reminder_tasks[guild_id] = asyncio.create_task(
-                            self._schedule_bump_reminder(guild_id, remaining_delay)
-                        )
-                    else:
-                        print(f"Bump for guild {guild_id} was too long ago, not rescheduling.")
-
-        except FileNotFoundError:
-            self.last_bump_times = {}
-            print(f"{self.bump_times_file} not found. Starting with empty bump times.")
-        except json.JSONDecodeError:
-            print(f"Error decoding {self.bump_times_file}. Starting with empty bump times.")
-            self.last_bump_times = {}
+        # A missing or broken file loads as empty
+        self.bump_store = JsonStore(self.bump_times_file, default={}, indent=4)
+        for guild_id, timestamp_str in self.bump_store.data.items():
+            # Convert string timestamp back to datetime object
+            self.last_bump_times[guild_id] = datetime.fromisoformat(timestamp_str)
+            
+            # Reschedule reminders for bumps that happened less than 2 hours ago
+            time_since_bump = datetime.now() - self.last_bump_times[guild_id]
+            if time_since_bump.total_seconds() < self.bump_reminder_delay_seconds:
+                remaining_delay = self.bump_reminder_delay_seconds - time_since_bump.total_seconds()
+                print(f"Rescheduling bump reminder for guild {guild_id} in {remaining_delay:.0f} seconds.")
+                self.reminder_tasks[guild_id] = asyncio.create_task(
+                    self._schedule_bump_reminder(guild_id, remaining_delay)
+                )
+            else:
+                print(f"Bump for guild {guild_id} was too long ago, not rescheduling.")
             
-    def init_pin_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pinned_messages (
-                message_id INTEGER PRIMARY KEY,
-                webhook_message_id INTEGER
-            )
-        ''')
-        conn.commit()
-        conn.close()
-
-    def get_pinned_webhook_message_id(self, message_id: int) -> int:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT webhook_message_id FROM pinned_messages WHERE message_id = ?", (message_id,))
-        result = cursor.fetchone()
-        conn.close()
+    async def init_pin_database(self):
+        storage = await get_storage(self.bot)
+        self.pins = await storage.table("cog1", "pinned_messages", '''
+            message_id INTEGER,
+            webhook_message_id INTEGER
+        ''', key=("message_id",))
+        await storage.import_sqlite(self.pins, self.db_path, "pinned_messages")
+
+    async def get_pinned_webhook_message_id(self, message_id: int) -> int:
+        result = await self.pins.get("webhook_message_id", message_id=message_id)
         return result[0] if result else None
 
     def save_pinned_message(self, message_id: int, webhook_message_id: int):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO pinned_messages (message_id, webhook_message_id) VALUES (?, ?)",
-                       (message_id, webhook_message_id))
-        conn.commit()
-        conn.close()
+        self.pins.upsert({"message_id": message_id, "webhook_message_id": webhook_message_id})
         
     async def get_random_gif(self,type="rape"):
         """Gets a random GIF, avoiding recently used ones."""
@@ -117,14 +96,13 @@ class Cog1(commands.Cog):
         return gif_url
 
     def save_bump_times(self):
-        """Saves current bump times to file."""
+        """Saves current bump times to file (debounced, written atomically)."""
         # Convert datetime objects to ISO format strings for JSON serialization
-        data_to_save = {
+        self.bump_store.data = {
             guild_id: dt_obj.isoformat() 
             for guild_id, dt_obj in self.last_bump_times.items()
         }
-        with open(self.bump_times_file, "w") as f:
-            json.dump(data_to_save, f, indent=4)
+        self.bump_store.mark_dirty()
 
     async def _schedule_bump_reminder(self, guild_id: str, delay: float):
         """Schedules and sends a DM reminder after a specified delay."""
@@ -195,17 +173,25 @@ class Cog1(commands.Cog):
         except Exception as e:
             print(f"[InviteTracker] Error handling join: {e}")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore messages from the bot itself or system messages
-        if message.author.bot or message.author.id == self.bot.user.id:
-            return
-        
+    async def cog_load(self):
+        await self.init_pin_database()
+        pipeline = get_pipeline(self.bot)
+        # Disboard's bump reply comes from a bot; detect_bump itself only acts on the Disboard bot's messages
+        pipeline.add_stage("disboard_bump", self.detect_bump, INTERCEPT, owner=self, bots=True)
+        pipeline.add_stage("cog1_replies", self.reply_to_message, RESPOND, owner=self, guild_only=False)
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
+        await self.pins.storage.flush()
+        await self.bump_store.close()
+
+    async def detect_bump(self, ctx: MessageContext):
         # --- Disboard Bump Detection ---
-        if message.author.id == self.disboard_bot_id and message.guild:
-            # Check for common Disboard bump success messages
-            content_lower = message.content.lower()
-            if "bump done" in content_lower or "successfully bumped" in content_lower:
+        message = ctx.message
+        if ctx.author_id == self.disboard_bot_id:
+            # Check for common Disboard bump success messages; current replies put them in an embed
+            text = " ".join([ctx.lower] + [(embed.description or "").lower() for embed in message.embeds])
+            if "bump done" in text or "successfully bumped" in text:
                 guild_id = str(message.guild.id)
                 self.last_bump_times[guild_id] = datetime.now()
                 self.save_bump_times()
@@ -220,21 +206,23 @@ class Cog1(commands.Cog):
                 self.reminder_tasks[guild_id] = asyncio.create_task(
                     self._schedule_bump_reminder(guild_id, self.bump_reminder_delay_seconds)
                 )
-                return # Stop processing if it's a bump message to avoid conflicts with other message handlers
-    
+                return True # Stop processing if it's a bump message to avoid conflicts with other message handlers
+
+    async def reply_to_message(self, ctx: MessageContext):
+        message = ctx.message
         if self.bot.user in message.mentions:
             await message.channel.send("Go away I'm busy :S")
-        elif message.content.lower() == "nii nii":
+        elif ctx.lower == "nii nii":
             async for last_message in message.channel.history(limit=1):
                 if last_message.author == self.bot.user and last_message.content == "Nii nii":
                     return
             await message.channel.send("Nee nee")
-        elif message.content.lower() == "nee nee":
+        elif ctx.lower == "nee nee":
             async for last_message in message.channel.history(limit=1):
                 if last_message.author == self.bot.user and last_message.content == "Nee nee":
                     return
             await message.channel.send("Nii nee")
-        elif message.content.lower() == "nii nee":
+        elif ctx.lower == "nii nee":
             async for last_message in message.channel.history(limit=1):
                 if last_message.author == self.bot.user and last_message.content == "Nii nee":
                     return
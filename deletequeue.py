@@ -0,0 +1,137 @@
+import asyncio
+import time
+from typing import Dict, List
+
+import discord
+
+from actions import get_scheduler, MODERATION
+
+BULK_DELETE_LIMIT = 100
+BULK_AGE_LIMIT = 14 * 86400 - 60  # Seconds; a minute short of Discord's cutoff so a queued message can't age past it
+CLOSE_TIMEOUT = 15.0  # Seconds close() waits for queued deletes before giving up on them
+
+
+class DeleteStats:
+    __slots__ = ("queued", "bulk_requests", "bulk_deleted", "single_deleted", "failed", "largest_batch", "busy")
+
+    def __init__(self):
+        self.queued = 0
+        self.bulk_requests = 0
+        self.bulk_deleted = 0
+        self.single_deleted = 0
+        self.failed = 0
+        self.largest_batch = 0
+        self.busy = 0.0  # Seconds spent with at least one channel draining
+
+    @property
+    def deleted(self) -> int:
+        return self.bulk_deleted + self.single_deleted
+
+    @property
+    def rate(self) -> float:
+        """Deletions per second while draining."""
+        return self.deleted / self.busy if self.busy else 0.0
+
+
+class DeleteQueue:
+    """Deletes messages in per-channel batches, so a raid costs a few bulk calls.
+
+    A channel with nothing queued deletes its first message right away. Messages that
+    arrive while a channel's request is in flight wait for it and go out together in the
+    next one, in bulk deletes of up to BULK_DELETE_LIMIT, paced by the action scheduler
+    at moderation priority. Messages too old for bulk delete, lone messages and chunks
+    the bulk call rejects are deleted one at a time. close() stops taking messages and
+    lets what is already queued finish, within CLOSE_TIMEOUT.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.stats = DeleteStats()
+        self._pending: Dict[int, Dict[int, discord.Message]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._busy_since = 0.0
+        self._unresolved = 0  # Queued or in-flight messages whose delete hasn't finished either way
+        self._closed = False
+
+    def add(self, message: discord.Message):
+        """Queues message for deletion; queuing the same message twice deletes it once."""
+        if self._closed:
+            return
+        channel_id = message.channel.id
+        pending = self._pending.setdefault(channel_id, {})
+        if message.id in pending:
+            return
+        pending[message.id] = message
+        self.stats.queued += 1
+        self._unresolved += 1
+        if channel_id not in self._workers:
+            if not self._workers:
+                self._busy_since = time.perf_counter()
+            self._workers[channel_id] = asyncio.create_task(self._drain(message.channel))
+
+    def __len__(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    async def join(self):
+        """Waits until every queued message has been dealt with."""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    async def close(self, timeout: float = CLOSE_TIMEOUT):
+        """Stops taking messages, waits up to timeout for queued deletes, then cancels the rest."""
+        self._closed = True
+        if self._workers:
+            await asyncio.wait(list(self._workers.values()), timeout=timeout)
+        if not self._workers:
+            return
+        abandoned = self._unresolved
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        print(f"[DeleteQueue] Closed after {timeout:g}s with {abandoned} deletes unfinished")
+
+    # -----------------
+    # Draining
+    # -----------------
+    async def _drain(self, channel):
+        try:
+            while self._pending.get(channel.id):
+                batch = list(self._pending.pop(channel.id).values())
+                self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+                now = discord.utils.utcnow()
+                young = [m for m in batch if (now - m.created_at).total_seconds() < BULK_AGE_LIMIT]
+                old = [m for m in batch if (now - m.created_at).total_seconds() >= BULK_AGE_LIMIT]
+                chunks = [young[i:i + BULK_DELETE_LIMIT] for i in range(0, len(young), BULK_DELETE_LIMIT)]
+                await asyncio.gather(*(self._delete_chunk(channel, chunk) for chunk in chunks),
+                                     *(self._delete_single(m) for m in old))
+        finally:
+            # Anything left after a failure stays queued and starts a new worker with the next add()
+            del self._workers[channel.id]
+            if not self._workers:
+                self.stats.busy += time.perf_counter() - self._busy_since
+
+    async def _delete_chunk(self, channel, chunk: List[discord.Message]):
+        if len(chunk) == 1:
+            await self._delete_single(chunk[0])
+            return
+        try:
+            self.stats.bulk_requests += 1
+            await get_scheduler(self.bot).delete_messages(channel, chunk, MODERATION)
+            self.stats.bulk_deleted += len(chunk)
+            self._unresolved -= len(chunk)
+        except discord.HTTPException as e:
+            # e.g. 50034 when a message aged past the cutoff while queued; singles always work
+            print(f"[DeleteQueue] Bulk delete of {len(chunk)} in {channel.id} failed, deleting singly: {e}")
+            await asyncio.gather(*(self._delete_single(m) for m in chunk))
+
+    async def _delete_single(self, message: discord.Message):
+        try:
+            await get_scheduler(self.bot).delete_message(message, MODERATION)
+            self.stats.single_deleted += 1
+        except discord.NotFound:
+            pass  # Already gone
+        except discord.HTTPException as e:
+            self.stats.failed += 1
+            print(f"[DeleteQueue] Could not delete message {message.id}: {e}")
+        self._unresolved -= 1
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import discord
+
+FLUSH_INTERVAL = 1.0
+
+
+# -----------------
+# Serialization (compact keys; one JSON object per line)
+# -----------------
+def serialize_user(user) -> Dict[str, Any]:
+    record = {"i": user.id, "n": user.name}
+    if user.bot:
+        record["b"] = 1
+    nick = getattr(user, "nick", None)
+    if nick:
+        record["d"] = nick
+    roles = getattr(user, "roles", None)
+    if roles:
+        record["r"] = [role.id for role in roles if not role.is_default()]
+    return record
+
+
+def serialize_emoji(emoji) -> Any:
+    if isinstance(emoji, str):
+        return emoji
+    return [emoji.name, emoji.id]
+
+
+def serialize_voice_state(state: discord.VoiceState) -> List:
+    return [state.channel.id if state.channel else None, int(state.self_deaf), int(state.deaf), int(state.self_mute)]
+
+
+def serialize_message(message: discord.Message) -> Dict[str, Any]:
+    record = {
+        "i": message.id,
+        "g": message.guild.id if message.guild else None,
+        "c": message.channel.id,
+        "a": serialize_user(message.author),
+        "x": message.content,
+    }
+    if message.pinned:
+        record["p"] = 1
+    if message.mentions:
+        record["mn"] = [serialize_user(user) for user in message.mentions]
+    if message.reference and message.reference.message_id:
+        record["ref"] = message.reference.message_id
+    return record
+
+
+class EventRecorder:
+    """Appends selected gateway events to a JSON Lines file for replay.py.
+
+    Listeners are only attached between start() and stop(), so the recorder costs
+    nothing while idle. Lines are buffered and appended once per FLUSH_INTERVAL
+    from a worker thread. The first event seen from each guild is preceded by a
+    "guild" record with its owner and role names, which the replay fakes need.
+    """
+
+    def __init__(self, bot, path: str):
+        self.bot = bot
+        self.path = path
+        self.events = 0
+        self._lines: List[str] = []
+        self._guilds_seen: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._listeners = {
+            "on_message": self.on_message,
+            "on_reaction_add": self.on_reaction_add,
+            "on_reaction_remove": self.on_reaction_remove,
+            "on_voice_state_update": self.on_voice_state_update,
+            "on_member_join": self.on_member_join,
+            "on_member_update": self.on_member_update,
+            "on_member_remove": self.on_member_remove,
+        }
+
+    @property
+    def recording(self) -> bool:
+        return self._flush_task is not None
+
+    def start(self):
+        if self.recording:
+            return
+        for event, listener in self._listeners.items():
+            self.bot.add_listener(listener, event)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if not self.recording:
+            return
+        for event, listener in self._listeners.items():
+            self.bot.remove_listener(listener, event)
+        self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush()
+
+    # -----------------
+    # Writing
+    # -----------------
+    def _emit(self, kind: str, guild: Optional[discord.Guild], record: Dict[str, Any]):
+        if guild is not None and guild.id not in self._guilds_seen:
+            self._guilds_seen.add(guild.id)
+            self._lines.append(json.dumps({
+                "k": "guild", "t": round(time.time(), 3), "g": guild.id, "o": guild.owner_id,
+                "r": {str(role.id): role.name for role in guild.roles if not role.is_default()},
+            }, separators=(",", ":")))
+        record["k"] = kind
+        record["t"] = round(time.time(), 3)
+        self._lines.append(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        self.events += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: List[str]):
+        with open(self.path, "a", encoding="utf-8") as fp:
+            fp.write("\n".join(lines) + "\n")
+
+    # -----------------
+    # Listeners
+    # -----------------
+    async def on_message(self, message: discord.Message):
+        self._emit("message", message.guild, serialize_message(message))
+
+    async def _reaction(self, kind: str, reaction: discord.Reaction, user):
+        message = reaction.message
+        self._emit(kind, message.guild, {
+            "g": message.guild.id if message.guild else None, "c": message.channel.id, "m": message.id,
+            "ma": serialize_user(message.author), "u": serialize_user(user), "e": serialize_emoji(reaction.emoji),
+        })
+
+    async def on_reaction_add(self, reaction, user):
+        await self._reaction("reaction_add", reaction, user)
+
+    async def on_reaction_remove(self, reaction, user):
+        await self._reaction("reaction_remove", reaction, user)
+
+    async def on_voice_state_update(self, member, before, after):
+        self._emit("voice", member.guild, {
+            "g": member.guild.id, "a": serialize_user(member),
+            "b": serialize_voice_state(before), "f": serialize_voice_state(after),
+        })
+
+    async def on_member_join(self, member):
+        self._emit("member_join", member.guild, {"g": member.guild.id, "a": serialize_user(member)})
+
+    async def on_member_update(self, before, after):
+        self._emit("member_update", after.guild, {
+            "g": after.guild.id, "b": serialize_user(before), "a": serialize_user(after),
+        })
+
+    async def on_member_remove(self, member):
+        self._emit("member_remove", member.guild, {"g": member.guild.id, "a": serialize_user(member)})
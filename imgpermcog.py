@@ -4,22 +4,24 @@ import asyncio
 import datetime
 import time
 import re
-import json
+from storage import get_storage
 
 class ImgPermCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.imgperm_timers = {}
-        self.filename = 'imgperm_timers.json'
-        try:
-            with open(self.filename, 'r') as f:
-                self.imgperm_timers = json.load(f)
-        except FileNotFoundError:
-            pass
+
+    async def cog_load(self):
+        storage = await get_storage(self.bot)
+        await storage.import_json("imgperm", "imgperm_timers.json", key="timers")
+        self.kv = storage.namespace("imgperm")
+        self.imgperm_timers = await self.kv.get("timers", {})
+
+    async def cog_unload(self):
+        await self.kv.storage.flush()
 
     async def save_imgperm_timers(self):
-        with open(self.filename, 'w') as f:
-            json.dump(self.imgperm_timers, f)
+        self.kv.set("timers", self.imgperm_timers)
 
     @commands.command(name='imgperm')
     @commands.has_any_role('I', 'II')
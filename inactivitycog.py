@@ -1,9 +1,12 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import sqlite3
+import asyncio
 from datetime import datetime, timedelta
 from typing import List
+from messagepipeline import get_pipeline, MessageContext, TRACK
+from storage import get_storage
+from actions import get_scheduler, BACKGROUND, MODERATION
 
 
 GUILD_ID = 1385991417393844224  # Replace with your server's ID
@@ -12,30 +15,30 @@ LUNATIC_ROLE_ID = 1385993304834838548  # Replace with your "Lunatic" role ID
 class InactivityCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = sqlite3.connect("inactivity.db")
-        self.cursor = self.db.cursor()
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_activity (
-                user_id INTEGER,
-                guild_id INTEGER,
-                last_active TEXT,
-                warned_7d INTEGER DEFAULT 0,
-                warned_21d INTEGER DEFAULT 0,
-                role_removed INTEGER DEFAULT 0,
-                PRIMARY KEY (user_id, guild_id)
-            )
-        """)
-        self.db.commit()
+
+    async def cog_load(self):
+        storage = await get_storage(self.bot)
+        self.activity = await storage.table("inactivity", "user_activity", """
+            user_id INTEGER,
+            guild_id INTEGER,
+            last_active TEXT,
+            warned_7d INTEGER DEFAULT 0,
+            warned_21d INTEGER DEFAULT 0,
+            role_removed INTEGER DEFAULT 0
+        """, key=("user_id", "guild_id"))
+        await storage.import_sqlite(self.activity, "inactivity.db", "user_activity")
+        get_pipeline(self.bot).add_stage("inactivity", self.track_message, TRACK, owner=self)
         self.check_inactivity.start()
 
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
+        self.check_inactivity.cancel()
+        await self.activity.storage.flush()
+
     def update_activity(self, user_id, guild_id):
+        # Queued for the storage writer; only last_active changes for an existing row
         now = datetime.utcnow().isoformat()
-        self.cursor.execute("""
-            INSERT INTO user_activity (user_id, guild_id, last_active)
-            VALUES (?, ?, ?)
-            ON CONFLICT(user_id, guild_id) DO UPDATE SET last_active=excluded.last_active
-        """, (user_id, guild_id, now))
-        self.db.commit()
+        self.activity.upsert({"user_id": user_id, "guild_id": guild_id, "last_active": now})
 
     def is_exempt(self, member: discord.Member) -> bool:
         if member.id == member.guild.owner_id:
@@ -48,11 +51,8 @@ class InactivityCog(commands.Cog):
         return False
 
     # Message activity
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
-            return
-        self.update_activity(message.author.id, message.guild.id)
+    async def track_message(self, ctx: MessageContext):
+        self.update_activity(ctx.author_id, ctx.guild_id)
 
     # Reaction activity
     @commands.Cog.listener()
@@ -79,11 +79,7 @@ class InactivityCog(commands.Cog):
     # Slash command to check inactivity
     @app_commands.command(name="inactivity", description="Check how long a user has been inactive.")
     async def inactivity(self, interaction: discord.Interaction, member: discord.Member):
-        self.cursor.execute(
-            "SELECT last_active FROM user_activity WHERE user_id = ? AND guild_id = ?",
-            (member.id, interaction.guild.id)
-        )
-        row = self.cursor.fetchone()
+        row = await self.activity.get("last_active", user_id=member.id, guild_id=interaction.guild.id)
         if row:
             last_active = datetime.fromisoformat(row[0])
             delta = datetime.utcnow() - last_active
@@ -103,11 +99,7 @@ class InactivityCog(commands.Cog):
     async def inactivitylist(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         guild = interaction.guild
-        self.cursor.execute("""
-            SELECT user_id, last_active FROM user_activity
-            WHERE guild_id = ?
-        """, (guild.id,))
-        rows = self.cursor.fetchall()
+        rows = await self.activity.select("user_id", "last_active", guild_id=guild.id)
         
         now = datetime.utcnow()
         data = []
@@ -187,8 +179,8 @@ class InactivityCog(commands.Cog):
         if role is None:
             return
 
-        self.cursor.execute("SELECT user_id, last_active, warned_7d, role_removed, warned_21d FROM user_activity WHERE guild_id = ?", (GUILD_ID,))
-        rows = self.cursor.fetchall()
+        rows = await self.activity.select("user_id", "last_active", "warned_7d", "role_removed", "warned_21d", guild_id=GUILD_ID)
+        scheduler = get_scheduler(self.bot)
 
         for user_id, last_active_str, warned_7d, role_removed, warned_21d in rows:
             member = guild.get_member(user_id)
@@ -200,31 +192,29 @@ class InactivityCog(commands.Cog):
 
             try:
                 if inactivity_days >= 7 and not warned_7d:
-                    await member.send("🔕 You've been inactive for 7 days. You will lose the **Lunatic** role in 7 more days if you stay inactive.")
-                    self.cursor.execute("UPDATE user_activity SET warned_7d = 1 WHERE user_id = ? AND guild_id = ?", (user_id, GUILD_ID))
+                    await scheduler.send_dm(member, "🔕 You've been inactive for 7 days. You will lose the **Lunatic** role in 7 more days if you stay inactive.", BACKGROUND)
+                    self.activity.update({"warned_7d": 1}, user_id=user_id, guild_id=GUILD_ID)
 
                 elif inactivity_days >= 14 and not role_removed:
                     if role in member.roles:
-                        await member.remove_roles(role, reason="Inactive for 14 days")
-                        await member.send("You've lost the **Lunatic** role due to 14 days of inactivity. You will be kicked in 14 more days if inactive.")
-                    self.cursor.execute("UPDATE user_activity SET role_removed = 1 WHERE user_id = ? AND guild_id = ?", (user_id, GUILD_ID))
+                        await scheduler.remove_roles(member, role, reason="Inactive for 14 days", priority=BACKGROUND)
+                        await scheduler.send_dm(member, "You've lost the **Lunatic** role due to 14 days of inactivity. You will be kicked in 14 more days if inactive.", BACKGROUND)
+                    self.activity.update({"role_removed": 1}, user_id=user_id, guild_id=GUILD_ID)
 
                 elif inactivity_days >= 21 and role_removed and not warned_21d:
-                    await member.send("You've been inactive for 21 days. You will be **kicked** from the server in 7 days if you don't return.")
-                    self.cursor.execute("UPDATE user_activity SET warned_21d = 1 WHERE user_id = ? AND guild_id = ?", (user_id, GUILD_ID))
+                    await scheduler.send_dm(member, "You've been inactive for 21 days. You will be **kicked** from the server in 7 days if you don't return.", BACKGROUND)
+                    self.activity.update({"warned_21d": 1}, user_id=user_id, guild_id=GUILD_ID)
 
                 elif inactivity_days >= 28 and role_removed:
-                    await member.send("You've been kicked from the server due to 28 days of inactivity.")
-                    await member.kick(reason="Inactive for 28 days")
-                    self.cursor.execute("DELETE FROM user_activity WHERE user_id = ? AND guild_id = ?", (user_id, GUILD_ID))
+                    await scheduler.send_dm(member, "You've been kicked from the server due to 28 days of inactivity.", BACKGROUND)
+                    await scheduler.kick(member, reason="Inactive for 28 days", priority=MODERATION)
+                    self.activity.delete(user_id=user_id, guild_id=GUILD_ID)
 
             except discord.Forbidden:
                 continue
             except discord.HTTPException:
                 continue
 
-        self.db.commit()
-
     @check_inactivity.before_loop
     async def before_loop(self):
         await self.bot.wait_until_ready()
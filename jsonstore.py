@@ -0,0 +1,106 @@
+import asyncio
+import atexit
+import copy
+import json
+import os
+from typing import Any, Optional
+
+RETRY_DELAY = 10.0  # Seconds before a failed write is tried again
+
+
+class JsonStore:
+    """A JSON document kept in memory and written to disk at most once per debounce window.
+
+    Callers change `data` in place and call mark_dirty(). The first change in a window
+    schedules one write `debounce` seconds later, so a burst of changes costs a single
+    write. Writes are serialized on the loop, then written to a temp file in a thread and
+    swapped in with os.replace, so a crash never leaves a half-written file. A failed write
+    leaves the document dirty and is retried after RETRY_DELAY. Owners call close() from
+    cog_unload; anything a store that is still open has dirty at interpreter exit is written then.
+    """
+
+    def __init__(self, path: str, default: Any = None, debounce: float = 1.0, indent: Optional[int] = None):
+        self.path = path
+        self.debounce = debounce
+        self.indent = indent
+        self.data = self._load(copy.deepcopy(default) if default is not None else {})
+        self.writes = 0
+        self._dirty = False
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None  # Held so the loop can't drop it mid-write
+        self._lock = asyncio.Lock()
+        atexit.register(self.flush_sync)
+
+    def _load(self, default: Any) -> Any:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return default
+        except json.JSONDecodeError as e:
+            print(f"[JsonStore] {self.path} is not valid JSON, starting empty: {e}")
+            return default
+
+    def mark_dirty(self):
+        """Records that data changed; it is written once the debounce window closes."""
+        self._dirty = True
+        self._schedule(self.debounce)
+
+    def _schedule(self, delay: float):
+        if self._pending is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        self._pending = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Writes the document now if it changed since the last write."""
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        async with self._lock:
+            if not self._dirty:
+                return
+            try:
+                # Serialized here, so later in-place changes can't race the writer thread
+                text = json.dumps(self.data, indent=self.indent)
+                self._dirty = False
+                await asyncio.to_thread(self._write, text)
+            except Exception as e:
+                # e.g. OSError from the disk, or TypeError for a value JSON can't hold
+                self._dirty = True
+                print(f"[JsonStore] Failed to write {self.path}, retrying in {RETRY_DELAY:g}s: {e}")
+                self._schedule(RETRY_DELAY)
+
+    async def close(self):
+        """Writes any pending changes and drops the exit hook, so a reloaded cog's old store
+        is released and can't overwrite its replacement's file at exit."""
+        await self.flush()
+        if self._pending is not None:
+            # The last write failed; its retry would outlive the owner
+            self._pending.cancel()
+            self._pending = None
+            print(f"[JsonStore] Closed {self.path} with unsaved changes")
+        atexit.unregister(self.flush_sync)
+
+    def flush_sync(self):
+        """Blocking flush for when no event loop is running (e.g. interpreter exit)."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._write(json.dumps(self.data, indent=self.indent))
+
+    def _write(self, text: str):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            fp.write(text)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self.path)
+        self.writes += 1
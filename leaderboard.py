@@ -0,0 +1,68 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    """One guild's reputation scores, kept sorted (highest first) as they change.
+
+    Entries are stored as (-reputation, user_id) keys in a SortedList, so updates, ranks and
+    percentiles take O(log n) and any page is a slice.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, int]] = ()):
+        self.scores: Dict[int, int] = {}
+        for user_id, rep in rows:
+            self.scores[user_id] = rep
+        self._keys = SortedList((-rep, user_id) for user_id, rep in self.scores.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.scores
+
+    def set_score(self, user_id: int, rep: int):
+        """Inserts a user or moves them to their new score."""
+        old = self.scores.get(user_id)
+        if old == rep:
+            return
+        if old is not None:
+            self._keys.remove((-old, user_id))
+        self.scores[user_id] = rep
+        self._keys.add((-rep, user_id))
+
+    def add_score(self, user_id: int, delta: int):
+        self.set_score(user_id, self.scores.get(user_id, 0) + delta)
+
+    def remove(self, user_id: int):
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self._keys.remove((-old, user_id))
+
+    def get(self, user_id: int) -> Optional[int]:
+        return self.scores.get(user_id)
+
+    def rank(self, rep: int) -> int:
+        """Returns the 1-based rank a score holds: one more than the number of higher scores, so ties share a rank."""
+        return self._keys.bisect_left((-rep, float('-inf'))) + 1
+
+    def percentile(self, rep: int) -> float:
+        """Returns the percentage of entries scoring strictly below rep."""
+        if not self._keys:
+            return 0.0
+        below = len(self._keys) - self._keys.bisect_left((-rep + 1, float('-inf')))
+        return 100.0 * below / len(self._keys)
+
+    def page(self, start: int, count: int) -> List[Tuple[int, int]]:
+        """Returns (user_id, reputation) for positions start..start+count-1, highest first."""
+        return [(user_id, -neg_rep) for neg_rep, user_id in self._keys[start:start + count]]
+
+    def top(self, count: int) -> List[Tuple[int, int]]:
+        return self.page(0, count)
+
+    def bottom(self, count: int) -> List[Tuple[int, int]]:
+        """Returns the lowest `count` entries, lowest first."""
+        if count <= 0:
+            return []
+        return [(user_id, -neg_rep) for neg_rep, user_id in reversed(self._keys[-count:])]
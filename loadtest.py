@@ -0,0 +1,180 @@
+"""Drives the bot's REST-heavy paths against reststandin.py and reports throughput under its rate limits.
+
+    python loadtest.py [--scenarios boost,numbers,roles,autodelete,raid,unpaced] [--members 50] [--messages 300]
+
+Starts the stand-in in-process, logs a real commands.Bot in against it (REST only, no
+gateway) and fills the bot's cache from the stand-in's guild, members and channels. Each
+scenario then runs real cog code: BoostCog.sync_guild_nicks, NumberCog.refresh_numbers,
+RoleTracker.add_roles_to_user for every member, and one AutoDelete sweep over each
+channel's full history. "raid" posts --raid copies of a prohibited phrase to every channel and
+feeds them to ProhibitedWordsCog as they arrive. "unpaced" fires member edits without the scheduler, as a baseline
+for discord.py's own pacing from the X-RateLimit headers. Cog data files go to a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from actions import get_scheduler
+from autodelete import AutoDelete
+from boostcog import BoostCog
+from messagepipeline import MessageContext
+from numberscog import NumberCog
+from prohibitedwords import ProhibitedWordsCog
+from reststandin import StandIn, use_standin
+from roletrackercog import RoleTracker
+
+
+async def hydrate(bot: commands.Bot, guild_id: int) -> discord.Guild:
+    """Caches the stand-in guild, its channels and members, as the gateway would."""
+    guild = await bot.fetch_guild(guild_id)
+    bot._connection._add_guild(guild)
+    for channel in await guild.fetch_channels():
+        guild._add_channel(channel)
+    async for member in guild.fetch_members(limit=None):
+        guild._add_member(member)
+    return guild
+
+
+# -----------------
+# Scenarios
+# -----------------
+async def boost(bot, guild, standin):
+    cog = BoostCog(bot)
+    return await cog.sync_guild_nicks(guild)
+
+
+async def numbers(bot, guild, standin):
+    cog = NumberCog(bot)
+    members = [m for m in guild.members if not m.bot]
+    cog.numbers_store.data = {str(m.id): n for n, m in enumerate(members, start=1)}
+    ctx = SimpleNamespace(author=SimpleNamespace(roles=[discord.utils.get(guild.roles, name="II")]),
+                          guild=guild, send=_print_send)
+    await cog.refresh_numbers.callback(cog, ctx)
+    await cog.numbers_store.close()
+    await cog.counter_store.close()
+    return len(members)
+
+
+async def roles(bot, guild, standin):
+    cog = RoleTracker(bot)
+    await bot.add_cog(cog)
+    restore = [role.id for role in guild.roles if role.name in ("I", "冰淇淋")]
+    members = [m for m in guild.members if not m.bot]
+    for member in members:
+        cog.roles_by_user[str(member.id)] = restore
+    for member in members:
+        await cog.add_roles_to_user(member)
+    await bot.remove_cog(cog.qualified_name)
+    return len(members) * len(restore)
+
+
+async def autodelete(bot, guild, standin):
+    cog = AutoDelete(bot)
+    deleted = 0
+    now = datetime.now(timezone.utc)
+    for channel in guild.text_channels:
+        history = [m async for m in channel.history(limit=None)]
+        cog.pending[channel.id] = history
+        await cog._sweep_channel(channel.id, {"limit": 1, "time": 0}, now)
+        deleted += len(history)
+    return deleted
+
+
+async def unpaced(bot, guild, standin):
+    """Member edits fired all at once, bypassing the scheduler, so only discord.py paces them."""
+    members = [m for m in guild.members if not m.bot]
+    await asyncio.gather(*(m.edit(nick=f"unpaced {n}") for n, m in enumerate(members)))
+    return len(members)
+
+
+async def raid(bot, guild, standin, count=300, arrival=0.005):
+    cog = ProhibitedWordsCog(bot)
+    await cog.load_words()
+    cog.bad_words = ["free nitro"]
+    await cog.rebuild_matcher()
+    cog.enabled = True
+    channels = guild.text_channels
+    arrivals = []
+    for channel in channels:
+        standin.spam(channel.id, count, "FREE N1TRO at discord-gift.example")
+        arrivals.append([m async for m in channel.history(limit=count, oldest_first=True)])
+    # Interleaved across channels, one message every `arrival` seconds, as the gateway would deliver them
+    for batch in zip(*arrivals):
+        for message in batch:
+            await cog.check_message(MessageContext(message))
+        await asyncio.sleep(arrival)
+    await cog.deletes.join()
+    stats = cog.deletes.stats
+    print(f"  > raid: {stats.deleted} deleted ({stats.bulk_deleted} in {stats.bulk_requests} bulk deletes, "
+          f"{stats.single_deleted} singly), largest batch {stats.largest_batch}")
+    await cog.deletes.close()
+    return stats.deleted
+
+
+async def _print_send(content=None, **kwargs):
+    print(f"  > {content}")
+
+
+SCENARIOS = {"boost": boost, "numbers": numbers, "roles": roles, "autodelete": autodelete, "raid": raid,
+             "unpaced": unpaced}
+
+
+# -----------------
+# Driver
+# -----------------
+async def run(args):
+    standin = StandIn()
+    guild_id = standin.seed(members=args.members, channels=args.channels, messages=args.messages)
+    runner = await standin.start(port=args.port)
+    use_standin(f"http://127.0.0.1:{args.port}/api/v10")
+
+    bot = commands.Bot(command_prefix="~", intents=discord.Intents.all(), help_command=None)
+    await bot.login("standin-token")
+    bot._ready.set()  # There is no gateway; the cache is filled over REST instead
+    guild = await hydrate(bot, guild_id)
+    print(f"[LoadTest] {len(guild.members)} members, {len(guild.text_channels)} channels, "
+          f"{args.messages} messages per channel\n")
+
+    results = []
+    for name in args.scenarios.split(","):
+        before_requests, before_429 = Counter(standin.requests), Counter(standin.rate_limited)
+        started = time.perf_counter()
+        actions = await SCENARIOS[name](bot, guild, standin)
+        elapsed = time.perf_counter() - started
+        requests = sum((standin.requests - before_requests).values())
+        limited = sum((standin.rate_limited - before_429).values())
+        results.append((name, actions, requests, limited, elapsed))
+
+    print(f"\n{'scenario':<12}{'actions':>9}{'requests':>10}{'429s':>7}{'seconds':>10}{'req/s':>8}")
+    for name, actions, requests, limited, elapsed in results:
+        print(f"{name:<12}{actions:>9}{requests:>10}{limited:>7}{elapsed:>10.2f}{requests / elapsed:>8.2f}")
+    print("\nScheduler (kind, queued, executed, coalesced, errors, max wait s):")
+    for row in get_scheduler(bot).stats():
+        print(f"  {row[0]:<16}{row[1]:>5}{row[2]:>7}{row[3]:>5}{row[4]:>5}{row[5]:>8.2f}")
+
+    await bot.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test REST-heavy cog paths against the local stand-in.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+    os.chdir(tempfile.mkdtemp(prefix="nab-loadtest-"))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
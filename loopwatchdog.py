@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+STALL_THRESHOLD = 0.1  # Seconds the loop may go without a heartbeat before it counts as stalled
+HEARTBEAT_INTERVAL = 0.02
+
+
+class StallSite:
+    """Stalls that were caught at the same call site."""
+    __slots__ = ("count", "total", "max", "stack")
+
+    def __init__(self, stack: List[str]):
+        self.count = 0
+        self.total = 0.0  # Seconds
+        self.max = 0.0
+        self.stack = stack  # Formatted stack of the longest stall here
+
+
+class LoopWatchdog:
+    """Detects event loop stalls from a separate thread and records where the loop was stuck.
+
+    A heartbeat task on the loop stamps the time every HEARTBEAT_INTERVAL. The watchdog
+    thread checks the stamp; once it is older than the threshold it captures the loop
+    thread's current stack, which is the code that is blocking. When the heartbeat
+    resumes, the stall's length is added to its call site: the innermost frame in this
+    repo, plus the innermost frame overall (usually the blocking library call).
+    """
+
+    def __init__(self, threshold: float = STALL_THRESHOLD):
+        self.threshold = threshold
+        self.sites: Dict[Tuple[str, str], StallSite] = {}
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # -----------------
+    # Lifecycle
+    # -----------------
+    def start(self):
+        """Starts the heartbeat on the running loop and the watchdog thread."""
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._heartbeat_task.cancel()
+        self._thread.join()
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    # -----------------
+    # Watchdog thread
+    # -----------------
+    def _watch(self):
+        poll = min(self.threshold / 2, HEARTBEAT_INTERVAL)
+        stalled_since: Optional[float] = None
+        site: Optional[Tuple[str, str]] = None
+        stack: List[str] = []
+        while not self._stop.wait(poll):
+            beat = self._beat
+            if stalled_since is None:
+                if time.monotonic() - beat > self.threshold + HEARTBEAT_INTERVAL:
+                    frame = sys._current_frames().get(self._loop_thread_id)
+                    if frame is None:
+                        continue
+                    stalled_since = beat
+                    site, stack = self._describe(frame)
+                    del frame
+            elif beat != stalled_since:
+                # Time between the last beat before the stall and the first one after, less the sleep
+                self._record(site, stack, max(0.0, beat - stalled_since - HEARTBEAT_INTERVAL))
+                stalled_since = None
+
+    @staticmethod
+    def _describe(frame) -> Tuple[Tuple[str, str], List[str]]:
+        summary = traceback.extract_stack(frame)
+        innermost = summary[-1]
+        ours = next((entry for entry in reversed(summary)
+                     if entry.filename.startswith(REPO_DIR) and entry.filename != __file__), innermost)
+
+        def where(entry) -> str:
+            return f"{os.path.relpath(entry.filename, REPO_DIR) if entry.filename.startswith(REPO_DIR) else os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+
+        return (where(ours), where(innermost)), traceback.format_list(summary)
+
+    def _record(self, site: Tuple[str, str], stack: List[str], seconds: float):
+        with self._lock:
+            entry = self.sites.get(site)
+            if entry is None:
+                entry = self.sites[site] = StallSite(stack)
+            entry.count += 1
+            entry.total += seconds
+            if seconds >= entry.max:
+                entry.max = seconds
+                entry.stack = stack
+            self.stalls += 1
+            self.stalled_seconds += seconds
+
+    # -----------------
+    # Report
+    # -----------------
+    def report(self, limit: int = 10) -> List[Tuple[str, str, int, float, float]]:
+        """Returns (call site, innermost frame, stalls, total seconds, max seconds), worst first."""
+        with self._lock:
+            rows = [(ours, inner, site.count, site.total, site.max) for (ours, inner), site in self.sites.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
+
+    def stack_dump(self) -> str:
+        """Longest captured stack for every call site, worst site first."""
+        with self._lock:
+            entries = sorted(self.sites.items(), key=lambda item: item[1].total, reverse=True)
+            return "\n".join(
+                f"== {ours} (in {inner}): {site.count} stalls, {site.total:.3f}s total, {site.max:.3f}s max\n"
+                + "".join(site.stack)
+                for (ours, inner), site in entries
+            )
+
+    def reset(self):
+        with self._lock:
+            self.sites.clear()
+            self.stalls = 0
+            self.stalled_seconds = 0.0
+
+
+def get_watchdog(bot) -> LoopWatchdog:
+    """Returns the bot's loop watchdog, creating it (not started) on first use."""
+    watchdog = getattr(bot, "loop_watchdog", None)
+    if watchdog is None:
+        watchdog = LoopWatchdog()
+        bot.loop_watchdog = watchdog
+    return watchdog
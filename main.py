@@ -1,8 +1,14 @@
+import asyncio
+import hashlib
+import json
 import os
+import time
 import discord
 from dotenv import load_dotenv
 from discord.ext import commands
 load_dotenv()
+STARTED = time.perf_counter()
+TEST_GUILD_ID = 1385991417393844224  # Commands are also synced here, where they update instantly; 0 to skip
 bot = commands.Bot(command_prefix='~', intents=discord.Intents.all(), help_command=None)
 from cog1 import Cog1
 from reputationcog import ReputationCog
@@ -19,6 +25,10 @@ from nineball import NineBall
 from wordreactions import WordReactions
 from captchacog import CaptchaCog
 from inactivitycog import InactivityCog
+from perfcog import PerfCog
+from storage import get_storage
+from messagepipeline import get_pipeline
+from background import spawn
 
 
 # Error handler for slash commands (ephemeral messages)
@@ -53,48 +63,53 @@ async def on_app_command_error(interaction: discord.Interaction, error):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @bot.event
-async def on_ready():
-    print(f'Bot is ready as {bot.user}')
-
-    await bot.add_cog(Cog1(bot))
-    await bot.add_cog(LQCog(bot))
-    await bot.add_cog(NumberCog(bot))
-    await bot.add_cog(WordCounter(bot))
-    await bot.add_cog(BoostCog(bot))
-    await bot.add_cog(NineBall(bot))
-    await bot.add_cog(ProhibitedWordsCog(bot))
-    await bot.add_cog(ImgPermCog(bot))
-    await bot.add_cog(AutoDelete(bot))
-    await bot.add_cog(RoleTracker(bot))
-    await bot.add_cog(RoleToggler(bot))
-    await bot.add_cog(CaptchaCog(bot))
-    await bot.add_cog(InactivityCog(bot))
-
-    # Initialize and assign the ReputationCog properly
+async def setup_hook():
+    # Runs once, after login and before the gateway connects, so cogs are ready for the first event
+    started = time.perf_counter()
     rep_cog = ReputationCog(bot)
     bot.reputation_cog = rep_cog  # ✅ Make it accessible from other cogs
-    await bot.add_cog(rep_cog)
+    cogs = [
+        Cog1(bot), LQCog(bot), NumberCog(bot), WordCounter(bot), BoostCog(bot), NineBall(bot),
+        ProhibitedWordsCog(bot), ImgPermCog(bot), AutoDelete(bot), RoleTracker(bot), RoleToggler(bot),
+        CaptchaCog(bot), InactivityCog(bot), rep_cog, WordReactions(bot),
+    ]
+    # Stages of equal order run in this list's order, not in whichever order the concurrent loads finish
+    get_pipeline(bot).set_owner_order(cogs)
+    # No cog needs another while loading, so their database and file I/O overlaps
+    results = await asyncio.gather(*(bot.add_cog(cog) for cog in cogs), return_exceptions=True)
+    for cog, result in zip(cogs, results):
+        if isinstance(result, Exception):
+            print(f"[Startup] Failed to load {cog.qualified_name}: {result}")
+    await bot.add_cog(PerfCog(bot))  # Last, so it instruments every cog above
+    print(f"[Startup] Loaded {len(bot.cogs)} cogs in {time.perf_counter() - started:.2f}s")
 
-    await bot.add_cog(WordReactions(bot))
+    spawn(bot, sync_commands(), "sync_commands")
+    spawn(bot, log_first_event(), "log_first_event")
 
-    # Sync slash commands globally
-    try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} slash commands globally")
-    except Exception as e:
-        print(f"Failed to sync slash commands globally: {e}")
 
-    # Sync commands instantly to your test guild
-    test_guild_id = 1385991417393844224
-    if test_guild_id:
+async def sync_commands():
+    """Syncs slash commands globally and to the test guild, skipping any scope whose commands are unchanged.
+
+    Each scope's command payload is hashed and compared with the hash stored at its last sync,
+    since syncs are slow and heavily rate limited.
+    """
+    hashes = (await get_storage(bot)).namespace("command_sync")
+    scopes = [None] + ([discord.Object(id=TEST_GUILD_ID)] if TEST_GUILD_ID else [])
+    for guild in scopes:
+        scope = f"guild {guild.id}" if guild else "global"
+        payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands(guild=guild)]
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        key = f"{bot.application_id}:{guild.id if guild else 'global'}"
+        if await hashes.get(key) == digest:
+            print(f"Slash commands unchanged ({scope}), skipping sync")
+            continue
         try:
-            guild = discord.Object(id=test_guild_id)
             synced = await bot.tree.sync(guild=guild)
-            print(f"Synced {len(synced)} commands to guild {test_guild_id} (instant)")
-        except Exception as e:
-            print(f"Failed to sync to guild: {e}")
-    else:
-        print("Set your test guild ID in on_ready() for instant slash command testing")
+        except discord.HTTPException as e:
+            print(f"Failed to sync slash commands ({scope}): {e}")
+            continue
+        hashes.set(key, digest)
+        print(f"Synced {len(synced)} slash commands ({scope})")
 
     # Debug: Show what commands are registered
     print("Registered slash commands:")
@@ -102,6 +117,20 @@ async def on_ready():
         print(f"  - /{command.name}: {command.description}")
 
 
+async def log_first_event():
+    waiters = [asyncio.create_task(bot.wait_for(event)) for event in ("message", "interaction")]
+    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    for waiter in waiters:
+        waiter.cancel()
+    print(f"[Startup] First event handled {time.perf_counter() - STARTED:.2f}s after launch")
+
+
+@bot.event
+async def on_ready():
+    # Also fires after reconnects; startup work belongs in setup_hook
+    print(f'Bot is ready as {bot.user} ({time.perf_counter() - STARTED:.2f}s after launch)')
+
+
 @bot.event
 async def on_command_error(ctx, error):
     # Create an ephemeral embed for the error message
@@ -0,0 +1,163 @@
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import discord
+
+from metrics import current_source
+
+# Stage order: lower runs first. Stages with the same order run in their owners' set_owner_order()
+# order, then in registration order.
+MODERATE = 10   # May delete the message; returns True to stop everything after it
+INTERCEPT = 20  # Claims messages (e.g. bot notifications) nothing later should see
+TRACK = 30      # Activity, reputation and counters
+RESPOND = 40    # Replies and reactions
+
+
+class MessageContext:
+    """Everything stages need from a message, normalized once per message."""
+    __slots__ = ("message", "text", "lower", "tokens", "role_ids", "author_id", "guild_id", "channel_id",
+                 "is_bot", "in_guild", "is_guild_owner", "is_admin")
+
+    def __init__(self, message: discord.Message):
+        author = message.author
+        self.message = message
+        self.text = message.content.strip()
+        self.lower = self.text.lower()
+        self.tokens: List[str] = self.lower.split()
+        self.author_id = author.id
+        self.guild_id: Optional[int] = message.guild.id if message.guild else None
+        self.channel_id = message.channel.id
+        self.is_bot = author.bot
+        self.in_guild = message.guild is not None
+        roles = getattr(author, "roles", None)
+        self.role_ids: FrozenSet[int] = frozenset(role.id for role in roles) if roles else frozenset()
+        self.is_guild_owner = self.in_guild and author.id == message.guild.owner_id
+        permissions = getattr(author, "guild_permissions", None)
+        self.is_admin = bool(permissions and permissions.administrator)
+
+
+StageCallback = Callable[[MessageContext], Awaitable[Optional[bool]]]
+
+
+class Stage:
+    """One registered handler and its timing counters."""
+    __slots__ = ("name", "callback", "order", "owner", "bots", "guild_only",
+                 "calls", "total", "max", "stops", "errors")
+
+    def __init__(self, name: str, callback: StageCallback, order: int, owner, bots: bool, guild_only: bool):
+        self.name = name
+        self.callback = callback
+        self.order = order
+        self.owner = owner
+        self.bots = bots
+        self.guild_only = guild_only
+        self.calls = 0
+        self.total = 0.0  # Seconds
+        self.max = 0.0
+        self.stops = 0
+        self.errors = 0
+
+
+class MessagePipeline:
+    """Runs every cog's message handling from a single on_message listener.
+
+    Cogs register stages with add_stage() when they load and drop them with
+    remove_stages() when they unload. Each message is normalized into a
+    MessageContext once and passed through the stages in order; a stage that
+    returns True stops the stages after it. The bot's own messages never enter
+    the pipeline, and bot/DM messages only reach stages that opt in.
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.stages: List[Stage] = []
+        self._owner_ranks: Dict[str, int] = {}
+        bot.add_listener(self.on_message, "on_message")
+
+    # -----------------
+    # Registration
+    # -----------------
+    def set_owner_order(self, owners: Iterable):
+        """Fixes how stages of equal order from different owners are ordered, whatever order the owners
+        register in (cogs load concurrently). Owners are matched by qualified_name, so a reloaded cog
+        keeps its place; owners not listed run after the listed ones."""
+        self._owner_ranks = {self._owner_name(owner): rank for rank, owner in enumerate(owners)}
+        self._sort()
+
+    def add_stage(self, name: str, callback: StageCallback, order: int, owner=None,
+                  bots: bool = False, guild_only: bool = True):
+        """Registers callback(ctx); bots/guild_only control whether bot messages and DMs reach it."""
+        self.stages.append(Stage(name, callback, order, owner, bots, guild_only))
+        self._sort()
+
+    def remove_stages(self, owner):
+        """Drops every stage registered by owner."""
+        self.stages = [stage for stage in self.stages if stage.owner is not owner]
+
+    @staticmethod
+    def _owner_name(owner) -> str:
+        return getattr(owner, "qualified_name", None) or "MessagePipeline"
+
+    def _sort(self):
+        unranked = len(self._owner_ranks)
+        # Stable, so stages of one owner (and of unlisted owners) keep registration order
+        self.stages.sort(key=lambda stage: (stage.order, self._owner_ranks.get(self._owner_name(stage.owner), unranked)))
+
+    # -----------------
+    # Dispatch
+    # -----------------
+    async def on_message(self, message: discord.Message):
+        if self.bot.user is not None and message.author.id == self.bot.user.id:
+            return
+        ctx = MessageContext(message)
+        metrics = getattr(self.bot, "metrics", None)
+        for stage in list(self.stages):
+            if ctx.is_bot and not stage.bots:
+                continue
+            if stage.guild_only and not ctx.in_guild:
+                continue
+            owner = self._owner_name(stage.owner)
+            token = current_source.set(owner)
+            started = time.perf_counter()
+            failed = False
+            try:
+                stop = await stage.callback(ctx)
+            except Exception as e:
+                stop = False
+                failed = True
+                stage.errors += 1
+                print(f"[MessagePipeline] Stage '{stage.name}' failed: {e}")
+                traceback.print_exc()
+            finally:
+                current_source.reset(token)
+            elapsed = time.perf_counter() - started
+            if metrics is not None:
+                metrics.observe(owner, f"on_message:{stage.name}", elapsed, failed)
+            stage.calls += 1
+            stage.total += elapsed
+            if elapsed > stage.max:
+                stage.max = elapsed
+            if stop:
+                stage.stops += 1
+                return
+
+    # -----------------
+    # Stats
+    # -----------------
+    def stats(self) -> List[Tuple[str, int, float, float, int, int]]:
+        """Returns (name, calls, mean ms, max ms, stops, errors) for each stage, in run order."""
+        return [
+            (stage.name, stage.calls, stage.total * 1000 / stage.calls if stage.calls else 0.0,
+             stage.max * 1000, stage.stops, stage.errors)
+            for stage in self.stages
+        ]
+
+
+def get_pipeline(bot: discord.Client) -> MessagePipeline:
+    """Returns the bot's shared pipeline, creating it on first use."""
+    pipeline = getattr(bot, "message_pipeline", None)
+    if pipeline is None:
+        pipeline = MessagePipeline(bot)
+        bot.message_pipeline = pipeline
+    return pipeline
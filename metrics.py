@@ -0,0 +1,224 @@
+import contextvars
+import functools
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Which cog (or pipeline stage) the running code belongs to; REST calls are counted against it.
+# Listener/command wrappers set it, and tasks they start inherit it.
+current_source: contextvars.ContextVar[str] = contextvars.ContextVar("current_source", default="unattributed")
+
+SUB_BUCKETS = 16  # Linear sub-buckets per power of two: bucket bounds are within 1/16 (6.25%) of any value
+
+
+class Histogram:
+    """Log-linear latency histogram in microseconds (HDR style): constant relative error, sparse storage."""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0.0  # Seconds
+        self.max = 0.0
+
+    @staticmethod
+    def _index(micros: int) -> int:
+        if micros < SUB_BUCKETS:
+            return micros
+        shift = micros.bit_length() - SUB_BUCKETS.bit_length()
+        return SUB_BUCKETS + shift * SUB_BUCKETS + ((micros >> shift) - SUB_BUCKETS)
+
+    @staticmethod
+    def _lower_bound(index: int) -> int:
+        if index < SUB_BUCKETS:
+            return index
+        shift, sub = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+        return (SUB_BUCKETS + sub) << shift
+
+    def record(self, seconds: float):
+        self.counts[self._index(int(seconds * 1_000_000))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in seconds, of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._lower_bound(index + 1) / 1_000_000, self.max)
+        return self.max
+
+
+class Metrics:
+    """Latency histograms and error counts per (cog, event), and REST calls per cog."""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.rest_calls: Dict[str, int] = defaultdict(int)
+        self._instrumented_http = False
+
+    def observe(self, cog: str, event: str, seconds: float, failed: bool = False):
+        self.histograms[(cog, event)].record(seconds)
+        if failed:
+            self.errors[(cog, event)] += 1
+
+    # -----------------
+    # Instrumentation
+    # -----------------
+    def instrument(self, bot):
+        """Wraps every loaded cog's listeners, prefix commands and app commands with timing,
+        and counts REST calls. Safe to call again after more cogs are added."""
+        for cog_name, cog in bot.cogs.items():
+            for event, method in cog.get_listeners():
+                listeners = bot.extra_events.get(event, [])
+                for i, listener in enumerate(listeners):
+                    if listener == method and not isinstance(listener, TimedListener):
+                        listeners[i] = TimedListener(self, cog_name, event, method)
+            for command in cog.get_app_commands():
+                self._wrap_app_command(cog_name, command)
+        # Listeners added outside cogs (e.g. the message pipeline) are labelled by their owner's class
+        for event, listeners in bot.extra_events.items():
+            for i, listener in enumerate(listeners):
+                if not isinstance(listener, TimedListener) and hasattr(listener, "__self__"):
+                    listeners[i] = TimedListener(self, type(listener.__self__).__name__, event, listener)
+        if not getattr(bot, "_metrics_hooks", False):
+            bot.before_invoke(self._before_command)
+            bot.after_invoke(self._after_command)
+            bot._metrics_hooks = True
+        self._instrument_http(bot)
+
+    def _wrap_app_command(self, cog_name: str, command):
+        callbacks = getattr(command, "walk_commands", None)
+        for cmd in (callbacks() if callbacks else [command]):
+            if getattr(cmd._callback, "__timed__", False):
+                continue
+            original = cmd._callback
+            event = f"/{cmd.qualified_name}"
+
+            @functools.wraps(original)
+            async def timed(*args, _original=original, _event=event, **kwargs):
+                token = current_source.set(cog_name)
+                started = time.perf_counter()
+                failed = False
+                try:
+                    return await _original(*args, **kwargs)
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    self.observe(cog_name, _event, time.perf_counter() - started, failed)
+                    current_source.reset(token)
+
+            timed.__timed__ = True
+            cmd._callback = timed
+
+    async def _before_command(self, ctx):
+        ctx._metrics_started = time.perf_counter()
+        ctx._metrics_token = current_source.set(ctx.cog.qualified_name if ctx.cog else "Bot")
+
+    async def _after_command(self, ctx):
+        started = getattr(ctx, "_metrics_started", None)
+        if started is None:
+            return
+        cog_name = ctx.cog.qualified_name if ctx.cog else "Bot"
+        self.observe(cog_name, f"~{ctx.command.qualified_name}", time.perf_counter() - started, ctx.command_failed)
+        current_source.reset(ctx._metrics_token)
+
+    def _instrument_http(self, bot):
+        if self._instrumented_http:
+            return
+        original = bot.http.request
+
+        async def request(route, **kwargs):
+            self.rest_calls[current_source.get()] += 1
+            return await original(route, **kwargs)
+
+        bot.http.request = request
+        self._instrumented_http = True
+
+    # -----------------
+    # Export
+    # -----------------
+    def summary(self) -> List[Tuple[str, str, int, float, float, float, float, int]]:
+        """Returns (cog, event, count, p50, p90, p99, max, errors) sorted by total time spent, seconds."""
+        rows = [
+            (cog, event, h.count, h.percentile(0.5), h.percentile(0.9), h.percentile(0.99), h.max,
+             self.errors.get((cog, event), 0))
+            for (cog, event), h in self.histograms.items()
+        ]
+        rows.sort(key=lambda row: self.histograms[(row[0], row[1])].total, reverse=True)
+        return rows
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP nab_handler_seconds Listener and command latency by cog and event.",
+            "# TYPE nab_handler_seconds summary",
+        ]
+        for (cog, event), h in sorted(self.histograms.items()):
+            labels = f'cog="{_escape(cog)}",event="{_escape(event)}"'
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f'nab_handler_seconds{{{labels},quantile="{q}"}} {h.percentile(q):.6f}')
+            lines.append(f"nab_handler_seconds_sum{{{labels}}} {h.total:.6f}")
+            lines.append(f"nab_handler_seconds_count{{{labels}}} {h.count}")
+        lines += ["# HELP nab_handler_errors_total Listener and command failures.",
+                  "# TYPE nab_handler_errors_total counter"]
+        for (cog, event), count in sorted(self.errors.items()):
+            lines.append(f'nab_handler_errors_total{{cog="{_escape(cog)}",event="{_escape(event)}"}} {count}')
+        lines += ["# HELP nab_rest_requests_total Discord REST requests by the cog that made them.",
+                  "# TYPE nab_rest_requests_total counter"]
+        for cog, count in sorted(self.rest_calls.items()):
+            lines.append(f'nab_rest_requests_total{{cog="{_escape(cog)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+class TimedListener:
+    """Stands in for a listener in bot.extra_events, timing each call.
+
+    Compares equal to the method it wraps, so bot.remove_listener (and remove_cog) still find it.
+    """
+
+    def __init__(self, metrics: Metrics, cog: str, event: str, func):
+        self.metrics = metrics
+        self.cog = cog
+        self.event = event
+        self.func = func
+        self.__name__ = getattr(func, "__name__", event)
+
+    def __eq__(self, other) -> bool:
+        return other is self or other == self.func
+
+    def __hash__(self) -> int:
+        return hash(self.func)
+
+    async def __call__(self, *args, **kwargs):
+        token = current_source.set(self.cog)
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await self.func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.metrics.observe(self.cog, self.event, time.perf_counter() - started, failed)
+            current_source.reset(token)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_metrics(bot) -> Metrics:
+    """Returns the bot's shared metrics, creating them on first use."""
+    metrics = getattr(bot, "metrics", None)
+    if metrics is None:
+        metrics = Metrics()
+        bot.metrics = metrics
+    return metrics
@@ -0,0 +1,66 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+
+class Milestone(NamedTuple):
+    """Counts where count % modulus == remainder. `message` is formatted with mention, count and word."""
+    name: str
+    modulus: int
+    remainder: int
+    rep: int
+    message: str
+
+    @classmethod
+    def ends_with(cls, digits: str, rep: int, message: str) -> "Milestone":
+        # A count ends with these digits exactly when it leaves them as remainder mod 10^len(digits)
+        return cls(f"ends with {digits}", 10 ** len(digits), int(digits), rep, message)
+
+    @classmethod
+    def every(cls, step: int, rep: int, message: str) -> "Milestone":
+        return cls(f"every {step}", step, 0, rep, message)
+
+    def next_after(self, count: int) -> int:
+        """The smallest count above `count` this milestone fires at."""
+        return count + 1 + (self.remainder - count - 1) % self.modulus
+
+
+NICE = "Nice {mention}! You are the {count}th person to say {word}!"
+CONGRATULATIONS = "Congratulations {mention}! You are the {count}th person to say {word}!"
+
+# Checked in order; when several match one count, the first one wins
+WORD_MILESTONES = [
+    Milestone.ends_with("42069", 100, "@everyone @everyone @everyone GET IN HERE {mention} WAS THE {count}TH PERSON TO SAY {word}!"),
+    Milestone.ends_with("420", 5, NICE),
+    Milestone.ends_with("69", 5, NICE),
+    Milestone.every(1000, 10, CONGRATULATIONS),
+    Milestone.every(100, 5, CONGRATULATIONS),
+]
+
+
+class MilestoneTracker:
+    """Finds milestones for a set of counters that only ever go up by one.
+
+    Each counter keeps the next count at which any milestone fires, so advance() costs
+    a single comparison until that count is reached. Only then are the rules checked,
+    and the next threshold is found from the rules' arithmetic rather than by testing
+    the counts in between.
+    """
+
+    def __init__(self, milestones: Sequence[Milestone]):
+        self.milestones: List[Milestone] = list(milestones)
+        self.next_at: Dict[str, int] = {}
+
+    def next_after(self, count: int) -> int:
+        return min(milestone.next_after(count) for milestone in self.milestones)
+
+    def milestone_at(self, count: int) -> Optional[Milestone]:
+        for milestone in self.milestones:
+            if count % milestone.modulus == milestone.remainder:
+                return milestone
+        return None
+
+    def advance(self, key: str, count: int) -> Optional[Milestone]:
+        """Returns the milestone `key` reached at `count`, if any."""
+        if count < self.next_at.get(key, 0):
+            return None
+        self.next_at[key] = self.next_after(count)
+        return self.milestone_at(count)
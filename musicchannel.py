@@ -6,6 +6,7 @@ import asyncio
 from urllib.parse import urlparse
 import re
 import logging
+from messagepipeline import get_pipeline, MessageContext, MODERATE
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -228,16 +229,20 @@ class MusicChannelCog(commands.Cog):
                 else:
                     raise
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    def cog_load(self):
+        get_pipeline(self.bot).add_stage("music_channel", self.filter_message, MODERATE, owner=self, bots=True)
+
+    def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
+
+    async def filter_message(self, ctx: MessageContext):
         # Keep original message filtering logic
-        if message.channel.name != "music":
-            if message.content.startswith("<@1073858663585947659>"):
-                await message.delete()
-        else:
-            if message.content.startswith("<@1073858663585947659>"):
-                if "https" not in message.content:
-                    await message.delete()
+        message = ctx.message
+        if not message.content.startswith("<@1073858663585947659>"):
+            return
+        if message.channel.name != "music" or "https" not in message.content:
+            await message.delete()
+            return True
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
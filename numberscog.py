@@ -1,25 +1,29 @@
-import json
+import asyncio
 import discord
 from discord.ext import commands
+from jsonstore import JsonStore
+from actions import get_scheduler, INTERACTIVE, BACKGROUND
 
 class NumberCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.sequential_counter = 1023  # Track the sequential counter separately
+        # Both files stay in memory; changes are written at most once per second
+        self.numbers_store = JsonStore('user_numbers.json', default={}, indent=4)
+        self.counter_store = JsonStore('sequential_counter.json', default={'counter': 1023}, indent=4)
+
+    async def cog_unload(self):
+        await self.numbers_store.close()
+        await self.counter_store.close()
 
     def load_sequential_counter(self):
-        """Load the sequential counter from file"""
-        try:
-            with open('sequential_counter.json', 'r') as f:
-                data = json.load(f)
-                self.sequential_counter = data.get('counter', 1023)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.sequential_counter = 1023
+        """Load the sequential counter from the in-memory document"""
+        self.sequential_counter = self.counter_store.data.get('counter', 1023)
 
     def save_sequential_counter(self):
-        """Save the sequential counter to file"""
-        with open('sequential_counter.json', 'w') as f:
-            json.dump({'counter': self.sequential_counter}, f, indent=4)
+        """Save the sequential counter (debounced write)"""
+        self.counter_store.data = {'counter': self.sequential_counter}
+        self.counter_store.mark_dirty()
 
     def get_next_sequential_number(self, user_numbers):
         """Get the next number in the sequential sequence (ignoring manually assigned high numbers)"""
@@ -37,19 +41,14 @@ class NumberCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
         
         if str(member.id) not in user_numbers:
             user_numbers[str(member.id)] = self.get_next_sequential_number(user_numbers)
         
-        with open('user_numbers.json', 'w') as f:
-            json.dump(user_numbers, f, indent=4)
+        self.numbers_store.mark_dirty()
         
-        await member.edit(nick=f'№{user_numbers[str(member.id)]}')
+        await get_scheduler(self.bot).edit_nick(member, f'№{user_numbers[str(member.id)]}', INTERACTIVE)
         
     @commands.command(aliases=['refreshn'])
     async def refresh_numbers(self, ctx):
@@ -59,28 +58,31 @@ class NumberCog(commands.Cog):
             await ctx.send("You do not have the required role to use this command.")
             return
 
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
 
         updated_numbers = {}
         count = 0
         removed = 0
 
+        # Bulk resync: every edit is submitted up front as background work, so the scheduler
+        # can pace the whole batch without crowding out commands
+        scheduler = get_scheduler(self.bot)
+        edits = []
         for member in ctx.guild.members:
             user_id = str(member.id)
             if user_id in user_numbers:
-                try:
-                    number = user_numbers[user_id]
-                    await member.edit(nick=f'№{number}')
-                    updated_numbers[user_id] = number
-                    count += 1
-                except discord.Forbidden:
-                    await ctx.send(f"Could not update nickname for {member.mention} (insufficient permissions).")
+                number = user_numbers[user_id]
+                edits.append((member, user_id, number, scheduler.edit_nick(member, f'№{number}', BACKGROUND)))
+
+        results = await asyncio.gather(*(future for _, _, _, future in edits), return_exceptions=True)
+        for (member, user_id, number, _), result in zip(edits, results):
+            if isinstance(result, discord.Forbidden):
+                await ctx.send(f"Could not update nickname for {member.mention} (insufficient permissions).")
+            elif isinstance(result, BaseException):
+                raise result
             else:
-                continue
+                updated_numbers[user_id] = number
+                count += 1
 
         # Remove users from JSON who are no longer in the server
         for user_id in list(user_numbers.keys()):
@@ -88,8 +90,8 @@ class NumberCog(commands.Cog):
                 removed += 1
 
         # Save updated file
-        with open('user_numbers.json', 'w') as f:
-            json.dump(updated_numbers, f, indent=4)
+        self.numbers_store.data = updated_numbers
+        self.numbers_store.mark_dirty()
 
         await ctx.send(f"Refreshed numbers for {count} members. Removed {removed} entries for users no longer in the server.")
 
@@ -97,11 +99,7 @@ class NumberCog(commands.Cog):
     @commands.command()
     async def ln(self, ctx, number: int):
         """Locates and mentions the user with the specified number."""
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
         
         # Find the user with the specified number
         user_id = None
@@ -122,11 +120,7 @@ class NumberCog(commands.Cog):
     @commands.command()
     async def nn(self, ctx):
         """Checks the next number available."""
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
         
         # Sync with current server nicknames first
         for member in ctx.guild.members:
@@ -137,8 +131,7 @@ class NumberCog(commands.Cog):
                 except (ValueError, IndexError):
                     pass
         
-        with open('user_numbers.json', 'w') as f:
-            json.dump(user_numbers, f, indent=4)
+        self.numbers_store.mark_dirty()
         
         # Show what the next sequential number would be (without actually assigning it)
         self.load_sequential_counter()
@@ -156,21 +149,16 @@ class NumberCog(commands.Cog):
             await ctx.send("You do not have the required role to use this command.")
             return
         
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
         
         if number in user_numbers.values():
             await ctx.send(f"№{number} is already taken")
             return
         
         user_numbers[str(member.id)] = number
-        with open('user_numbers.json', 'w') as f:
-            json.dump(user_numbers, f, indent=4)
+        self.numbers_store.mark_dirty()
         
-        await member.edit(nick=f'№{number}')
+        await get_scheduler(self.bot).edit_nick(member, f'№{number}', INTERACTIVE)
         await ctx.send(f"Assigned №{number} to {member.mention}")
 
     @commands.command()
@@ -181,11 +169,7 @@ class NumberCog(commands.Cog):
             await ctx.send("You do not have the required role to use this command.")
             return
         
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
         
         # Check if the user has a number assigned
         if str(member.id) not in user_numbers:
@@ -216,29 +200,23 @@ class NumberCog(commands.Cog):
             user_numbers[str(member.id)] = next_number
             
             # Save the updated numbers
-            with open('user_numbers.json', 'w') as f:
-                json.dump(user_numbers, f, indent=4)
+            self.numbers_store.mark_dirty()
             
             # Update the member's nickname
             try:
-                await member.edit(nick=f'№{next_number}')
+                await get_scheduler(self.bot).edit_nick(member, f'№{next_number}', INTERACTIVE)
                 await ctx.send(f"Removed №{old_number} from {member.mention} and assigned them №{next_number}")
             except discord.Forbidden:
                 await ctx.send(f"Removed №{old_number} from {member.mention} and assigned them №{next_number}, but couldn't update their nickname (insufficient permissions)")
         else:
             # Member is not in the server, just remove their number
-            with open('user_numbers.json', 'w') as f:
-                json.dump(user_numbers, f, indent=4)
+            self.numbers_store.mark_dirty()
             await ctx.send(f"Removed №{old_number} from {member.mention} (user not in server)")
 
     @commands.command()
     async def d(self, ctx):
         """Checks for duplicate numbers and prints all duplicates in the chat."""
-        with open('user_numbers.json', 'r') as f:
-            try:
-                user_numbers = json.load(f)
-            except json.JSONDecodeError:
-                user_numbers = {}
+        user_numbers = self.numbers_store.data
         
         number_counts = {}
         duplicates = []
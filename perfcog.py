@@ -0,0 +1,170 @@
+import io
+import os
+import time
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+from eventrecorder import EventRecorder
+from loopwatchdog import get_watchdog
+from metrics import get_metrics
+from samplingprofiler import MAX_DURATION, profile
+
+METRICS_HOST = "127.0.0.1"  # Local only; put a proxy in front to scrape from elsewhere
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+
+class PerfCog(commands.Cog):
+    """Instruments the other loaded cogs and reports their timings and event loop stalls.
+
+    Add it after every other cog so instrument() sees all of their listeners and commands.
+    Serves the same numbers in Prometheus text format at http://127.0.0.1:METRICS_PORT/metrics.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.metrics = get_metrics(bot)
+        self.watchdog = get_watchdog(bot)
+        self._runner = None
+        self._profiling = False
+        self.recorder = None
+
+    async def cog_load(self):
+        self.metrics.instrument(self.bot)
+        self.watchdog.start()
+        app = web.Application()
+        app.router.add_get("/metrics", self.serve_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, METRICS_HOST, METRICS_PORT).start()
+            print(f"[PerfCog] Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"[PerfCog] Could not serve metrics on port {METRICS_PORT}: {e}")
+
+    async def cog_unload(self):
+        self.watchdog.stop()
+        if self.recorder is not None:
+            await self.recorder.stop()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def serve_metrics(self, request: web.Request) -> web.Response:
+        text = self.metrics.render_prometheus() + self._render_runtime()
+        return web.Response(text=text, content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    def _render_runtime(self) -> str:
+        lines = [
+            "# HELP nab_loop_stalls_total Event loop stalls over the watchdog threshold.",
+            "# TYPE nab_loop_stalls_total counter",
+            f"nab_loop_stalls_total {self.watchdog.stalls}",
+            "# HELP nab_loop_stalled_seconds_total Time the event loop spent stalled.",
+            "# TYPE nab_loop_stalled_seconds_total counter",
+            f"nab_loop_stalled_seconds_total {self.watchdog.stalled_seconds:.6f}",
+        ]
+        pipeline = getattr(self.bot, "message_pipeline", None)
+        if pipeline is not None:
+            lines += ["# HELP nab_pipeline_stage_stops_total Messages a pipeline stage stopped.",
+                      "# TYPE nab_pipeline_stage_stops_total counter"]
+            for name, _, _, _, stops, _ in pipeline.stats():
+                lines.append(f'nab_pipeline_stage_stops_total{{stage="{name}"}} {stops}')
+        scheduler = getattr(self.bot, "action_scheduler", None)
+        if scheduler is not None:
+            lines += ["# HELP nab_action_queue_depth REST actions waiting in the scheduler.",
+                      "# TYPE nab_action_queue_depth gauge"]
+            for kind, by_priority in sorted(scheduler.queue_depths().items()):
+                for priority, depth in by_priority.items():
+                    lines.append(f'nab_action_queue_depth{{route="{kind}",priority="{priority}"}} {depth}')
+        return "\n".join(lines) + "\n"
+
+    @app_commands.command(name="perf", description="Show listener and command latency per cog (owner only).")
+    async def perf(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("This command can only be used by the bot owner.", ephemeral=True)
+            return
+
+        rows = self.metrics.summary()[:20]
+        lines = [
+            f"`{cog}.{event}` n={count} p50={p50 * 1000:.1f} p99={p99 * 1000:.1f} max={peak * 1000:.1f}ms"
+            + (f" **{errors} err**" if errors else "")
+            for cog, event, count, p50, _, p99, peak, errors in rows
+        ]
+        embed = discord.Embed(title="Performance", description="\n".join(lines) or "No samples yet.",
+                              color=discord.Color.blue())
+        rest = sorted(self.metrics.rest_calls.items(), key=lambda item: item[1], reverse=True)
+        if rest:
+            embed.add_field(name="REST calls", value="\n".join(f"`{cog}`: {count}" for cog, count in rest[:10]),
+                            inline=False)
+        embed.set_footer(text=f"Sorted by total time · Prometheus: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.command(name="stalls")
+    @commands.is_owner()
+    async def stalls(self, ctx, action: str = None):
+        """Shows where the event loop blocked for longer than the watchdog threshold. `~stalls reset` clears it."""
+        if action == "reset":
+            self.watchdog.reset()
+            await ctx.send("Stall report cleared.")
+            return
+        rows = self.watchdog.report()
+        lines = [
+            f"`{ours}` → `{inner}`\n{count}× total {total * 1000:.0f}ms, max {peak * 1000:.0f}ms"
+            for ours, inner, count, total, peak in rows
+        ]
+        embed = discord.Embed(title="Event Loop Stalls", description="\n".join(lines) or "No stalls recorded.",
+                              color=discord.Color.orange())
+        embed.set_footer(text=f"{self.watchdog.stalls} stalls, {self.watchdog.stalled_seconds:.2f}s blocked "
+                              f"(threshold {self.watchdog.threshold * 1000:.0f}ms)")
+        if rows:
+            stacks = discord.File(io.BytesIO(self.watchdog.stack_dump().encode()), filename="stalls.txt")
+            await ctx.send(embed=embed, file=stacks)
+        else:
+            await ctx.send(embed=embed)
+
+    @commands.command(name="profile")
+    @commands.is_owner()
+    async def profile(self, ctx, seconds: int = 30):
+        """Samples the live bot for N seconds and uploads a collapsed-stack file for flamegraph.pl or speedscope."""
+        if self._profiling:
+            await ctx.send("A profile is already running.")
+            return
+        seconds = max(1, min(seconds, MAX_DURATION))
+        self._profiling = True
+        try:
+            await ctx.send(f"Profiling for {seconds}s...")
+            profiler = await profile(self.bot, seconds)
+        finally:
+            self._profiling = False
+        total = profiler.sample_count or 1
+        lines = [f"`{tag}`: {count / total:.1%}" for tag, count in profiler.top_tags()]
+        embed = discord.Embed(title="Profile", description="\n".join(lines) or "No samples.",
+                              color=discord.Color.blue())
+        embed.set_footer(text=f"{profiler.sample_count} samples over {seconds}s")
+        folded = discord.File(io.BytesIO(profiler.collapsed().encode()), filename=f"profile-{int(time.time())}.folded")
+        await ctx.send(embed=embed, file=folded)
+
+    @commands.command(name="record")
+    @commands.is_owner()
+    async def record(self, ctx, action: str = "status", path: str = "events.jsonl"):
+        """Records gateway events for replay.py: `~record start [file]`, `~record stop` or `~record status`."""
+        if action == "start":
+            if self.recorder is not None and self.recorder.recording:
+                await ctx.send(f"Already recording to `{self.recorder.path}`.")
+                return
+            self.recorder = EventRecorder(self.bot, path)
+            self.recorder.start()
+            await ctx.send(f"Recording messages, reactions, voice and member events to `{path}`.")
+        elif action == "stop":
+            if self.recorder is None or not self.recorder.recording:
+                await ctx.send("Not recording.")
+                return
+            await self.recorder.stop()
+            await ctx.send(f"Stopped: {self.recorder.events} events in `{self.recorder.path}`.")
+        elif self.recorder is not None and self.recorder.recording:
+            await ctx.send(f"Recording to `{self.recorder.path}`: {self.recorder.events} events so far.")
+        else:
+            await ctx.send("Not recording.")
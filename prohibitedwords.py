@@ -1,34 +1,68 @@
-import json
-import os
-
+import asyncio
 import discord
 from discord.ext import commands
+from storage import get_storage
+from messagepipeline import get_pipeline, MessageContext, MODERATE
+from wordmatcher import WordMatcher, normalize
+from deletequeue import DeleteQueue
 
 class ProhibitedWordsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.bad_words = []
+        self.matcher = WordMatcher([])
+        self._rebuild_lock = asyncio.Lock()
+        self.deletes = DeleteQueue(bot)
         self.enabled = False
-        self.load_words()
-    
-    def load_words(self):
-        if os.path.exists("prohibited_words.json"):
-            with open("prohibited_words.json", "r") as f:
-                self.bad_words = json.load(f)
+
+    async def load_words(self):
+        storage = await get_storage(self.bot)
+        await storage.import_json("prohibitedwords", "prohibited_words.json", key="bad_words")
+        self.kv = storage.namespace("prohibitedwords")
+        self.bad_words = await self.kv.get("bad_words", [])
+        await self.rebuild_matcher()
 
     def save_words(self):
-        with open("prohibited_words.json", "w") as f:
-            json.dump(self.bad_words, f)
+        self.kv.set("bad_words", self.bad_words)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author == self.bot.user or not self.enabled:
+    async def rebuild_matcher(self):
+        """Builds a matcher for the current list in a thread and swaps it in with one assignment.
+        Messages keep being checked against the old one meanwhile; large lists take a while."""
+        async with self._rebuild_lock:  # Rebuilds finish in order, so the latest list always lands last
+            patterns = [normalize(word) for word in self.bad_words]
+            self.matcher = await asyncio.to_thread(WordMatcher, patterns)
+
+    async def cog_load(self):
+        await self.load_words()
+        get_pipeline(self.bot).add_stage("prohibited_words", self.check_message, MODERATE, owner=self, bots=True)
+
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
+        await self.deletes.close()
+        await self.kv.storage.flush()
+
+    def is_prohibited(self, content: str) -> bool:
+        # Normalized once, then one pass over the text however long the list is
+        return self.matcher.search(normalize(content)) is not None
+
+    async def check_message(self, ctx: MessageContext):
+        if not self.enabled:
             return
 
-        for word in self.bad_words:
-            if word in message.content:
-                await message.delete()
-                break
+        if self.is_prohibited(ctx.message.content):
+            # Queued rather than awaited: during a raid, hits in a channel go out as bulk deletes
+            self.deletes.add(ctx.message)
+            return True  # Nothing else should act on a message being deleted
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+        """Edited messages get the same check, so a word can't be slipped in after the message passed."""
+        if not self.enabled or after.guild is None or after.author == self.bot.user:
+            return
+        if before.content == after.content:
+            return  # Embed or pin updates, not a new text
+        if self.is_prohibited(after.content):
+            self.deletes.add(after)
 
     @commands.group(name="prohibited", aliases=["profanity"])
     @commands.has_any_role("I", "II", "III")
@@ -39,7 +73,14 @@ class ProhibitedWordsCog(commands.Cog):
 
     @prohibited_group.command(name="add")
     async def prohibited_add(self, ctx, *, word: str):
+        if not normalize(word):
+            await ctx.send(f"`{word}` has no matchable characters")
+            return
+        if word in self.bad_words:
+            await ctx.send(f"`{word}` is already in the prohibited words list")
+            return
         self.bad_words.append(word)
+        await self.rebuild_matcher()
         self.save_words()
         await ctx.send(f"Added `{word}` to the prohibited words list")
 
@@ -47,6 +88,7 @@ class ProhibitedWordsCog(commands.Cog):
     async def prohibited_remove(self, ctx, *, word: str):
         if word in self.bad_words:
             self.bad_words.remove(word)
+            await self.rebuild_matcher()
             self.save_words()
             await ctx.send(f"Removed `{word}` from the prohibited words list")
         else:
@@ -57,6 +99,15 @@ class ProhibitedWordsCog(commands.Cog):
         words = ", ".join(self.bad_words)
         await ctx.send(f"Prohibited words: {words}")
 
+    @prohibited_group.command(name="stats")
+    async def prohibited_stats(self, ctx):
+        stats = self.deletes.stats
+        await ctx.send(
+            f"Deleted {stats.deleted} of {stats.queued} matched messages ({len(self.deletes)} queued): "
+            f"{stats.bulk_deleted} in {stats.bulk_requests} bulk deletes, {stats.single_deleted} singly, "
+            f"{stats.failed} failed. Largest batch {stats.largest_batch}, {stats.rate:.1f} deletions/s while busy."
+        )
+
     @prohibited_group.command(name="on")
     async def prohibited_on(self, ctx):
         self.enabled = True
@@ -0,0 +1,400 @@
+"""Replays a recording from EventRecorder through the real cogs, offline.
+
+    python replay.py events.jsonl [--cogs ReputationCog,WordCounter,AutoDelete] [--repeat N]
+                                  [--data-dir DIR] [--copy autodelete.json ...]
+
+Events are awaited one at a time, in recorded order, against fake guilds, members,
+channels and messages. Every REST call the cogs make lands in a stub that only counts
+it. Cogs read and write their data files in --data-dir (a fresh temporary directory
+by default), never the live ones; --copy seeds it with files such as a channel config.
+Timestamps are not replayed, so the cogs see the current clock.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+from metrics import get_metrics
+
+# Cog class -> module, for every cog that handles recorded events
+COGS = {
+    "ReputationCog": "reputationcog",
+    "WordCounter": "wordcog",
+    "AutoDelete": "autodelete",
+    "Cog1": "cog1",
+    "LQCog": "LQCog",
+    "ProhibitedWordsCog": "prohibitedwords",
+    "WordReactions": "wordreactions",
+    "InactivityCog": "inactivitycog",
+    "NumberCog": "numberscog",
+    "BoostCog": "boostcog",
+    "RoleTracker": "roletrackercog",
+}
+DEFAULT_COGS = "ReputationCog,WordCounter,AutoDelete"
+
+# Record kind -> the discord.py event it replays as
+EVENTS = {
+    "message": "on_message",
+    "reaction_add": "on_reaction_add",
+    "reaction_remove": "on_reaction_remove",
+    "voice": "on_voice_state_update",
+    "member_join": "on_member_join",
+    "member_update": "on_member_update",
+    "member_remove": "on_member_remove",
+}
+
+
+# -----------------
+# Fakes
+# -----------------
+class StubRest:
+    """Stands in for Discord's REST API: counts each call and returns nothing."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+
+    async def call(self, name: str, result: Any = None) -> Any:
+        self.calls[name] += 1
+        return result
+
+    async def request(self, route, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str, guild: "FakeGuild"):
+        self.id = role_id
+        self.name = name
+        self.guild = guild
+        self.mention = f"<@&{role_id}>"
+
+    def is_default(self) -> bool:
+        return self.id == self.guild.id
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, rest: StubRest, owner_id: int = 0):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.owner_id = owner_id
+        self.rest = rest
+        self.roles_by_id: Dict[int, FakeRole] = {}
+        self.members: Dict[int, "FakeMember"] = {}
+        self.channels: Dict[int, "FakeChannel"] = {}
+
+    @property
+    def roles(self) -> List[FakeRole]:
+        return list(self.roles_by_id.values())
+
+    def role(self, role_id: int) -> FakeRole:
+        role = self.roles_by_id.get(role_id)
+        if role is None:
+            role = self.roles_by_id[role_id] = FakeRole(role_id, str(role_id), self)
+        return role
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles_by_id.get(role_id)
+
+    def get_member(self, user_id: int) -> Optional["FakeMember"]:
+        return self.members.get(user_id)
+
+    def get_channel(self, channel_id: int) -> Optional["FakeChannel"]:
+        return self.channels.get(channel_id)
+
+
+class FakeMember:
+    def __init__(self, record: Dict[str, Any], guild: Optional[FakeGuild], rest: StubRest):
+        self.id = record["i"]
+        self.name = record.get("n", str(self.id))
+        self.nick = record.get("d")
+        self.bot = bool(record.get("b"))
+        self.guild = guild
+        self.rest = rest
+        self.roles = [guild.role(role_id) for role_id in record.get("r", [])] if guild else []
+        self.guild_permissions = discord.Permissions.none()
+        self.mention = f"<@{self.id}>"
+        self.voice: Optional["FakeVoiceState"] = None
+
+    @property
+    def display_name(self) -> str:
+        return self.nick or self.name
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    async def send(self, *args, **kwargs):
+        return await self.rest.call("dm")
+
+    async def edit(self, **kwargs):
+        if "nick" in kwargs:
+            self.nick = kwargs["nick"]
+        return await self.rest.call("member_edit")
+
+    async def add_roles(self, *roles, **kwargs):
+        self.roles.extend(role for role in roles if role not in self.roles)
+        return await self.rest.call("add_roles")
+
+    async def remove_roles(self, *roles, **kwargs):
+        self.roles = [role for role in self.roles if role not in roles]
+        return await self.rest.call("remove_roles")
+
+    async def kick(self, **kwargs):
+        return await self.rest.call("kick")
+
+    async def ban(self, **kwargs):
+        return await self.rest.call("ban")
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, guild: Optional[FakeGuild], rest: StubRest):
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.guild = guild
+        self.rest = rest
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> "FakeMessage":
+        await self.rest.call("send")
+        return FakeMessage(0, content or "", None, self, self.rest)
+
+    async def delete_messages(self, messages, **kwargs):
+        return await self.rest.call("bulk_delete")
+
+    async def purge(self, **kwargs):
+        return await self.rest.call("purge", [])
+
+    async def fetch_message(self, message_id: int):
+        raise discord.NotFound(_FakeResponse(), "Unknown Message")
+
+    async def history(self, **kwargs):
+        return
+        yield
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, content: str, author: Optional[FakeMember], channel: FakeChannel,
+                 rest: StubRest, pinned: bool = False, mentions: Optional[List[FakeMember]] = None,
+                 reference: Optional[int] = None):
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.rest = rest
+        self.pinned = pinned
+        self.mentions = mentions or []
+        self.reference = discord.MessageReference(message_id=reference, channel_id=channel.id) if reference else None
+        self.created_at = datetime.now(timezone.utc)
+        self.jump_url = f"https://discord.com/channels/{self.guild.id if self.guild else '@me'}/{channel.id}/{message_id}"
+        self.attachments = []
+        self.embeds = []
+
+    async def delete(self, **kwargs):
+        return await self.rest.call("delete_message")
+
+    async def add_reaction(self, emoji):
+        return await self.rest.call("add_reaction")
+
+    async def reply(self, *args, **kwargs):
+        return await self.rest.call("send")
+
+    async def edit(self, **kwargs):
+        return await self.rest.call("edit_message")
+
+
+class FakeReaction:
+    def __init__(self, message: FakeMessage, emoji):
+        self.message = message
+        self.emoji = emoji
+        self.count = 1
+
+
+class FakeVoiceState:
+    def __init__(self, record: List, guild: FakeGuild, world: "World"):
+        channel_id, self_deaf, deaf, self_mute = record
+        self.channel = world.channel(channel_id, guild) if channel_id else None
+        self.self_deaf = bool(self_deaf)
+        self.deaf = bool(deaf)
+        self.self_mute = bool(self_mute)
+        self.mute = False
+        self.self_stream = False
+        self.afk = False
+
+
+class _FakeResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class World:
+    """Builds (and caches) fakes from records, so ids map to the same objects throughout a replay."""
+
+    def __init__(self, rest: StubRest):
+        self.rest = rest
+        self.guilds: Dict[int, FakeGuild] = {}
+        self.channels: Dict[int, FakeChannel] = {}
+        self.messages: Dict[int, FakeMessage] = {}
+
+    def guild(self, guild_id: Optional[int]) -> Optional[FakeGuild]:
+        if guild_id is None:
+            return None
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(guild_id, self.rest)
+        return guild
+
+    def channel(self, channel_id: int, guild: Optional[FakeGuild]) -> FakeChannel:
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id, guild, self.rest)
+            if guild is not None:
+                guild.channels[channel_id] = channel
+        return channel
+
+    def member(self, record: Dict[str, Any], guild: Optional[FakeGuild]) -> FakeMember:
+        # Members are rebuilt from each record, so roles and nick are as of that event
+        member = FakeMember(record, guild, self.rest)
+        if guild is not None:
+            guild.members[member.id] = member
+        return member
+
+    def build(self, record: Dict[str, Any]) -> Optional[Tuple]:
+        """Returns the listener arguments for a record, or None for records that only update the world."""
+        kind = record["k"]
+        guild = self.guild(record.get("g"))
+        if kind == "guild":
+            guild.owner_id = record.get("o", 0)
+            for role_id, name in record.get("r", {}).items():
+                guild.role(int(role_id)).name = name
+            return None
+        if kind == "message":
+            channel = self.channel(record["c"], guild)
+            message = FakeMessage(
+                record["i"], record.get("x", ""), self.member(record["a"], guild), channel, self.rest,
+                pinned=bool(record.get("p")), mentions=[self.member(user, guild) for user in record.get("mn", [])],
+                reference=record.get("ref"),
+            )
+            self.messages[message.id] = message
+            return (message,)
+        if kind in ("reaction_add", "reaction_remove"):
+            message = self.messages.get(record["m"])
+            if message is None:
+                channel = self.channel(record["c"], guild)
+                message = FakeMessage(record["m"], "", self.member(record["ma"], guild), channel, self.rest)
+            emoji = record["e"]
+            if isinstance(emoji, list):
+                emoji = discord.PartialEmoji(name=emoji[0], id=emoji[1])
+            return FakeReaction(message, emoji), self.member(record["u"], guild)
+        if kind == "voice":
+            member = self.member(record["a"], guild)
+            before, after = FakeVoiceState(record["b"], guild, self), FakeVoiceState(record["f"], guild, self)
+            member.voice = after if after.channel else None
+            return member, before, after
+        if kind == "member_update":
+            return self.member(record["b"], guild), self.member(record["a"], guild)
+        if kind in ("member_join", "member_remove"):
+            return (self.member(record["a"], guild),)
+        return None
+
+
+# -----------------
+# Driver
+# -----------------
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+async def replay(records: List[Dict[str, Any]], cog_classes: List[type], repeat: int = 1):
+    bot = commands.Bot(command_prefix="~", intents=discord.Intents.none(), help_command=None)
+    await bot._async_setup_hook()  # Loop and ready event, without logging in
+    bot._ready.set()
+    rest = StubRest()
+    bot.http.request = rest.request
+
+    for cog_class in cog_classes:
+        await bot.add_cog(cog_class(bot))
+    metrics = get_metrics(bot)
+    metrics.instrument(bot)
+
+    counts: Counter = Counter()
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        world = World(rest)
+        for record in records:
+            args = world.build(record)
+            if args is None:
+                continue
+            counts[record["k"]] += 1
+            for listener in list(bot.extra_events.get(EVENTS[record["k"]], [])):
+                try:
+                    await listener(*args)
+                except Exception as e:
+                    errors += 1
+                    print(f"[Replay] {record['k']} listener failed: {e!r}")
+    elapsed = time.perf_counter() - started
+
+    total = sum(counts.values())
+    print(f"\nReplayed {total} events in {elapsed:.3f}s ({total / elapsed if elapsed else 0:,.0f} events/s), "
+          f"{errors} listener errors")
+    for kind, count in counts.most_common():
+        print(f"  {kind:<16} {count}")
+    print("\nHandler latency (ms):")
+    for cog, event, count, p50, p90, p99, peak, failed in metrics.summary():
+        print(f"  {cog + '.' + event:<44} n={count:<7} p50={p50 * 1000:.3f} p99={p99 * 1000:.3f} "
+              f"max={peak * 1000:.3f} errors={failed}")
+    print("\nStubbed REST calls:")
+    for call, count in rest.calls.most_common():
+        print(f"  {call:<30} {count}")
+
+    for name in list(bot.cogs):
+        await bot.remove_cog(name)  # Runs cog_unload, so buffered writes are timed as part of shutdown only
+    storage = getattr(bot, "storage", None)
+    if storage is not None:
+        await storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded gateway events through the cogs, offline.")
+    parser.add_argument("recording")
+    parser.add_argument("--cogs", default=DEFAULT_COGS, help=f"comma-separated, from: {', '.join(COGS)}")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the recording this many times")
+    parser.add_argument("--data-dir", help="where cogs keep their files (default: a new temporary directory)")
+    parser.add_argument("--copy", nargs="*", default=[], help="data files to copy into the data dir first")
+    args = parser.parse_args()
+
+    records = load_recording(args.recording)
+    # Imported before leaving the repo directory
+    cog_classes = [getattr(importlib.import_module(COGS[name]), name)
+                   for name in (name.strip() for name in args.cogs.split(",")) if name]
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="nab-replay-")
+    os.makedirs(data_dir, exist_ok=True)
+    for path in args.copy:
+        shutil.copy(path, data_dir)
+    os.chdir(data_dir)
+    print(f"[Replay] {len(records)} records, data in {data_dir}")
+    asyncio.run(replay(records, cog_classes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,52 @@
 import discord
 from discord.ext import commands
-import sqlite3
 import asyncio
 from discord import app_commands
 from typing import Optional, Tuple, List, Dict
 import math
+import os
+import time
 from datetime import datetime, timedelta, timezone
 from discord import PartialEmoji
 import zoneinfo # Added zoneinfo for robust timezone handling
 from discord.ext.commands import BucketType
+from collections import defaultdict
+from reputationstore import ReputationStore, decay_penalty
+from leaderboard import Leaderboard
+from trackers import ExpiringDict, UsageRecord, StreakRecord, RepeatRecord, ReactionQuota
+from messagepipeline import get_pipeline, MessageContext, TRACK
 
-# Define a type hint for the in-memory usage data
-# Key: (user_id, guild_id)
-# Value: { 'last_used': float (UTC timestamp), 'daily_count': int, 'current_date': str (EST/EDT YYYY-MM-DD) }
-UserUsageData = Dict[Tuple[int, int], Dict[str, any]]
+DAY = 86400
+MAX_VC_SESSION = timedelta(hours=12)  # Longer voice sessions are paid out and restarted in chunks of this length
+# Set REP_LAZY_DECAY=1 to settle inactivity decay when rows are touched instead of sweeping nightly
+LAZY_DECAY = os.getenv("REP_LAZY_DECAY", "").lower() in ("1", "true", "yes")
 
 class ReputationCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db_path = "reputation.db"
-        self.init_database()
-        self.tree = bot.tree  # Reference to the global app command tree
-        self.reaction_rep_tracker = {}  # Fixed: removed 'python' prefix
-        self.last_active = {}  # Track user activity for inactivity decay
-        self.repeated_messages = {} # Stores last message and timestamp for spam detection
-        #self.consecutive_rep_tracker = {}  # Initialize consecutive rep tracker  <-- REMOVE THIS
-
-        # Track consecutive ups/downs *for the receiver*
-        self.user_consecutive_tracker: Dict[Tuple[int, int], Dict[str, any]] = {}
-
-        # In-memory storage for command usage cooldowns and daily limits
-        # This data WILL be lost if the bot restarts.
-        self.user_usage_data: UserUsageData = {}
+        # False: inactivity_decay_loop sweeps inactive members nightly.
+        # True: decay is applied by the store when a row is touched, and the nightly job only resets leaderboards.
+        self.lazy_decay = LAZY_DECAY
+        self.store = ReputationStore(self.db_path, lazy_decay=self.lazy_decay)
+        # Every in-memory tracker expires entries after its TTL and is swept every sweep_interval seconds,
+        # so they stay proportional to recently active users. Sizes are reported by ~repmem.
+        # Activity for inactivity decay is kept on the reputation rows instead.
+        self.reaction_rep_tracker = ExpiringDict("reaction_rep_tracker", DAY)  # giver_id -> ReactionQuota (one EST day)
+        self.repeated_messages = ExpiringDict("repeated_messages", 120)  # user_id -> RepeatRecord (60s window)
+
+        # Track consecutive ups/downs *for the receiver*; a streak only resets when the direction changes.
+        # Streaks are saved in rep_streaks, so an evicted one is read back the next time it is needed.
+        self.user_consecutive_tracker = ExpiringDict("user_consecutive_tracker", 7 * DAY)  # (user_id, guild_id) -> StreakRecord
+
+        # In-memory storage for command usage cooldowns and daily limits, checked without touching the database.
+        # Changed keys are written behind to rep_usage/rep_streaks with the next flush and replayed on load.
+        self.user_usage_data = ExpiringDict("user_usage_data", DAY)  # (user_id, guild_id) -> UsageRecord
+        self.pending_usage: set = set()
+        self.pending_streaks: set = set()
+        self.sweep_interval = 60
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._decay_task: Optional[asyncio.Task] = None
 
         # Define reputation tiers and their impact values
         self.positive_tiers = [
@@ -51,9 +66,31 @@ class ReputationCog(commands.Cog):
         ]
 
         # NEW: Voice Channel Tracking
-        self.voice_join_times: Dict[Tuple[int, int], datetime] = {}  # Store user join times in VC (user_id, guild_id): datetime
-
-    def get_consecutive_multiplier(self, receiver_id: int, guild_id: int, is_increase: bool) -> Tuple[float, int]:
+        # Store user join times in VC (user_id, guild_id): datetime; removed on leave. Sessions reaching
+        # MAX_VC_SESSION are paid out by the sweep, so the TTL only drops joins whose leave was never seen.
+        self.voice_join_times = ExpiringDict("voice_join_times", MAX_VC_SESSION.total_seconds() + 3600)
+
+        # Write-behind buffer for passive rep changes, merged per (user_id, guild_id)
+        # and flushed in one transaction every flush_interval seconds or flush_max_entries keys.
+        self.pending_rep_deltas: Dict[Tuple[int, int], int] = {}
+        self.flush_interval = 0.25
+        self.flush_max_entries = 200
+        self.pending_passive_hours: List[Tuple[int, int, int, str]] = []
+        self.pending_activity: Dict[Tuple[int, int], float] = {}  # Latest activity timestamp per key, stored on rows in both modes
+        self._flush_wakeup = asyncio.Event()
+
+        # Passive rep ledger: (user_id, guild_id) -> (EST date, bitmask of EST hours already granted that day).
+        # Hydrated from rep_passive on load; new grants are persisted with the next flush.
+        self.passive_hours = ExpiringDict("passive_hours", DAY + 3600)
+
+        # Per-guild leaderboards of current members, loaded on first use and kept sorted on every write.
+        # While a guild's board is loading, score changes are recorded in _leaderboard_builds and replayed.
+        self.leaderboards: Dict[int, Leaderboard] = {}
+        self._leaderboard_builds: Dict[int, List[Tuple[int, int, bool]]] = {}
+        self._leaderboard_locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def get_consecutive_multiplier(self, receiver_id: int, guild_id: int, is_increase: bool) -> Tuple[float, int]:
         """
         Calculate the consecutive multiplier for reputation changes *for a specific receiver*.
         Returns (multiplier, consecutive_count) tuple.
@@ -61,40 +98,38 @@ class ReputationCog(commands.Cog):
         key = (receiver_id, guild_id)
         current_time = datetime.utcnow()
 
-        # Get existing tracking data
+        # Get existing tracking data, reading an evicted streak back from the store
         tracker = self.user_consecutive_tracker.get(key)
+        if tracker is None:
+            row = await self.store.get_streak(receiver_id, guild_id)
+            if row is not None:
+                last_direction, consecutive_count, last_used = row
+                tracker = StreakRecord(bool(last_direction), consecutive_count, datetime.utcfromtimestamp(last_used))
 
         if not tracker:
             # First time interaction for this receiver
-            self.user_consecutive_tracker[key] = {
-                'last_direction': is_increase,
-                'consecutive_count': 1,
-                'last_used': current_time
-            }
+            self.user_consecutive_tracker[key] = StreakRecord(is_increase, 1, current_time)
+            self.pending_streaks.add(key)
             return 1.0, 1
 
         # Check if the direction changed
-        if tracker['last_direction'] != is_increase:
+        if tracker.last_direction != is_increase:
             # Direction changed, reset to 1
-            self.user_consecutive_tracker[key] = {
-                'last_direction': is_increase,
-                'consecutive_count': 1,
-                'last_used': current_time
-            }
+            self.user_consecutive_tracker[key] = StreakRecord(is_increase, 1, current_time)
+            self.pending_streaks.add(key)
             return 1.0, 1
 
         # Same direction, increment consecutive count
-        consecutive_count = tracker['consecutive_count'] + 1
+        consecutive_count = tracker.consecutive_count + 1
         multiplier = 1.0 + (consecutive_count - 1) * 0.1  # 1.0, 1.1, 1.2, 1.3, etc.
 
         multiplier = min(multiplier, 3.0) # Cap at 3.0
 
         # Update tracker
-        self.user_consecutive_tracker[key] = {
-            'last_direction': is_increase,
-            'consecutive_count': consecutive_count,
-            'last_used': current_time
-        }
+        tracker.consecutive_count = consecutive_count
+        tracker.last_used = current_time
+        self.user_consecutive_tracker[key] = tracker
+        self.pending_streaks.add(key)
 
         return multiplier, consecutive_count
 
@@ -120,7 +155,7 @@ class ReputationCog(commands.Cog):
             await self._respond(interaction_or_ctx, reason) # Check rate limits BEFORE doing anything else
             return
 
-        author_rep = self.get_user_rep(giver.id, guild.id)
+        author_rep = await self.get_user_rep(giver.id, guild.id)
         author_tier, base_impact = self.get_tier_info(author_rep)
 
         # Track original base impact for display
@@ -138,14 +173,14 @@ class ReputationCog(commands.Cog):
             return
 
         # Get consecutive multiplier (using the *receiver's* history)
-        consecutive_multiplier, consecutive_count = self.get_consecutive_multiplier(receiver.id, guild.id, increase)
+        consecutive_multiplier, consecutive_count = await self.get_consecutive_multiplier(receiver.id, guild.id, increase)
 
         # Apply consecutive multiplier and round to nearest whole number
         final_impact = round(base_impact * consecutive_multiplier)
 
         self.update_rep_usage(giver.id, guild.id)
         delta = final_impact if increase else -final_impact
-        self.adjust_rep(receiver.id, guild.id, delta)
+        new_rep = await self.adjust_rep(receiver.id, guild.id, delta)
 
         # Create detailed embed
         embed = discord.Embed(
@@ -172,7 +207,6 @@ class ReputationCog(commands.Cog):
 
         embed.add_field(name="Calculation Breakdown", value=breakdown_text, inline=False)
 
-        new_rep = self.get_user_rep(receiver.id, guild.id)
         new_tier, _ = self.get_tier_info(new_rep)
         embed.add_field(name="New Score", value=f"{new_rep} ({new_tier})", inline=False)
 
@@ -189,6 +223,9 @@ class ReputationCog(commands.Cog):
 
     async def inactivity_decay_loop(self):
         await self.bot.wait_until_ready()
+        # Members who left while the bot was offline never reached on_member_remove
+        cleared = await self.store.clear_departed_activity(self.current_members())
+        print(f"[Inactivity Decay] Cleared activity for {cleared} departed members")
 
         while not self.bot.is_closed():
             now_est = self.get_current_est_datetime()
@@ -199,66 +236,189 @@ class ReputationCog(commands.Cog):
             wait_seconds = (next_run - now_est).total_seconds()
             await asyncio.sleep(wait_seconds)
 
+            if self.lazy_decay:
+                # Scores decay as rows are read; boards are rebuilt (and settled) on next use
+                self.leaderboards.clear()
+                print(f"[Inactivity Decay] Lazy mode, cleared cached leaderboards at {now_est}")
+                continue
+
             print(f"[Inactivity Decay] Running daily check at {now_est}")
+            await self.run_inactivity_decay()
 
-            for guild in self.bot.guilds:
-                for member in guild.members:
-                    if member.bot:
-                        continue
-
-                    user_id = member.id
-                    guild_id = guild.id
-                    last_seen = self.last_active.get(user_id)
-
-                    if not last_seen:
-                        continue  # No activity record
-
-                    days_inactive = (datetime.utcnow() - last_seen).days
-                    if days_inactive < 1:
-                        continue  # Still active
-
-                    current_rep = self.get_user_rep(user_id, guild_id)
-
-                    if current_rep <= 0:
-                        continue  # No rep to lose
-
-                    # Calculate how much to remove (doubling, capped at 50)
-                    penalty = 0
-                    for day in range(1, days_inactive + 1):
-                        step = 5 * (2 ** (day - 1))
-                        if penalty + step > 50:
-                            step = 50 - penalty
-                        penalty += step
-                        if penalty >= 50:
-                            break
-
-                    penalty = min(penalty, current_rep)
-                    self.adjust_rep(user_id, guild_id, -penalty)
-
-    def init_database(self):
-        """Initializes the SQLite database tables if they don't exist.
-        Only 'reputation' and 'rep_passive' tables are managed here now."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reputation (
-                user_id INTEGER,
-                guild_id INTEGER,
-                reputation INTEGER DEFAULT 0,
-                UNIQUE(user_id, guild_id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rep_passive (
-                user_id INTEGER,
-                guild_id INTEGER,
-                hour INTEGER,           -- Actual EST/EDT hour when rep was gained
-                date TEXT,              -- EST/EDT date when rep was gained
-                PRIMARY KEY (user_id, guild_id, hour, date)
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    @staticmethod
+    def get_decay_penalty(days_inactive: int) -> int:
+        """Rep lost at tonight's run after days_inactive days (doubling from 5, capped at 50)."""
+        return decay_penalty(days_inactive)
+
+    async def run_inactivity_decay(self):
+        """Applies the inactivity penalty to every inactive member in one statement and one transaction."""
+        started = time.perf_counter()
+
+        # Penalties are capped at the stored score and activity is buffered too, so pending writes must land first
+        await self.flush_rep_deltas()
+        # The store picks the inactive rows from their last_active, among current non-bot members only
+        decayed = await self.store.apply_decay(time.time(), self.current_members())
+        for user_id, guild_id, rep in decayed:
+            self._track_score(user_id, guild_id, rep, is_delta=False)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[Inactivity Decay] Charged {len(decayed)} inactive members in {elapsed_ms:.1f} ms")
+
+    def current_members(self) -> List[Tuple[int, int]]:
+        """Returns (user_id, guild_id) for every non-bot member of every guild the bot is in."""
+        return [(member.id, guild.id) for guild in self.bot.guilds for member in guild.members if not member.bot]
+
+    async def cog_load(self):
+        """Opens the reputation store (one connection on its own thread) when the cog is added."""
+        await self.store.open()
+        await self.load_passive_hours()
+        await self.load_rep_limits()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        self._sweep_task = asyncio.create_task(self._sweep_loop())
+        self._decay_task = asyncio.create_task(self.inactivity_decay_loop())  # Waits for ready itself
+        get_pipeline(self.bot).add_stage("reputation", self.process_message, TRACK, owner=self)
+
+    async def cog_unload(self):
+        # Also runs from bot.close(), so pending deltas are written on shutdown
+        get_pipeline(self.bot).remove_stages(self)
+        for task in (self._flush_task, self._sweep_task, self._decay_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self.flush_rep_deltas()
+        await self.store.close()
+
+    # --- Write-behind Rep Buffer ---
+    def queue_rep(self, user_id: int, guild_id: int, delta: int):
+        """Buffers a reputation change; it is written with the next batch flush."""
+        key = (user_id, guild_id)
+        self.pending_rep_deltas[key] = self.pending_rep_deltas.get(key, 0) + delta
+        self._track_score(user_id, guild_id, delta, is_delta=True)
+        if len(self.pending_rep_deltas) >= self.flush_max_entries:
+            self._flush_wakeup.set()
+
+    async def flush_rep_deltas(self):
+        """Writes all buffered reputation changes and passive-hour grants in a single transaction."""
+        await self.flush_rep_limits()
+        if not self.pending_rep_deltas and not self.pending_passive_hours and not self.pending_activity:
+            return
+        batch = self.pending_rep_deltas
+        passive_hours = self.pending_passive_hours
+        activity = self.pending_activity
+        self.pending_rep_deltas = {}
+        self.pending_passive_hours = []
+        self.pending_activity = {}
+        deltas = [(user_id, guild_id, delta) for (user_id, guild_id), delta in batch.items() if delta]
+        active_at = [(user_id, guild_id, ts) for (user_id, guild_id), ts in activity.items()]
+        try:
+            # Shielded so a cancelled flush loop can't drop a batch that is already queued
+            await asyncio.shield(self.store.apply_deltas(deltas, passive_hours, active_at))
+        except Exception as e:
+            print(f"[Rep Flush] Failed to write {len(deltas)} deltas, keeping them buffered: {e}")
+            for key, delta in batch.items():
+                self.pending_rep_deltas[key] = self.pending_rep_deltas.get(key, 0) + delta
+            self.pending_passive_hours[:0] = passive_hours
+            for key, ts in activity.items():
+                self.pending_activity.setdefault(key, ts)
+
+    async def flush_rep_limits(self):
+        """Writes the usage and streak records changed since the last flush."""
+        if not self.pending_usage and not self.pending_streaks:
+            return
+        usage_keys, streak_keys = self.pending_usage, self.pending_streaks
+        self.pending_usage, self.pending_streaks = set(), set()
+        usage = []
+        for key in usage_keys:
+            record = self.user_usage_data.get(key)
+            if record is not None:
+                usage.append((*key, record.last_used, record.daily_count, record.current_date))
+        streaks = []
+        for key in streak_keys:
+            record = self.user_consecutive_tracker.get(key)
+            if record is not None:
+                last_used = record.last_used.replace(tzinfo=timezone.utc).timestamp()
+                streaks.append((*key, record.last_direction, record.consecutive_count, last_used))
+        try:
+            await asyncio.shield(self.store.save_rep_limits(usage, streaks))
+        except Exception as e:
+            print(f"[Rep Flush] Failed to write {len(usage)} usage and {len(streaks)} streak records, retrying: {e}")
+            self.pending_usage |= usage_keys
+            self.pending_streaks |= streak_keys
+
+    async def load_rep_limits(self):
+        """Replays today's cooldowns/daily counts and recent streaks from the store."""
+        started = time.perf_counter()
+        streaks_since = time.time() - self.user_consecutive_tracker.ttl
+        usage, streaks = await self.store.load_rep_limits(self.get_current_est_date(), streaks_since)
+        for user_id, guild_id, last_used, daily_count, usage_date in usage:
+            self.user_usage_data[(user_id, guild_id)] = UsageRecord(last_used, daily_count, usage_date)
+        for user_id, guild_id, last_direction, consecutive_count, last_used in streaks:
+            record = StreakRecord(bool(last_direction), consecutive_count, datetime.utcfromtimestamp(last_used))
+            self.user_consecutive_tracker[(user_id, guild_id)] = record
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[Rep Limits] Restored {len(usage)} usage and {len(streaks)} streak records in {elapsed_ms:.1f} ms")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            await self.flush_rep_deltas()
+
+    # --- Tracker Eviction ---
+    @property
+    def trackers(self) -> List[ExpiringDict]:
+        return [
+            self.repeated_messages, self.reaction_rep_tracker,
+            self.user_consecutive_tracker, self.user_usage_data, self.voice_join_times, self.passive_hours,
+        ]
+
+    def sweep_trackers(self) -> int:
+        """Evicts expired entries from every tracker. Returns the number removed."""
+        return sum(tracker.sweep() for tracker in self.trackers)
+
+    def tracker_stats(self) -> List[Tuple[str, int, int]]:
+        """Returns (name, entries, approximate bytes) for each tracker."""
+        return [(tracker.name, len(tracker), tracker.memory_bytes()) for tracker in self.trackers]
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.settle_voice_sessions()
+            self.sweep_trackers()
+
+    def settle_voice_sessions(self):
+        """Pays out voice sessions that reached MAX_VC_SESSION. Members still connected start a new
+        session; joins whose leave was missed (e.g. across a gateway disconnect) are dropped unpaid."""
+        now = datetime.utcnow()
+        for key, join_time in list(self.voice_join_times.items()):
+            if now - join_time < MAX_VC_SESSION:
+                continue
+            self.voice_join_times.pop(key)
+            user_id, guild_id = key
+            guild = self.bot.get_guild(guild_id)
+            member = guild.get_member(user_id) if guild else None
+            if member is None or member.voice is None or member.voice.channel is None:
+                print(f"User {user_id} left VC in guild {guild_id} unseen; dropped their session.")
+                continue
+            self.award_vc_time(member, join_time, now)
+            self.voice_join_times[key] = now
+
+    @commands.command(name="repmem")
+    @commands.is_owner()
+    async def rep_memory(self, ctx):
+        """Shows how many entries each reputation tracker holds and roughly how much memory they use."""
+        stats = self.tracker_stats()
+        lines = [f"`{name}`: {entries} entries, {size / 1024:.1f} KiB" for name, entries, size in stats]
+        total = sum(size for _, _, size in stats)
+        embed = discord.Embed(title="Reputation Trackers", description="\n".join(lines), color=discord.Color.blue())
+        embed.set_footer(text=f"Total: {total / 1024:.1f} KiB")
+        await ctx.send(embed=embed)
 
     @staticmethod
     def get_vc_rep_gain(hour: int) -> int:
@@ -281,34 +441,30 @@ class ReputationCog(commands.Cog):
     def has_low_quality_role(self, member: discord.Member) -> bool:
         return any(role.name == "Low Quality" for role in member.roles)
 
-    def get_user_rep(self, user_id: int, guild_id: int) -> int:
-        """Retrieves a user's reputation score for a specific guild."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT reputation FROM reputation WHERE user_id = ? AND guild_id = ?', (user_id, guild_id))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else 0
+    async def get_user_rep(self, user_id: int, guild_id: int) -> int:
+        """Retrieves a user's reputation score for a specific guild, including buffered changes."""
+        # Snapshot the buffer before the read: anything flushed after this point is queued behind it
+        pending = self.pending_rep_deltas.get((user_id, guild_id), 0)
+        return await self.store.get_user_rep(user_id, guild_id) + pending
 
-    def set_user_rep(self, user_id: int, guild_id: int, rep: int):
+    async def set_user_rep(self, user_id: int, guild_id: int, rep: int):
         """Sets or updates a user's reputation score."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO reputation (user_id, guild_id, reputation)
-            VALUES (?, ?, ?)
-        ''', (user_id, guild_id, rep))
-        conn.commit()
-        conn.close()
-
-    def get_all_server_reps(self, guild_id: int) -> List[Tuple[int, int]]:
-        """Retrieves all user reputation scores for a given guild."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT user_id, reputation FROM reputation WHERE guild_id = ?', (guild_id,))
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        self.pending_rep_deltas.pop((user_id, guild_id), None)
+        self._track_score(user_id, guild_id, rep, is_delta=False)
+        await self.store.set_user_rep(user_id, guild_id, rep)
+
+    async def get_all_server_reps(self, guild_id: int) -> List[Tuple[int, int]]:
+        """Retrieves all user reputation scores for a given guild, including buffered changes."""
+        pending = {user_id: delta for (user_id, g_id), delta in self.pending_rep_deltas.items() if g_id == guild_id}
+        guild = self.bot.get_guild(guild_id)
+        member_ids = [member.id for member in guild.members if not member.bot] if guild else []
+        results = await self.store.get_all_server_reps(guild_id, member_ids)
+        if not pending:
+            return results
+        merged = dict(results)
+        for user_id, delta in pending.items():
+            merged[user_id] = merged.get(user_id, 0) + delta
+        return list(merged.items())
 
     def get_tier_info(self, rep: int) -> Tuple[str, int]:
         """Determines the reputation tier and its impact value based on a score."""
@@ -352,9 +508,9 @@ class ReputationCog(commands.Cog):
             # No record found, user can use the command
             return True, ""
 
-        last_used_timestamp = usage_record['last_used']
-        daily_count = usage_record['daily_count']
-        stored_date = usage_record['current_date']
+        last_used_timestamp = usage_record.last_used
+        daily_count = usage_record.daily_count
+        stored_date = usage_record.current_date
 
         # Check if it's a new day (EST/EDT) for the daily limit
         if stored_date != current_est_date:
@@ -376,7 +532,7 @@ class ReputationCog(commands.Cog):
         return True, ""
 
     def update_rep_usage(self, user_id: int, guild_id: int):
-        """Updates user's reputation command usage tracking in in-memory storage."""
+        """Updates user's reputation command usage tracking in in-memory storage; it is persisted with the next flush."""
         user_key = (user_id, guild_id)
         current_est_date = self.get_current_est_date()
         current_utc_timestamp = datetime.now(timezone.utc).timestamp()
@@ -386,14 +542,11 @@ class ReputationCog(commands.Cog):
 
         if not usage_record:
             # First time using a rep command for this user in this guild (in this bot session)
-            self.user_usage_data[user_key] = {
-                'last_used': current_utc_timestamp,
-                'daily_count': 1,
-                'current_date': current_est_date
-            }
+            self.user_usage_data[user_key] = UsageRecord(current_utc_timestamp, 1, current_est_date)
+            self.pending_usage.add(user_key)
         else:
-            daily_count = usage_record['daily_count']
-            stored_date = usage_record['current_date']
+            daily_count = usage_record.daily_count
+            stored_date = usage_record.current_date
 
             if stored_date != current_est_date:
                 # New day, reset daily count
@@ -402,11 +555,11 @@ class ReputationCog(commands.Cog):
                 # Same day, increment daily count
                 new_count = daily_count + 1
 
-            self.user_usage_data[user_key] = {
-                'last_used': current_utc_timestamp,
-                'daily_count': new_count,
-                'current_date': current_est_date
-            }
+            usage_record.last_used = current_utc_timestamp
+            usage_record.daily_count = new_count
+            usage_record.current_date = current_est_date
+            self.user_usage_data[user_key] = usage_record
+            self.pending_usage.add(user_key)
 
     # --- Passive Reputation Gain Logic (Still uses SQLite) ---
     def get_hourly_rep_gain(self, hour_index: int) -> int:
@@ -418,34 +571,88 @@ class ReputationCog(commands.Cog):
         rep = 1 + (hour_index - 1) * step
         return round(rep)
 
+    async def load_passive_hours(self):
+        """Hydrates the in-memory passive ledger with today's grants from rep_passive."""
+        current_est_date = self.get_current_est_date()
+        self.passive_hours = ExpiringDict("passive_hours", DAY + 3600)
+        for user_id, guild_id, hour in await self.store.get_passive_hours(current_est_date):
+            _, mask = self.passive_hours.get((user_id, guild_id), (current_est_date, 0))
+            self.passive_hours[(user_id, guild_id)] = (current_est_date, mask | (1 << hour))
+
+    def get_passive_hour_mask(self, user_id: int, guild_id: int, date: str) -> int:
+        """Returns the bitmask of EST hours a user was already granted passive rep for on date."""
+        stored_date, mask = self.passive_hours.get((user_id, guild_id), (date, 0))
+        return mask if stored_date == date else 0
+
     def has_received_hourly_rep(self, user_id: int, guild_id: int, hour: int, date: str) -> bool:
         """Checks if a user has already received passive rep for a specific hour on a given date."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 1 FROM rep_passive
-            WHERE user_id = ? AND guild_id = ? AND hour = ? AND date = ?
-        ''', (user_id, guild_id, hour, date))
-        exists = cursor.fetchone() is not None
-        conn.close()
-        return exists
+        return bool(self.get_passive_hour_mask(user_id, guild_id, date) & (1 << hour))
 
     def log_hourly_rep(self, user_id: int, guild_id: int, hour: int, date: str):
         """Logs that a user has received passive rep for a specific hour on a given date."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR IGNORE INTO rep_passive (user_id, guild_id, hour, date)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, guild_id, hour, date))
-        conn.commit()
-        conn.close()
-
-    def adjust_rep(self, user_id: int, guild_id: int, delta: int):
-        """Adjusts a user's reputation score by a given delta."""
-        current_rep = self.get_user_rep(user_id, guild_id)
-        new_rep = current_rep + delta
-        self.set_user_rep(user_id, guild_id, new_rep)
+        mask = self.get_passive_hour_mask(user_id, guild_id, date)
+        self.passive_hours[(user_id, guild_id)] = (date, mask | (1 << hour))
+        self.pending_passive_hours.append((user_id, guild_id, hour, date))
+
+    async def adjust_rep(self, user_id: int, guild_id: int, delta: int) -> int:
+        """Adjusts a user's reputation score by a given delta right away and returns the new score.
+        Use queue_rep for passive changes that don't need the result."""
+        pending = self.pending_rep_deltas.get((user_id, guild_id), 0)
+        self._track_score(user_id, guild_id, delta, is_delta=True)
+        return await self.store.adjust_rep(user_id, guild_id, delta) + pending
+
+    # --- Leaderboard ---
+    async def get_leaderboard(self, guild: discord.Guild) -> Leaderboard:
+        """Returns the guild's sorted leaderboard of current members, loading it the first time."""
+        board = self.leaderboards.get(guild.id)
+        if board is not None:
+            return board
+
+        async with self._leaderboard_locks[guild.id]:
+            board = self.leaderboards.get(guild.id)
+            if board is not None:
+                return board
+
+            ops = self._leaderboard_builds[guild.id] = []
+            try:
+                rows = await self.get_all_server_reps(guild.id)
+            finally:
+                del self._leaderboard_builds[guild.id]
+
+            board = Leaderboard((user_id, rep) for user_id, rep in rows if guild.get_member(user_id))
+            # Changes made while the rows were loading aren't in them
+            for user_id, value, is_delta in ops:
+                self._apply_score(board, guild, user_id, value, is_delta)
+            self.leaderboards[guild.id] = board
+            return board
+
+    def _track_score(self, user_id: int, guild_id: int, value: int, is_delta: bool):
+        """Mirrors a score change into the guild's leaderboard, if one is loaded or loading."""
+        ops = self._leaderboard_builds.get(guild_id)
+        if ops is not None:
+            ops.append((user_id, value, is_delta))
+            return
+        board = self.leaderboards.get(guild_id)
+        if board is not None:
+            self._apply_score(board, self.bot.get_guild(guild_id), user_id, value, is_delta)
+
+    @staticmethod
+    def _apply_score(board: Leaderboard, guild: Optional[discord.Guild], user_id: int, value: int, is_delta: bool):
+        # Only current members are ranked
+        if guild is None or guild.get_member(user_id) is None:
+            return
+        if is_delta:
+            board.add_score(user_id, value)
+        else:
+            board.set_score(user_id, value)
+
+    def _leaderboard_members(self, guild: discord.Guild, rows: List[Tuple[int, int]]) -> List[Tuple[discord.Member, int]]:
+        members = []
+        for user_id, rep in rows:
+            member = guild.get_member(user_id)
+            if member:
+                members.append((member, rep))
+        return members
 
     def has_booster_role(self, member: discord.Member) -> bool:
         return member.premium_since is not None
@@ -470,7 +677,11 @@ class ReputationCog(commands.Cog):
         user_id = user.id
         guild_id = ctx_or_interaction.guild.id if isinstance(ctx_or_interaction, commands.Context) else ctx_or_interaction.guild_id
 
-        rep = self.get_user_rep(user_id, guild_id)
+        # The leaderboard already holds the score of every ranked member, so only unranked users hit the store
+        board = await self.get_leaderboard(ctx_or_interaction.guild)
+        rep = board.get(user_id)
+        if rep is None:
+            rep = await self.get_user_rep(user_id, guild_id)
         tier, base_impact = self.get_tier_info(rep)
 
         # Determine embed color based on rep
@@ -499,6 +710,12 @@ class ReputationCog(commands.Cog):
         embed.add_field(name="Tier", value=tier, inline=True)
         embed.add_field(name="Raw Rep Power", value=str(base_impact), inline=True)
 
+        if user_id in board:
+            rank_info = f"#{board.rank(rep)} of {len(board)} ({board.percentile(rep):.1f}th percentile)"
+        else:
+            rank_info = "Unranked"
+        embed.add_field(name="Rank", value=rank_info, inline=True)
+
         boost_info = f"×{booster_multiplier} (Nitro Booster)" if is_booster else "×1 (No boost)"
         embed.add_field(name="Booster Multiplier", value=boost_info, inline=True)
 
@@ -515,22 +732,13 @@ class ReputationCog(commands.Cog):
     @commands.cooldown(rate=1, per=60, type=BucketType.user)
     async def rep_stats(self, ctx, page: int = 1):
         """Display reputation leaderboard with pagination."""
-        all_reps = self.get_all_server_reps(ctx.guild.id)
-
-        # Filter out users who are no longer in the server
-        server_reps = []
-        for user_id, rep in all_reps:
-            member = ctx.guild.get_member(user_id)
-            if member:
-                server_reps.append((member, rep))
+        # Sorted board of current members; pages are slices of it
+        board = await self.get_leaderboard(ctx.guild)
 
-        if not server_reps:
+        if not len(board):
             await ctx.send("No reputation data found for this server.", delete_after=30)
             return
 
-        # Sort by reputation (highest to lowest)
-        server_reps.sort(key=lambda x: x[1], reverse=True)
-
         if page == 1:
             # Page 1: Top 5 highest + Top 5 lowest
             embed = discord.Embed(
@@ -539,7 +747,7 @@ class ReputationCog(commands.Cog):
             )
 
             # Top 5 highest
-            top_5 = server_reps[:5]
+            top_5 = self._leaderboard_members(ctx.guild, board.top(5))
             top_text = ""
             for i, (member, rep) in enumerate(top_5, 1):
                 tier, _ = self.get_tier_info(rep)
@@ -548,8 +756,7 @@ class ReputationCog(commands.Cog):
             embed.add_field(name=" Top 5 Highest", value=top_text or "No data", inline=False)
 
             # Bottom 5 lowest
-            bottom_5 = server_reps[-5:]
-            bottom_5.reverse()  # Show lowest first
+            bottom_5 = self._leaderboard_members(ctx.guild, board.bottom(5))  # Lowest first
             bottom_text = ""
             for i, (member, rep) in enumerate(bottom_5, 1):
                 tier, _ = self.get_tier_info(rep)
@@ -558,7 +765,7 @@ class ReputationCog(commands.Cog):
             embed.add_field(name=" Bottom 5 Lowest", value=bottom_text or "No data", inline=False)
 
             # Calculate total pages for the full list (starting from page 2)
-            total_full_list_pages = math.ceil(len(server_reps) / 10)
+            total_full_list_pages = math.ceil(len(board) / 10)
             total_pages_display = total_full_list_pages + 1 # +1 for the overview page
             embed.set_footer(text=f"Page 1/{total_pages_display} - Use ~repstat <page> for full list")
 
@@ -567,8 +774,7 @@ class ReputationCog(commands.Cog):
             per_page = 10
             # Adjust start_idx because page 1 is the overview, full list starts from page 2
             start_idx = (page - 2) * per_page
-            end_idx = start_idx + per_page
-            page_data = server_reps[start_idx:end_idx]
+            page_data = self._leaderboard_members(ctx.guild, board.page(start_idx, per_page)) if start_idx >= 0 else []
 
             if not page_data:
                 await ctx.send("Page not found! Please enter a valid page number.", delete_after=30)
@@ -586,7 +792,7 @@ class ReputationCog(commands.Cog):
 
             embed.description = leaderboard_text
 
-            total_full_list_pages = math.ceil(len(server_reps) / 10)
+            total_full_list_pages = math.ceil(len(board) / 10)
             total_pages_display = total_full_list_pages + 1
             embed.set_footer(text=f"Page {page}/{total_pages_display}")
 
@@ -600,28 +806,19 @@ class ReputationCog(commands.Cog):
 
     async def rep_stats_interaction(self, interaction: discord.Interaction, page: int = 1):
         """Display reputation leaderboard with pagination for interactions."""
-        all_reps = self.get_all_server_reps(interaction.guild_id)
-
-        # Filter out users who are no longer in the server
-        server_reps = []
-        for user_id, rep in all_reps:
-            member = interaction.guild.get_member(user_id)
-            if member:
-                server_reps.append((member, rep))
+        # Sorted board of current members; pages are slices of it
+        board = await self.get_leaderboard(interaction.guild)
 
-        if not server_reps:
+        if not len(board):
             await interaction.response.send_message("No reputation data found for this server.", ephemeral=True)
             return
 
-        # Sort by reputation (highest to lowest)
-        server_reps.sort(key=lambda x: x[1], reverse=True)
-
         if page == 1:
             # Page 1: Top 5 highest + Top 5 lowest
             embed = discord.Embed(title=" Reputation Leaderboard - Overview", color=0x4169E1)
 
             # Top 5 highest
-            top_5 = server_reps[:5]
+            top_5 = self._leaderboard_members(interaction.guild, board.top(5))
             top_text = ""
             for i, (member, rep) in enumerate(top_5, 1):
                 tier, _ = self.get_tier_info(rep)
@@ -630,8 +827,7 @@ class ReputationCog(commands.Cog):
             embed.add_field(name=" Top 5 Highest", value=top_text or "No data", inline=False)
 
             # Bottom 5 lowest
-            bottom_5 = server_reps[-5:]
-            bottom_5.reverse()  # Show lowest first
+            bottom_5 = self._leaderboard_members(interaction.guild, board.bottom(5))  # Lowest first
             bottom_text = ""
             for i, (member, rep) in enumerate(bottom_5, 1):
                 tier, _ = self.get_tier_info(rep)
@@ -640,7 +836,7 @@ class ReputationCog(commands.Cog):
             embed.add_field(name=" Bottom 5 Lowest", value=bottom_text or "No data", inline=False)
 
             # Calculate total pages for the full list (starting from page 2)
-            total_full_list_pages = math.ceil(len(server_reps) / 10)
+            total_full_list_pages = math.ceil(len(board) / 10)
             total_pages_display = total_full_list_pages + 1  # +1 for the overview page
             embed.set_footer(text=f"Page 1/{total_pages_display} - Use /repstat <page> for full list")
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -650,8 +846,7 @@ class ReputationCog(commands.Cog):
             per_page = 10
             # Adjust start_idx because page 1 is the overview, full list starts from page 2
             start_idx = (page - 2) * per_page
-            end_idx = start_idx + per_page
-            page_data = server_reps[start_idx:end_idx]
+            page_data = self._leaderboard_members(interaction.guild, board.page(start_idx, per_page)) if start_idx >= 0 else []
 
             if not page_data:
                 await interaction.response.send_message("Page not found! Please enter a valid page number.", ephemeral=True)
@@ -666,7 +861,7 @@ class ReputationCog(commands.Cog):
 
             embed.description = leaderboard_text
 
-            total_full_list_pages = math.ceil(len(server_reps) / 10)
+            total_full_list_pages = math.ceil(len(board) / 10)
             total_pages_display = total_full_list_pages + 1
             embed.set_footer(text=f"Page {page}/{total_pages_display}")
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -695,7 +890,7 @@ class ReputationCog(commands.Cog):
             return
 
         # Get the rep impact from the author's current rep tier
-        author_rep = self.get_user_rep(ctx.author.id, ctx.guild.id)
+        author_rep = await self.get_user_rep(ctx.author.id, ctx.guild.id)
         author_tier, impact = self.get_tier_info(author_rep)
 
         if self.has_booster_role(ctx.author):
@@ -706,21 +901,20 @@ class ReputationCog(commands.Cog):
             return
 
         # Get consecutive multiplier (using the *receiver's* history)
-        consecutive_multiplier, consecutive_count = self.get_consecutive_multiplier(user.id, ctx.guild.id, True)
+        consecutive_multiplier, consecutive_count = await self.get_consecutive_multiplier(user.id, ctx.guild.id, True)
 
         # Apply consecutive multiplier and round to nearest whole number
         final_impact = round(impact * consecutive_multiplier)
 
         # Update usage tracking (in-memory)
         self.update_rep_usage(ctx.author.id, ctx.guild.id)
-        self.adjust_rep(user.id, ctx.guild.id, final_impact)  # Use final_impact here
+        new_rep = await self.adjust_rep(user.id, ctx.guild.id, final_impact)  # Use final_impact here
 
         embed = discord.Embed(
             title=" Reputation Increased",
             description=f"{user.mention} received **+{final_impact}** reputation from {ctx.author.mention}", # Use final_impact here
             color=0x00ff00
         )
-        new_rep = self.get_user_rep(user.id, ctx.guild.id)
         new_tier, _ = self.get_tier_info(new_rep)
         embed.add_field(name="New Score", value=f"{new_rep} ({new_tier})", inline=False)
 
@@ -751,7 +945,7 @@ class ReputationCog(commands.Cog):
             return
 
         # Get the rep impact from the author's current rep tier
-        author_rep = self.get_user_rep(ctx.author.id, ctx.guild.id)
+        author_rep = await self.get_user_rep(ctx.author.id, ctx.guild.id)
         author_tier, impact = self.get_tier_info(author_rep)
 
         if self.has_booster_role(ctx.author):
@@ -762,21 +956,20 @@ class ReputationCog(commands.Cog):
             return
 
         # Get consecutive multiplier (using the *receiver's* history)
-        consecutive_multiplier, consecutive_count = self.get_consecutive_multiplier(user.id, ctx.guild.id, False)
+        consecutive_multiplier, consecutive_count = await self.get_consecutive_multiplier(user.id, ctx.guild.id, False)
 
         # Apply consecutive multiplier and round to nearest whole number
         final_impact = round(impact * consecutive_multiplier)
 
         # Update usage tracking (in-memory)
         self.update_rep_usage(ctx.author.id, ctx.guild.id)
-        self.adjust_rep(user.id, ctx.guild.id, -final_impact) # Use -final_impact
+        new_rep = await self.adjust_rep(user.id, ctx.guild.id, -final_impact) # Use -final_impact
 
         embed = discord.Embed(
             title=" Reputation Decreased",
             description=f"{user.mention} lost **-{final_impact}** reputation from {ctx.author.mention}", # Use -final_impact
             color=0xff0000
         )
-        new_rep = self.get_user_rep(user.id, ctx.guild.id)
         new_tier, _ = self.get_tier_info(new_rep)
         embed.add_field(name="New Score", value=f"{new_rep} ({new_tier})", inline=False)
 
@@ -784,7 +977,7 @@ class ReputationCog(commands.Cog):
 
     async def silent_rep_penalty(self, user_id: int, guild_id: int, penalty: int):
         """Applies a silent reputation penalty for repeated messages."""
-        self.adjust_rep(user_id, guild_id, -penalty)
+        self.queue_rep(user_id, guild_id, -penalty)
         print(f"[Repeat Penalty] User {user_id} in guild {guild_id} lost {penalty} rep for repeated message.")
 
     @commands.Cog.listener()
@@ -821,39 +1014,32 @@ class ReputationCog(commands.Cog):
         current_date = self.get_current_est_date()
         tracker = self.reaction_rep_tracker.get(giver_id)
 
-        if not tracker or tracker["date"] != current_date:
-            tracker = {
-                "date": current_date,
-                "given": set(),
-                "taken": set()
-            }
+        if not tracker or tracker.date != current_date:
+            tracker = ReactionQuota(current_date)
             self.reaction_rep_tracker[giver_id] = tracker
 
         if emoji_obj in positive_emojis:
-            if receiver_id in tracker['given'] or len(tracker['given']) >= 5:
+            if receiver_id in tracker.given or len(tracker.given) >= 5:
                 return
-            tracker['given'].add(receiver_id)
-            self.adjust_rep(receiver_id, guild_id, 1)
+            tracker.given.add(receiver_id)
+            self.queue_rep(receiver_id, guild_id, 1)
 
         elif emoji_obj in negative_emojis:
-            if receiver_id in tracker['taken'] or len(tracker['taken']) >= 5:
+            if receiver_id in tracker.taken or len(tracker.taken) >= 5:
                 return
-            tracker['taken'].add(receiver_id)
-            self.adjust_rep(receiver_id, guild_id, -1)
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Listener for message events to handle passive rep gain and repeat message penalties."""
-        if message.author.bot or not message.guild:
-            return
-
-        user_id = message.author.id
-        guild_id = message.guild.id
-        content = message.content.strip()
+            tracker.taken.add(receiver_id)
+            self.queue_rep(receiver_id, guild_id, -1)
+
+    async def process_message(self, ctx: MessageContext):
+        """Pipeline stage for passive rep gain and repeat message penalties."""
+        message = ctx.message
+        user_id = ctx.author_id
+        guild_id = ctx.guild_id
+        content = ctx.text
         now_utc = datetime.utcnow()  # Use UTC for internal timestamp of repeated messages
 
-        # Track user activity for inactivity decay system
-        self.last_active[user_id] = now_utc
+        # Track user activity for inactivity decay system, per guild in both decay modes
+        self.pending_activity[(user_id, guild_id)] = time.time()
 
         # --- Repeated Message Penalty ---
         # Only consider messages longer than 20 characters
@@ -861,68 +1047,59 @@ class ReputationCog(commands.Cog):
             entry = self.repeated_messages.get(user_id)
 
             if entry:
-                delta = (now_utc - entry["timestamp"]).total_seconds()
-                if content == entry["last_message"] and delta <= 60:
-                    entry["count"] += 1
-                    entry["timestamp"] = now_utc
+                delta = (now_utc - entry.timestamp).total_seconds()
+                if content == entry.last_message and delta <= 60:
+                    entry.count += 1
+                    entry.timestamp = now_utc
+                    self.repeated_messages[user_id] = entry  # Refresh its TTL
 
                     # Start applying penalties from the 4th repeated message
-                    if entry["count"] >= 4:
-                        penalty = entry["count"] - 3  # 4th message = 1 rep loss, 5th = 2, etc.
+                    if entry.count >= 4:
+                        penalty = entry.count - 3  # 4th message = 1 rep loss, 5th = 2, etc.
                         await self.silent_rep_penalty(user_id, guild_id, penalty)
                 else:
                     # Message is different or outside the time window, reset tracking
-                    self.repeated_messages[user_id] = {
-                        "last_message": content,
-                        "timestamp": now_utc,
-                        "count": 1
-                    }
+                    self.repeated_messages[user_id] = RepeatRecord(content, now_utc)
             else:
                 # First message from this user to track
-                self.repeated_messages[user_id] = {
-                    "last_message": content,
-                    "timestamp": now_utc,
-                    "count": 1
-                }
+                self.repeated_messages[user_id] = RepeatRecord(content, now_utc)
 
         # --- Passive Hourly Rep Gain ---
         now_est = self.get_current_est_datetime()
         est_hour = now_est.hour
-        current_est_date = self.get_current_est_date()
+        current_est_date = now_est.strftime('%Y-%m-%d')
 
-        # Use a single database connection for both queries
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Already credited this hour: the common case, answered from memory with no I/O
+        hour_mask = self.get_passive_hour_mask(user_id, guild_id, current_est_date)
+        if hour_mask & (1 << est_hour):
+            return
+        hour_count = bin(hour_mask).count("1")
 
-        try:
-            cursor.execute('''
-                SELECT COUNT(DISTINCT hour)
-                FROM rep_passive
-                WHERE user_id = ? AND guild_id = ? AND date = ?
-            ''', (user_id, guild_id, current_est_date))
-            hour_count = cursor.fetchone()[0]
-
-            # Grant passive rep if less than 14 hours have been logged for the day
-            # and the user hasn't received rep for the current EST hour yet.
-            if hour_count < 14 and not self.has_received_hourly_rep(user_id, guild_id, est_hour, current_est_date):
-                hour_index = hour_count + 1  # This is the (N)th hour they are getting rep for today
-                gain = self.get_hourly_rep_gain(hour_index)
-                self.adjust_rep(user_id, guild_id, gain)
-                self.log_hourly_rep(user_id, guild_id, est_hour, current_est_date)
-                # print(f"User {user_id} gained {gain} rep for hour {est_hour} on {current_est_date}. Total hours today: {hour_index}")  # For debugging
-
-        finally:
-            conn.close()
+        # Grant passive rep if less than 14 hours have been logged for the day
+        if hour_count < 14:
+            hour_index = hour_count + 1  # This is the (N)th hour they are getting rep for today
+            gain = self.get_hourly_rep_gain(hour_index)
+            self.queue_rep(user_id, guild_id, gain)
+            self.log_hourly_rep(user_id, guild_id, est_hour, current_est_date)
+            # print(f"User {user_id} gained {gain} rep for hour {est_hour} on {current_est_date}. Total hours today: {hour_index}")  # For debugging
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        if not hasattr(self, "synced"):
-            await self.tree.sync()
-            self.synced = True
-            print("[Slash Commands Synced]")
-        if not hasattr(self, "inactivity_task_started"):
-            self.bot.loop.create_task(self.inactivity_decay_loop())
-            self.inactivity_task_started = True
+    async def on_member_join(self, member):
+        board = self.leaderboards.get(member.guild.id)
+        if board is not None:
+            # Members without a stored score join the board on their first change
+            rep = await self.get_user_rep(member.id, member.guild.id)
+            if rep:
+                board.set_score(member.id, rep)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        board = self.leaderboards.get(member.guild.id)
+        if board is not None:
+            board.remove(member.id)
+        # Only current members decay; a buffered timestamp would otherwise restore the record
+        self.pending_activity.pop((member.id, member.guild.id), None)
+        await self.store.clear_activity(member.id, member.guild.id)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -938,27 +1115,31 @@ class ReputationCog(commands.Cog):
 
         # User leaves a voice channel
         elif before.channel is not None and after.channel is None:
-            if key in self.voice_join_times:
-                join_time = self.voice_join_times[key]
-                del self.voice_join_times[key]
-                time_in_vc = datetime.utcnow() - join_time
-                minutes_in_vc = time_in_vc.total_seconds() / 60
-
-                # Award reputation (example: 1 rep per 10 minutes)
-                rep_gain = int(minutes_in_vc / 10)
-                if rep_gain > 0:
-                    self.adjust_rep(user_id, guild_id, rep_gain)
-                    print(f"User {user_id} gained {rep_gain} rep for being in VC for {minutes_in_vc:.2f} minutes.")
-
-                # Consider deafened/muted status (example)
-                if member.voice is not None: # Check if the user is still in a voice channel
-                    if member.voice.deaf or member.voice.mute:
-                        rep_loss = int(minutes_in_vc / 20) # Less rep if deafened/muted
-                        self.adjust_rep(user_id, guild_id, -rep_loss)
-                        print(f"User {user_id} lost {rep_loss} rep for being deafened/muted in VC for {minutes_in_vc:.2f} minutes.")
+            join_time = self.voice_join_times.pop(key)
+            if join_time is not None:
+                self.award_vc_time(member, join_time, datetime.utcnow())
             else:
                 print(f"User {user_id} left VC in guild {guild_id}, but no join time was recorded.") # Debugging
 
+    def award_vc_time(self, member: discord.Member, join_time: datetime, until: datetime):
+        """Queues the rep earned for time spent in voice between join_time and until."""
+        user_id = member.id
+        guild_id = member.guild.id
+        minutes_in_vc = (until - join_time).total_seconds() / 60
+
+        # Award reputation (example: 1 rep per 10 minutes)
+        rep_gain = int(minutes_in_vc / 10)
+        if rep_gain > 0:
+            self.queue_rep(user_id, guild_id, rep_gain)
+            print(f"User {user_id} gained {rep_gain} rep for being in VC for {minutes_in_vc:.2f} minutes.")
+
+        # Consider deafened/muted status (example)
+        if member.voice is not None: # Check if the user is still in a voice channel
+            if member.voice.deaf or member.voice.mute:
+                rep_loss = int(minutes_in_vc / 20) # Less rep if deafened/muted
+                self.queue_rep(user_id, guild_id, -rep_loss)
+                print(f"User {user_id} lost {rep_loss} rep for being deafened/muted in VC for {minutes_in_vc:.2f} minutes.")
+
 async def setup(bot):
     """Sets up the ReputationCog in the bot."""
     await bot.add_cog(ReputationCog(bot)) 
@@ -0,0 +1,389 @@
+import asyncio
+import sqlite3
+import functools
+import time
+import zoneinfo
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, date, time as dtime
+from typing import Iterable, List, Optional, Set, Tuple
+
+EST = zoneinfo.ZoneInfo("America/New_York")
+DECAY_RUN_TIME = dtime(0, 1)  # Daily inactivity decay runs at 00:01 EST/EDT
+
+
+def decay_penalty(days_inactive: int) -> int:
+    """Rep lost at a daily run after days_inactive days: 5, 15, 35, then 50 (closed form of the doubling sum, capped at 50)."""
+    if days_inactive < 1:
+        return 0
+    if days_inactive >= 4:
+        return 50
+    return 5 * (2 ** days_inactive - 1)
+
+
+def cumulative_decay(days_inactive: int) -> int:
+    """Total rep lost over the daily runs at 1..days_inactive days of inactivity."""
+    if days_inactive < 1:
+        return 0
+    if days_inactive <= 3:
+        return sum(decay_penalty(day) for day in range(1, days_inactive + 1))
+    return 55 + 50 * (days_inactive - 3)
+
+
+def _last_decay_run(ts: float) -> date:
+    """EST/EDT date of the most recent daily run at or before ts."""
+    moment = datetime.fromtimestamp(ts, EST)
+    run_date = moment.date()
+    if moment.time() < DECAY_RUN_TIME:
+        run_date -= timedelta(days=1)
+    return run_date
+
+
+def lazy_decay_owed(last_active: float, applied_at: Optional[float], until: float) -> Tuple[int, int]:
+    """Returns (runs, penalty) for the daily runs between applied_at and until that a user
+    last active at last_active would have been charged by the nightly sweep."""
+    first_run_date = _last_decay_run(applied_at or last_active) + timedelta(days=1)
+    runs = (_last_decay_run(until) - first_run_date).days + 1
+    if runs <= 0:
+        return 0, 0
+    first_run = datetime.combine(first_run_date, DECAY_RUN_TIME, EST).timestamp()
+    first_days = int((first_run - last_active) // 86400)
+    return runs, cumulative_decay(first_days + runs - 1) - cumulative_decay(first_days - 1)
+
+
+class ReputationStore:
+    """Async access to reputation.db through one long-lived connection.
+
+    Every query runs on a single dedicated worker thread, so the event loop never
+    blocks on SQLite and writes are serialized in the order they were submitted.
+
+    Rows carry last_active/decay_applied_at in both decay modes. With lazy_decay, any
+    inactivity decay owed since the last settlement is applied whenever a row is read or written.
+    """
+
+    def __init__(self, db_path: str = "reputation.db", lazy_decay: bool = False):
+        self.db_path = db_path
+        self.lazy_decay = lazy_decay
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reputation-store")
+
+    # -----------------
+    # Worker plumbing
+    # -----------------
+    async def _run(self, fn, *args):
+        """Runs fn(*args) on the store thread and returns its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _connection(self) -> sqlite3.Connection:
+        # Only ever called from the store thread
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    # -----------------
+    # Lifecycle
+    # -----------------
+    async def open(self):
+        """Opens the connection and creates the tables if they don't exist."""
+        await self._run(self._init_database)
+
+    async def close(self):
+        """Closes the connection and stops the store thread."""
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _init_database(self):
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS reputation (
+                user_id INTEGER,
+                guild_id INTEGER,
+                reputation INTEGER DEFAULT 0,
+                UNIQUE(user_id, guild_id)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rep_passive (
+                user_id INTEGER,
+                guild_id INTEGER,
+                hour INTEGER,           -- Actual EST/EDT hour when rep was gained
+                date TEXT,              -- EST/EDT date when rep was gained
+                PRIMARY KEY (user_id, guild_id, hour, date)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rep_usage (
+                user_id INTEGER,
+                guild_id INTEGER,
+                last_used REAL,         -- UTC timestamp of the last /up or /down given
+                daily_count INTEGER,
+                usage_date TEXT,        -- EST/EDT date daily_count belongs to
+                PRIMARY KEY (user_id, guild_id)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rep_streaks (
+                user_id INTEGER,
+                guild_id INTEGER,
+                last_direction INTEGER, -- 1 for up, 0 for down
+                consecutive_count INTEGER,
+                last_used REAL,         -- UTC timestamp
+                PRIMARY KEY (user_id, guild_id)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_reputation_guild_score ON reputation (guild_id, reputation)')
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(reputation)')}
+        if 'last_active' not in columns:
+            conn.execute('ALTER TABLE reputation ADD COLUMN last_active REAL')       # UTC timestamp of the last message
+        if 'decay_applied_at' not in columns:
+            conn.execute('ALTER TABLE reputation ADD COLUMN decay_applied_at REAL')  # UTC timestamp decay was settled up to
+        conn.commit()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # -----------------
+    # Lazy decay
+    # -----------------
+    def _settle_decay(self, conn: sqlite3.Connection, user_id: int, guild_id: int, until: float):
+        """Applies any decay owed by one row up to `until`. Caller commits."""
+        if not self.lazy_decay:
+            return
+        row = conn.execute(
+            'SELECT reputation, last_active, decay_applied_at FROM reputation WHERE user_id = ? AND guild_id = ?',
+            (user_id, guild_id)
+        ).fetchone()
+        if row is None or row[1] is None:
+            return  # No activity record, same as the sweep
+        self._settle_rows(conn, [(user_id, guild_id) + tuple(row)], until)
+
+    def _settle_rows(self, conn: sqlite3.Connection, rows, until: float):
+        updates = []
+        for user_id, guild_id, rep, last_active, applied_at in rows:
+            runs, penalty = lazy_decay_owed(last_active, applied_at, until)
+            if runs:
+                # Sequential capped subtractions from a positive score collapse to one floor at zero
+                new_rep = max(0, rep - penalty) if rep > 0 else rep
+                updates.append((new_rep, until, user_id, guild_id))
+        conn.executemany(
+            'UPDATE reputation SET reputation = ?, decay_applied_at = ? WHERE user_id = ? AND guild_id = ?', updates
+        )
+
+    # -----------------
+    # Reputation scores
+    # -----------------
+    async def get_user_rep(self, user_id: int, guild_id: int) -> int:
+        return await self._run(self._get_user_rep, user_id, guild_id)
+
+    def _get_user_rep(self, user_id: int, guild_id: int) -> int:
+        if self.lazy_decay:
+            with self._connection() as conn:
+                self._settle_decay(conn, user_id, guild_id, time.time())
+        row = self._connection().execute(
+            'SELECT reputation FROM reputation WHERE user_id = ? AND guild_id = ?', (user_id, guild_id)
+        ).fetchone()
+        return row[0] if row else 0
+
+    async def set_user_rep(self, user_id: int, guild_id: int, rep: int):
+        await self._run(self._set_user_rep, user_id, guild_id, rep)
+
+    def _set_user_rep(self, user_id: int, guild_id: int, rep: int):
+        conn = self._connection()
+        # An upsert rather than INSERT OR REPLACE, which would reset last_active/decay_applied_at to NULL
+        conn.execute('''
+            INSERT INTO reputation (user_id, guild_id, reputation)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id, guild_id) DO UPDATE SET reputation = excluded.reputation
+        ''', (user_id, guild_id, rep))
+        conn.commit()
+
+    async def adjust_rep(self, user_id: int, guild_id: int, delta: int) -> int:
+        """Adds delta to a user's score in one statement and returns the new score."""
+        return await self._run(self._adjust_rep, user_id, guild_id, delta)
+
+    def _adjust_rep(self, user_id: int, guild_id: int, delta: int) -> int:
+        conn = self._connection()
+        with conn:
+            self._settle_decay(conn, user_id, guild_id, time.time())
+            row = conn.execute('''
+                INSERT INTO reputation (user_id, guild_id, reputation)
+                VALUES (?, ?, ?)
+                ON CONFLICT(user_id, guild_id) DO UPDATE SET reputation = reputation + excluded.reputation
+                RETURNING reputation
+            ''', (user_id, guild_id, delta)).fetchone()
+        return row[0]
+
+    async def apply_deltas(self, deltas: List[Tuple[int, int, int]],
+                           passive_hours: List[Tuple[int, int, int, str]] = (),
+                           activity: List[Tuple[int, int, float]] = ()):
+        """Applies a batch of (user_id, guild_id, delta), logs (user_id, guild_id, hour, date)
+        passive grants and records (user_id, guild_id, timestamp) activity in one transaction."""
+        await self._run(self._apply_deltas, deltas, passive_hours, activity)
+
+    def _apply_deltas(self, deltas: List[Tuple[int, int, int]], passive_hours: List[Tuple[int, int, int, str]],
+                      activity: List[Tuple[int, int, float]]):
+        conn = self._connection()
+        with conn:
+            if self.lazy_decay:
+                # Settle what was owed up to the moment each user came back, then restart their clock
+                for user_id, guild_id, active_at in activity:
+                    self._settle_decay(conn, user_id, guild_id, active_at)
+            conn.executemany('''
+                INSERT INTO reputation (user_id, guild_id, reputation, last_active, decay_applied_at)
+                VALUES (?, ?, 0, ?, ?)
+                ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                    last_active = excluded.last_active,
+                    decay_applied_at = MAX(COALESCE(decay_applied_at, 0), excluded.decay_applied_at)
+            ''', [(user_id, guild_id, active_at, active_at) for user_id, guild_id, active_at in activity])
+            if self.lazy_decay:
+                now = time.time()
+                active = {(user_id, guild_id) for user_id, guild_id, _ in activity}
+                for user_id, guild_id, _ in deltas:
+                    if (user_id, guild_id) not in active:
+                        self._settle_decay(conn, user_id, guild_id, now)
+            conn.executemany('''
+                INSERT INTO reputation (user_id, guild_id, reputation)
+                VALUES (?, ?, ?)
+                ON CONFLICT(user_id, guild_id) DO UPDATE SET reputation = reputation + excluded.reputation
+            ''', deltas)
+            conn.executemany('''
+                INSERT OR IGNORE INTO rep_passive (user_id, guild_id, hour, date)
+                VALUES (?, ?, ?, ?)
+            ''', passive_hours)
+
+    def _load_members(self, conn: sqlite3.Connection, members: List[Tuple[int, int]]):
+        """Fills the temp table current_members with (user_id, guild_id) pairs. Caller commits."""
+        conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS current_members (
+                user_id INTEGER,
+                guild_id INTEGER,
+                PRIMARY KEY (user_id, guild_id)
+            )
+        ''')
+        conn.execute('DELETE FROM current_members')
+        conn.executemany('INSERT OR IGNORE INTO current_members (user_id, guild_id) VALUES (?, ?)', members)
+
+    async def apply_decay(self, now: float, members: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        """Charges every current member (user_id, guild_id) idle for a day or more as of now their nightly
+        penalty, never taking a positive score below zero, in one statement.
+        Returns (user_id, guild_id, reputation) for the inactive rows."""
+        return await self._run(self._apply_decay, now, members)
+
+    def _apply_decay(self, now: float, members: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        conn = self._connection()
+        with conn:
+            self._load_members(conn, members)
+            # decay_penalty() in SQL: 5 * (2^days - 1) is 5, 15, 35 for 1..3 days and past the cap of 50 from 4 on.
+            # decay_applied_at moves with it, so switching to lazy decay doesn't charge these runs again.
+            return conn.execute('''
+                UPDATE reputation SET
+                    reputation = CASE WHEN reputation > 0 THEN MAX(0, reputation - MIN(50,
+                        5 * ((1 << MIN(CAST((:now - last_active) / 86400 AS INTEGER), 4)) - 1)
+                    )) ELSE reputation END,
+                    decay_applied_at = :now
+                WHERE last_active IS NOT NULL AND last_active <= :now - 86400
+                    AND (user_id, guild_id) IN (SELECT user_id, guild_id FROM current_members)
+                RETURNING user_id, guild_id, reputation
+            ''', {"now": now}).fetchall()
+
+    async def clear_departed_activity(self, members: List[Tuple[int, int]]) -> int:
+        """Forgets the last activity of every row that isn't a current member (user_id, guild_id),
+        e.g. members who left while the bot was offline. Returns how many rows were cleared."""
+        return await self._run(self._clear_departed_activity, members)
+
+    def _clear_departed_activity(self, members: List[Tuple[int, int]]) -> int:
+        conn = self._connection()
+        with conn:
+            self._load_members(conn, members)
+            return conn.execute('''
+                UPDATE reputation SET last_active = NULL
+                WHERE last_active IS NOT NULL
+                    AND (user_id, guild_id) NOT IN (SELECT user_id, guild_id FROM current_members)
+            ''').rowcount
+
+    async def clear_activity(self, user_id: int, guild_id: int):
+        """Forgets a user's last activity in a guild, so inactivity decay stops charging them."""
+        await self._run(self._clear_activity, user_id, guild_id)
+
+    def _clear_activity(self, user_id: int, guild_id: int):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'UPDATE reputation SET last_active = NULL WHERE user_id = ? AND guild_id = ?', (user_id, guild_id)
+            )
+
+    async def get_all_server_reps(self, guild_id: int, member_ids: Iterable[int] = ()) -> List[Tuple[int, int]]:
+        """Returns (user_id, reputation) for the guild, highest first. With lazy_decay, the rows of
+        member_ids (the guild's current members) are settled first; nobody else decays."""
+        return await self._run(self._get_all_server_reps, guild_id, set(member_ids))
+
+    def _get_all_server_reps(self, guild_id: int, member_ids: Set[int]) -> List[Tuple[int, int]]:
+        if self.lazy_decay:
+            with self._connection() as conn:
+                rows = conn.execute('''
+                    SELECT user_id, guild_id, reputation, last_active, decay_applied_at
+                    FROM reputation WHERE guild_id = ? AND last_active IS NOT NULL
+                ''', (guild_id,)).fetchall()
+                self._settle_rows(conn, [row for row in rows if row[0] in member_ids], time.time())
+        # Walks idx_reputation_guild_score, so rows come back already ordered
+        return self._connection().execute(
+            'SELECT user_id, reputation FROM reputation WHERE guild_id = ? ORDER BY reputation DESC', (guild_id,)
+        ).fetchall()
+
+    # -----------------
+    # Rep command limits and streaks
+    # -----------------
+    async def save_rep_limits(self, usage: List[Tuple[int, int, float, int, str]],
+                              streaks: List[Tuple[int, int, bool, int, float]]):
+        """Upserts (user_id, guild_id, last_used, daily_count, usage_date) usage rows and
+        (user_id, guild_id, last_direction, consecutive_count, last_used) streak rows in one transaction."""
+        await self._run(self._save_rep_limits, usage, streaks)
+
+    def _save_rep_limits(self, usage: List[Tuple[int, int, float, int, str]],
+                         streaks: List[Tuple[int, int, bool, int, float]]):
+        conn = self._connection()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO rep_usage VALUES (?, ?, ?, ?, ?)', usage)
+            conn.executemany('INSERT OR REPLACE INTO rep_streaks VALUES (?, ?, ?, ?, ?)', streaks)
+
+    async def load_rep_limits(self, current_date: str, streaks_since: float) -> Tuple[list, list]:
+        """Returns today's usage rows, deleting older ones, and the streak rows used since streaks_since."""
+        return await self._run(self._load_rep_limits, current_date, streaks_since)
+
+    def _load_rep_limits(self, current_date: str, streaks_since: float) -> Tuple[list, list]:
+        conn = self._connection()
+        with conn:
+            # Older usage rows can no longer block anyone; older streaks stay stored and are read back on demand
+            conn.execute('DELETE FROM rep_usage WHERE usage_date != ?', (current_date,))
+            usage = conn.execute('SELECT user_id, guild_id, last_used, daily_count, usage_date FROM rep_usage').fetchall()
+            streaks = conn.execute(
+                'SELECT user_id, guild_id, last_direction, consecutive_count, last_used FROM rep_streaks WHERE last_used >= ?',
+                (streaks_since,)
+            ).fetchall()
+        return usage, streaks
+
+    async def get_streak(self, user_id: int, guild_id: int) -> Optional[Tuple[bool, int, float]]:
+        """Returns the stored (last_direction, consecutive_count, last_used) streak of one user, if any."""
+        return await self._run(self._get_streak, user_id, guild_id)
+
+    def _get_streak(self, user_id: int, guild_id: int) -> Optional[Tuple[bool, int, float]]:
+        return self._connection().execute(
+            'SELECT last_direction, consecutive_count, last_used FROM rep_streaks WHERE user_id = ? AND guild_id = ?',
+            (user_id, guild_id)
+        ).fetchone()
+
+    # -----------------
+    # Passive hourly rep
+    # -----------------
+    async def get_passive_hours(self, date: str) -> List[Tuple[int, int, int]]:
+        """Returns (user_id, guild_id, hour) for every passive grant logged on date."""
+        return await self._run(self._get_passive_hours, date)
+
+    def _get_passive_hours(self, date: str) -> List[Tuple[int, int, int]]:
+        return self._connection().execute(
+            'SELECT user_id, guild_id, hour FROM rep_passive WHERE date = ?', (date,)
+        ).fetchall()
@@ -0,0 +1,471 @@
+"""A local stand-in for the subset of Discord's REST API the bot uses, for load tests.
+
+    python reststandin.py [--port 8787] [--members 1000] [--channels 4] [--messages 500]
+
+Point discord.py at it with use_standin(); loadtest.py does this and drives the real cogs.
+State lives in memory and is seeded with one guild of fake members, roles, channels and
+messages. Every response carries Discord's X-RateLimit-* headers; requests
+over a bucket's limit or the global limit get a 429 with retry_after, like the real API.
+GET /_stats returns request and 429 counts per route.
+"""
+import argparse
+import itertools
+import json
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+DISCORD_EPOCH = 1420070400000
+API_PREFIX = "/api/v10"
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+
+# (method, route) -> (requests, per seconds). Buckets are per major parameter (guild, channel
+# or webhook), like Discord's. Limits follow the headers Discord returns for these routes.
+ROUTE_LIMITS: Dict[Tuple[str, str], Tuple[int, float]] = {
+    ("PATCH", "/guilds/{guild_id}/members/{member_id}"): (10, 10.0),
+    ("PUT", "/guilds/{guild_id}/members/{member_id}/roles/{role_id}"): (10, 10.0),
+    ("DELETE", "/guilds/{guild_id}/members/{member_id}/roles/{role_id}"): (10, 10.0),
+    ("DELETE", "/guilds/{guild_id}/members/{member_id}"): (5, 5.0),
+    ("PUT", "/guilds/{guild_id}/bans/{user_id}"): (5, 5.0),
+    ("POST", "/channels/{channel_id}/messages"): (5, 5.0),
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}"): (5, 5.0),
+    ("POST", "/channels/{channel_id}/messages/bulk-delete"): (1, 1.0),
+    ("POST", "/webhooks/{webhook_id}/{webhook_token}"): (5, 2.0),
+    ("POST", "/users/@me/channels"): (5, 5.0),
+}
+DEFAULT_LIMIT = (50, 1.0)
+GLOBAL_LIMIT = (50, 1.0)
+MAJOR_PARAMETERS = ("guild_id", "channel_id", "webhook_id")
+
+
+def snowflake_at(moment: datetime, sequence: int) -> int:
+    return (int(moment.timestamp() * 1000) - DISCORD_EPOCH) << 22 | (sequence & 0x3FFFFF)
+
+
+def snowflake_time(snowflake: int) -> datetime:
+    return datetime.fromtimestamp(((snowflake >> 22) + DISCORD_EPOCH) / 1000, tz=timezone.utc)
+
+
+class Window:
+    """A fixed rate limit window, as Discord reports it: remaining requests until reset."""
+    __slots__ = ("limit", "per", "remaining", "reset_at")
+
+    def __init__(self, limit: int, per: float):
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now: float) -> bool:
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class StandIn:
+    """In-memory guilds, members, channels and messages, served with Discord-style rate limits."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.bot_user = {"id": str(self._new_id()), "username": "nab-standin", "discriminator": "0",
+                         "global_name": None, "avatar": None, "bot": True}
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.guilds: Dict[int, Dict[str, Any]] = {}
+        self.members: Dict[int, Dict[int, Dict[str, Any]]] = {}  # guild -> user -> member
+        self.channels: Dict[int, Dict[str, Any]] = {}
+        self.messages: Dict[int, Dict[int, Dict[str, Any]]] = {}  # channel -> message id -> message
+        self.webhooks: Dict[int, Dict[str, Any]] = {}
+        self.windows: Dict[Tuple, Window] = {}
+        self.global_window = Window(*GLOBAL_LIMIT)
+        self.requests: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+
+    def _new_id(self, moment: Optional[datetime] = None) -> int:
+        return snowflake_at(moment or datetime.now(timezone.utc), next(self.ids))
+
+    # -----------------
+    # Seeding
+    # -----------------
+    def seed(self, members: int = 1000, channels: int = 4, messages: int = 500,
+             role_names: Tuple[str, ...] = ("☆", "I", "II", "冰淇淋", "Low Quality")) -> int:
+        """Creates one guild; every fifth member has the first role. Returns the guild id."""
+        guild_id = self._new_id()
+        roles = [{"id": str(guild_id), "name": "@everyone", "position": 0, "permissions": "0"}]
+        for position, name in enumerate(role_names, start=1):
+            roles.append({"id": str(self._new_id()), "name": name, "position": position, "permissions": "0"})
+        self.guilds[guild_id] = {"id": str(guild_id), "name": "Stand-in Guild", "owner_id": self.bot_user["id"],
+                                 "roles": roles, "emojis": [], "stickers": [], "features": []}
+        self.members[guild_id] = {}
+        self._add_member(guild_id, int(self.bot_user["id"]), self.bot_user, [])
+        for n in range(members):
+            user_id = self._new_id()
+            user = {"id": str(user_id), "username": f"member{n}", "discriminator": "0", "global_name": None,
+                    "avatar": None, "bot": False}
+            self._add_member(guild_id, user_id, user, [roles[1]["id"]] if n % 5 == 0 else [])
+        now = datetime.now(timezone.utc)
+        for c in range(channels):
+            channel_id = self._new_id()
+            self.channels[channel_id] = {"id": str(channel_id), "type": 0, "guild_id": str(guild_id),
+                                         "name": f"channel-{c}", "position": c, "permission_overwrites": [],
+                                         "nsfw": False, "parent_id": None}
+            self.messages[channel_id] = {}
+            author_ids = list(self.members[guild_id])
+            for m in range(messages):
+                # A fifth of each channel's history is older than the bulk delete cutoff
+                age = timedelta(days=20, minutes=m) if m % 5 == 0 else timedelta(minutes=messages - m)
+                self._create_message(channel_id, self.users[author_ids[m % len(author_ids)]], f"message {m}",
+                                     now - age)
+        return guild_id
+
+    def spam(self, channel_id: int, count: int, content: str) -> List[int]:
+        """Posts count copies of content from rotating members, as a raid would. Returns the message ids."""
+        guild_id = int(self.channels[channel_id]["guild_id"])
+        author_ids = [user_id for user_id in self.members[guild_id] if not self.users[user_id].get("bot")]
+        return [int(self._create_message(channel_id, self.users[author_ids[n % len(author_ids)]], content)["id"])
+                for n in range(count)]
+
+    def _add_member(self, guild_id: int, user_id: int, user: Dict[str, Any], roles: List[str]):
+        self.users[user_id] = user
+        self.members[guild_id][user_id] = {"user": user, "roles": roles, "nick": None, "joined_at": _now_iso(),
+                                           "deaf": False, "mute": False, "flags": 0}
+
+    def _create_message(self, channel_id: int, author: Dict[str, Any], content: str,
+                        moment: Optional[datetime] = None) -> Dict[str, Any]:
+        message_id = self._new_id(moment)
+        channel = self.channels[channel_id]
+        message = {"id": str(message_id), "channel_id": str(channel_id), "guild_id": channel.get("guild_id"),
+                   "author": author, "content": content, "timestamp": snowflake_time(message_id).isoformat(),
+                   "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+                   "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0}
+        self.messages.setdefault(channel_id, {})[message_id] = message
+        return message
+
+    # -----------------
+    # Rate limits
+    # -----------------
+    @web.middleware
+    async def rate_limit(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        template = resource.canonical if resource is not None else request.path
+        if template.startswith(API_PREFIX):
+            template = template[len(API_PREFIX):]
+        route = (request.method, template)
+        self.requests[f"{request.method} {template}"] += 1
+        if template == "/_stats":
+            return await handler(request)
+
+        now = time.monotonic()
+        limit = ROUTE_LIMITS.get(route, DEFAULT_LIMIT)
+        major = next((request.match_info[p] for p in MAJOR_PARAMETERS if p in request.match_info), "")
+        key = route + (major,)
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = Window(*limit)
+        bucket_hash = f"{abs(hash(route)):x}"
+
+        if not self.global_window.take(now):
+            return self._too_many(request, route, self.global_window, now, bucket_hash, is_global=True)
+        if not window.take(now):
+            return self._too_many(request, route, window, now, bucket_hash, is_global=False)
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            response = e
+        reset_after = max(window.reset_at - now, 0.0)
+        response.headers.update({
+            "X-RateLimit-Limit": str(window.limit),
+            "X-RateLimit-Remaining": str(window.remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": bucket_hash,
+        })
+        return response
+
+    def _too_many(self, request: web.Request, route: Tuple[str, str], window: Window, now: float,
+                  bucket_hash: str, is_global: bool) -> web.Response:
+        self.rate_limited[f"{route[0]} {route[1]}"] += 1
+        retry_after = max(window.reset_at - now, 0.001)
+        headers = {"Retry-After": f"{retry_after:.3f}", "X-RateLimit-Scope": "global" if is_global else "user"}
+        if is_global:
+            headers["X-RateLimit-Global"] = "true"
+        else:
+            headers.update({
+                "X-RateLimit-Limit": str(window.limit), "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": f"{time.time() + retry_after:.3f}",
+                "X-RateLimit-Reset-After": f"{retry_after:.3f}", "X-RateLimit-Bucket": bucket_hash,
+            })
+        return _json({"message": "You are being rate limited.", "retry_after": retry_after,
+                                  "global": is_global, "code": 0}, status=429, headers=headers)
+
+    # -----------------
+    # Lookups
+    # -----------------
+    def _guild(self, request: web.Request) -> int:
+        guild_id = int(request.match_info["guild_id"])
+        if guild_id not in self.guilds:
+            raise _error(404, 10004, "Unknown Guild")
+        return guild_id
+
+    def _member(self, request: web.Request) -> Dict[str, Any]:
+        member = self.members[self._guild(request)].get(int(request.match_info["member_id"]))
+        if member is None:
+            raise _error(404, 10007, "Unknown Member")
+        return member
+
+    def _channel(self, request: web.Request) -> int:
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id not in self.channels:
+            raise _error(404, 10003, "Unknown Channel")
+        return channel_id
+
+    # -----------------
+    # Users and guilds
+    # -----------------
+    async def get_me(self, request):
+        return _json(self.bot_user)
+
+    async def get_application(self, request):
+        return _json({"id": self.bot_user["id"], "name": self.bot_user["username"], "icon": None, "description": "",
+                      "bot_public": False, "bot_require_code_grant": False, "owner": self.bot_user,
+                      "verify_key": "", "flags": 0, "team": None, "summary": ""})
+
+    async def get_user(self, request):
+        user = self.users.get(int(request.match_info["user_id"]))
+        if user is None:
+            raise _error(404, 10013, "Unknown User")
+        return _json(user)
+
+    async def create_dm(self, request):
+        body = await request.json()
+        channel_id = self._new_id()
+        self.channels[channel_id] = {"id": str(channel_id), "type": 1, "last_message_id": None,
+                                     "recipients": [self.users.get(int(body["recipient_id"]), self.bot_user)]}
+        return _json(self.channels[channel_id])
+
+    async def get_guild(self, request):
+        return _json(self.guilds[self._guild(request)])
+
+    async def get_roles(self, request):
+        return _json(self.guilds[self._guild(request)]["roles"])
+
+    async def get_guild_channels(self, request):
+        guild_id = str(self._guild(request))
+        return _json([c for c in self.channels.values() if c.get("guild_id") == guild_id])
+
+    async def get_invites(self, request):
+        self._guild(request)
+        return _json([])
+
+    async def list_members(self, request):
+        guild_id = self._guild(request)
+        limit = min(int(request.query.get("limit", 1)), 1000)
+        after = int(request.query.get("after", 0))
+        page = [m for user_id, m in sorted(self.members[guild_id].items()) if user_id > after][:limit]
+        return _json(page)
+
+    async def get_member(self, request):
+        return _json(self._member(request))
+
+    async def edit_member(self, request):
+        member = self._member(request)
+        body = await request.json()
+        if "nick" in body:
+            member["nick"] = body["nick"]
+        if "roles" in body:
+            member["roles"] = [str(role_id) for role_id in body["roles"]]
+        return _json(member)
+
+    async def add_role(self, request):
+        member = self._member(request)
+        role_id = request.match_info["role_id"]
+        if role_id not in member["roles"]:
+            member["roles"].append(role_id)
+        return web.Response(status=204)
+
+    async def remove_role(self, request):
+        member = self._member(request)
+        member["roles"] = [r for r in member["roles"] if r != request.match_info["role_id"]]
+        return web.Response(status=204)
+
+    async def kick(self, request):
+        self._member(request)
+        del self.members[self._guild(request)][int(request.match_info["member_id"])]
+        return web.Response(status=204)
+
+    async def ban(self, request):
+        self.members[self._guild(request)].pop(int(request.match_info["user_id"]), None)
+        return web.Response(status=204)
+
+    # -----------------
+    # Channels and messages
+    # -----------------
+    async def get_channel(self, request):
+        return _json(self.channels[self._channel(request)])
+
+    async def get_messages(self, request):
+        channel_id = self._channel(request)
+        limit = min(int(request.query.get("limit", 50)), 100)
+        before = int(request.query.get("before", 1 << 63))
+        after = int(request.query.get("after", 0))
+        ids = sorted(i for i in self.messages[channel_id] if after < i < before)
+        # The page nearest the cursor, newest first either way (discord.py pages on with data[0] after `after`)
+        page = ids[:limit] if "after" in request.query else ids[-limit:]
+        return _json([self.messages[channel_id][i] for i in reversed(page)])
+
+    async def get_message(self, request):
+        message = self.messages[self._channel(request)].get(int(request.match_info["message_id"]))
+        if message is None:
+            raise _error(404, 10008, "Unknown Message")
+        return _json(message)
+
+    async def send_message(self, request):
+        channel_id = self._channel(request)
+        body = await _json_body(request)
+        return _json(self._create_message(channel_id, self.bot_user, body.get("content") or ""))
+
+    async def delete_message(self, request):
+        channel_id = self._channel(request)
+        if self.messages[channel_id].pop(int(request.match_info["message_id"]), None) is None:
+            raise _error(404, 10008, "Unknown Message")
+        return web.Response(status=204)
+
+    async def bulk_delete(self, request):
+        channel_id = self._channel(request)
+        ids = [int(i) for i in (await request.json()).get("messages", [])]
+        if not 2 <= len(ids) <= 100:
+            raise _error(400, 50016, "You must provide at least 2 and fewer than 100 messages to delete.")
+        cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+        if any(snowflake_time(i) < cutoff for i in ids):
+            raise _error(400, 50034, "You can only bulk delete messages that are under 14 days old.")
+        for message_id in ids:
+            self.messages[channel_id].pop(message_id, None)
+        return web.Response(status=204)
+
+    # -----------------
+    # Webhooks
+    # -----------------
+    async def get_channel_webhooks(self, request):
+        channel_id = str(self._channel(request))
+        return _json([w for w in self.webhooks.values() if w["channel_id"] == channel_id])
+
+    async def create_webhook(self, request):
+        channel_id = self._channel(request)
+        body = await request.json()
+        webhook_id = self._new_id()
+        self.webhooks[webhook_id] = {"id": str(webhook_id), "type": 1, "channel_id": str(channel_id),
+                                     "guild_id": self.channels[channel_id].get("guild_id"), "name": body.get("name"),
+                                     "avatar": None, "token": f"token{webhook_id}", "user": self.bot_user}
+        return _json(self.webhooks[webhook_id])
+
+    async def execute_webhook(self, request):
+        webhook = self.webhooks.get(int(request.match_info["webhook_id"]))
+        if webhook is None or webhook["token"] != request.match_info["webhook_token"]:
+            raise _error(404, 10015, "Unknown Webhook")
+        body = await _json_body(request)
+        author = {"id": webhook["id"], "username": body.get("username") or webhook["name"], "discriminator": "0000",
+                  "avatar": None, "bot": True}
+        message = self._create_message(int(webhook["channel_id"]), author, body.get("content") or "")
+        message["webhook_id"] = webhook["id"]
+        if request.query.get("wait") == "true":
+            return _json(message)
+        return web.Response(status=204)
+
+    async def stats(self, request):
+        return _json({"requests": dict(self.requests), "rate_limited": dict(self.rate_limited)})
+
+    # -----------------
+    # App
+    # -----------------
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.rate_limit])
+        p = API_PREFIX
+        app.router.add_get(f"{p}/users/@me", self.get_me)
+        app.router.add_get(f"{p}/oauth2/applications/@me", self.get_application)
+        app.router.add_get(f"{p}/users/{{user_id}}", self.get_user)
+        app.router.add_post(f"{p}/users/@me/channels", self.create_dm)
+        app.router.add_get(f"{p}/guilds/{{guild_id}}", self.get_guild)
+        app.router.add_get(f"{p}/guilds/{{guild_id}}/roles", self.get_roles)
+        app.router.add_get(f"{p}/guilds/{{guild_id}}/channels", self.get_guild_channels)
+        app.router.add_get(f"{p}/guilds/{{guild_id}}/invites", self.get_invites)
+        app.router.add_get(f"{p}/guilds/{{guild_id}}/members", self.list_members)
+        app.router.add_get(f"{p}/guilds/{{guild_id}}/members/{{member_id}}", self.get_member)
+        app.router.add_patch(f"{p}/guilds/{{guild_id}}/members/{{member_id}}", self.edit_member)
+        app.router.add_delete(f"{p}/guilds/{{guild_id}}/members/{{member_id}}", self.kick)
+        app.router.add_put(f"{p}/guilds/{{guild_id}}/members/{{member_id}}/roles/{{role_id}}", self.add_role)
+        app.router.add_delete(f"{p}/guilds/{{guild_id}}/members/{{member_id}}/roles/{{role_id}}", self.remove_role)
+        app.router.add_put(f"{p}/guilds/{{guild_id}}/bans/{{user_id}}", self.ban)
+        app.router.add_get(f"{p}/channels/{{channel_id}}", self.get_channel)
+        app.router.add_get(f"{p}/channels/{{channel_id}}/messages", self.get_messages)
+        app.router.add_post(f"{p}/channels/{{channel_id}}/messages", self.send_message)
+        app.router.add_post(f"{p}/channels/{{channel_id}}/messages/bulk-delete", self.bulk_delete)
+        app.router.add_get(f"{p}/channels/{{channel_id}}/messages/{{message_id}}", self.get_message)
+        app.router.add_delete(f"{p}/channels/{{channel_id}}/messages/{{message_id}}", self.delete_message)
+        app.router.add_get(f"{p}/channels/{{channel_id}}/webhooks", self.get_channel_webhooks)
+        app.router.add_post(f"{p}/channels/{{channel_id}}/webhooks", self.create_webhook)
+        app.router.add_post(f"{p}/webhooks/{{webhook_id}}/{{webhook_token}}", self.execute_webhook)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8787) -> web.AppRunner:
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _json(data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # Exactly "application/json", no charset: discord.py only decodes bodies with that content type
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers,
+                        content_type="application/json")
+
+
+def _error(status: int, code: int, message: str) -> web.HTTPException:
+    cls = {400: web.HTTPBadRequest, 404: web.HTTPNotFound}[status]
+    return cls(body=json.dumps({"message": message, "code": code}).encode(), content_type="application/json")
+
+
+async def _json_body(request: web.Request) -> Dict[str, Any]:
+    # Messages may be sent as JSON or as multipart with a payload_json part
+    if request.content_type == "application/json":
+        return await request.json()
+    if request.content_type.startswith("multipart/"):
+        form = await request.post()
+        return json.loads(form.get("payload_json", "{}"))
+    return {}
+
+
+def use_standin(base: str):
+    """Points discord.py's REST and webhook clients at the stand-in, e.g. http://127.0.0.1:8787/api/v10."""
+    import discord.http
+    import discord.webhook.async_
+
+    discord.http.Route.BASE = base
+    discord.webhook.async_.Route.BASE = base
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for Discord's REST API.")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+    standin = StandIn()
+    guild_id = standin.seed(args.members, args.channels, args.messages)
+    print(f"[StandIn] Guild {guild_id} with {args.members} members on http://127.0.0.1:{args.port}{API_PREFIX}")
+    web.run_app(standin.app(), host="127.0.0.1", port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import discord
-import json
 from discord.ext import commands
+from storage import get_storage
+from actions import get_scheduler, INTERACTIVE
 
 class RoleTracker(commands.Cog):
     def __init__(self, bot):
@@ -25,18 +26,21 @@ class RoleTracker(commands.Cog):
                     except Exception as e:
                         print(f"Error giving role to {member}: {e}")
 
+    async def cog_load(self):
+        storage = await get_storage(self.bot)
+        await storage.import_json("roletracker", "user_roles.json")
+        self.kv = storage.namespace("roletracker")  # str(user_id) -> [role_id, ...]
+        self.roles_by_user = await self.kv.items()
+
+    async def cog_unload(self):
+        await self.kv.storage.flush()
+
     def load_user_roles(self, user_id):
-        try:
-            with open("user_roles.json", "r") as f:
-                self.roles_by_user = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.roles_by_user = {}
         return self.roles_by_user.get(str(user_id), [])
 
     async def save_user_roles(self, member):
         self.roles_by_user[str(member.id)] = [role.id for role in member.roles]
-        with open("user_roles.json", "w") as f:
-            json.dump(self.roles_by_user, f)
+        self.kv.set(str(member.id), self.roles_by_user[str(member.id)])
 
     async def add_roles_to_user(self, member):
         stored_role_ids = self.roles_by_user.get(str(member.id))
@@ -49,12 +53,13 @@ class RoleTracker(commands.Cog):
         for role in roles:
             if role not in member.roles:
                 try:
-                    await member.add_roles(role)
+                    await get_scheduler(self.bot).add_roles(member, role, priority=INTERACTIVE)
                 except discord.Forbidden:
                     print(f"Error adding role {role} to user {member}")
                 except discord.NotFound:
                     print(f"Role {role} not found, removing from stored roles")
                     self.roles_by_user[str(member.id)].remove(role.id)
+                    self.kv.set(str(member.id), self.roles_by_user[str(member.id)])
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
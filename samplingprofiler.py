@@ -0,0 +1,128 @@
+import asyncio
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from discord.ext import tasks
+
+SAMPLE_INTERVAL = 0.005  # 200 Hz; each sample is one frame walk on a side thread
+MAX_DURATION = 300
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "_run_once"}  # Innermost frames of a loop waiting for I/O
+
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack from a side thread.
+
+    Each sample is tagged with the cog entry point it is running under: the outermost
+    frame whose code is a cog listener, command, pipeline stage or task loop. Samples
+    where the loop is just waiting for I/O are tagged "idle". Results are in collapsed
+    stack format ("tag;outer;...;inner count"), ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, bot, interval: float = SAMPLE_INTERVAL):
+        self.bot = bot
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.tags: Counter = Counter()
+        self.sample_count = 0
+        self._entry_points = self._collect_entry_points()
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _collect_entry_points(self) -> Dict[object, str]:
+        """Maps the code object of every handler the loaded cogs registered to a tag."""
+        entry_points = {}
+
+        def add(func, tag: str):
+            func = inspect.unwrap(getattr(func, "__func__", func))
+            code = getattr(func, "__code__", None)
+            if code is not None:
+                entry_points[code] = tag
+
+        for cog_name, cog in self.bot.cogs.items():
+            for event, method in cog.get_listeners():
+                add(method, f"{cog_name}.{event}")
+            for command in cog.walk_commands():
+                add(command.callback, f"{cog_name}.~{command.qualified_name}")
+            for app_command in cog.walk_app_commands():
+                add(app_command._callback, f"{cog_name}./{app_command.qualified_name}")
+            for name, member in inspect.getmembers(type(cog)):
+                if isinstance(member, tasks.Loop):
+                    add(member.coro, f"{cog_name}.task:{name}")
+        pipeline = getattr(self.bot, "message_pipeline", None)
+        if pipeline is not None:
+            for stage in pipeline.stages:
+                owner = getattr(stage.owner, "qualified_name", None) or "MessagePipeline"
+                add(stage.callback, f"{owner}.on_message:{stage.name}")
+        return entry_points
+
+    # -----------------
+    # Sampling
+    # -----------------
+    def start(self):
+        """Starts sampling the thread that calls start() (the event loop thread)."""
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                return
+            self._sample(frame)
+            del frame
+
+    def _sample(self, frame):
+        stack: List[str] = []
+        tag = None
+        innermost = frame.f_code.co_name
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            if code in self._entry_points:
+                tag = self._entry_points[code]  # Keep walking; the outermost entry point wins
+            frame = frame.f_back
+        if tag is None:
+            tag = "idle" if innermost in IDLE_FUNCTIONS else "other"
+        stack.append(tag)
+        stack.reverse()
+        self.samples[";".join(stack)] += 1
+        self.tags[tag] += 1
+        self.sample_count += 1
+
+    # -----------------
+    # Results
+    # -----------------
+    def collapsed(self) -> str:
+        """Samples in collapsed stack format, one "frames count" line per distinct stack."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def top_tags(self, limit: int = 10) -> List[Tuple[str, int]]:
+        return self.tags.most_common(limit)
+
+
+async def profile(bot, seconds: float, interval: float = SAMPLE_INTERVAL) -> SamplingProfiler:
+    """Samples the running bot for `seconds` and returns the finished profiler."""
+    profiler = SamplingProfiler(bot, interval)
+    started = time.monotonic()
+    profiler.start()
+    try:
+        await asyncio.sleep(min(seconds, MAX_DURATION))
+    finally:
+        profiler.stop()
+    print(f"[SamplingProfiler] {profiler.sample_count} samples in {time.monotonic() - started:.1f}s")
+    return profiler
@@ -0,0 +1,325 @@
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class Storage:
+    """One SQLite database (WAL) shared by every cog.
+
+    All SQL runs on a single worker thread. Writes are queued without blocking the caller
+    and a writer task commits everything queued since its last pass in one transaction;
+    reads first wait for the writes queued before them so they always see them, but not
+    for writes queued while they wait. Cogs keep their data in their own namespace of the
+    key/value table, or in tables prefixed with the namespace.
+    """
+
+    def __init__(self, db_path: str = "nab.db"):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self._writes: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Writes are numbered as they are queued; the writer finishes them in that order
+        self._queued = 0
+        self._finished = 0
+        self._finished_changed: Optional[asyncio.Condition] = None
+        self._open_lock = asyncio.Lock()
+
+    # -----------------
+    # Worker plumbing
+    # -----------------
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _connection(self) -> sqlite3.Connection:
+        # Only ever called from the storage thread
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    # -----------------
+    # Lifecycle
+    # -----------------
+    async def open(self):
+        """Creates the key/value table and starts the writer. Safe to call more than once."""
+        async with self._open_lock:
+            if self._writer_task is not None:
+                return
+            await self._run(self._init_database)
+            self._writes = asyncio.Queue()
+            self._finished_changed = asyncio.Condition()
+            self._writer_task = asyncio.create_task(self._writer())
+
+    async def close(self):
+        """Writes anything still queued, then stops the writer and the storage thread."""
+        if self._writer_task is None:
+            return
+        await self.flush()
+        self._writer_task.cancel()
+        self._writer_task = None
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _init_database(self):
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT,
+                key TEXT,
+                value TEXT,             -- JSON
+                PRIMARY KEY (namespace, key)
+            )
+        ''')
+        conn.commit()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # -----------------
+    # Writer
+    # -----------------
+    def write(self, sql: str, params: Sequence = ()):
+        """Queues one statement; it is committed with the writer's next batch."""
+        self._writes.put_nowait((sql, params, False))
+        self._queued += 1
+
+    def write_many(self, sql: str, rows: Sequence[Sequence]):
+        self._writes.put_nowait((sql, rows, True))
+        self._queued += 1
+
+    async def flush(self):
+        """Waits until every write queued before the call has been committed.
+
+        Writes queued while waiting are not waited for, so a busy queue can't hold a reader forever."""
+        if self._finished_changed is None:
+            return
+        target = self._queued
+        async with self._finished_changed:
+            await self._finished_changed.wait_for(lambda: self._finished >= target)
+
+    async def _writer(self):
+        while True:
+            batch = [await self._writes.get()]
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            try:
+                await self._run(self._apply_writes, batch)
+            except Exception as e:
+                print(f"[Storage] Failed to write a batch of {len(batch)}: {e}")
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+                self._finished += len(batch)
+                async with self._finished_changed:
+                    self._finished_changed.notify_all()
+
+    def _apply_writes(self, batch: List[Tuple[str, Sequence, bool]]):
+        conn = self._connection()
+        try:
+            with conn:
+                for sql, params, many in batch:
+                    (conn.executemany if many else conn.execute)(sql, params)
+        except sqlite3.Error:
+            # Replay one statement at a time so a single bad write doesn't take the batch with it
+            for sql, params, many in batch:
+                try:
+                    with conn:
+                        (conn.executemany if many else conn.execute)(sql, params)
+                except sqlite3.Error as e:
+                    print(f"[Storage] Dropped write `{sql.split()[0]} ...`: {e}")
+
+    # -----------------
+    # Reads
+    # -----------------
+    async def fetchall(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        await self.flush()
+        return await self._run(self._fetchall, sql, params)
+
+    async def fetchone(self, sql: str, params: Sequence = ()) -> Optional[tuple]:
+        rows = await self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    def _fetchall(self, sql: str, params: Sequence) -> List[tuple]:
+        return self._connection().execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params: Sequence = ()):
+        with self._connection() as conn:
+            conn.execute(sql, params)
+
+    # -----------------
+    # Namespaces and tables
+    # -----------------
+    def namespace(self, name: str) -> "Namespace":
+        return Namespace(self, name)
+
+    async def table(self, namespace: str, name: str, columns: str, key: Sequence[str],
+                    indexes: Sequence[Sequence[str]] = ()) -> "Table":
+        """Creates (if needed) the table `<namespace>_<name>` and returns a handle to it.
+        `columns` is the column list SQL; `key` names the primary key columns and each
+        entry of `indexes` the columns of one secondary index."""
+        table = Table(self, f"{namespace}_{name}", key)
+        await self.flush()
+        await self._run(self._execute, f'''
+            CREATE TABLE IF NOT EXISTS {table.name} (
+                {columns},
+                PRIMARY KEY ({", ".join(key)})
+            )
+        ''')
+        for index in indexes:
+            await self._run(self._execute, f"CREATE INDEX IF NOT EXISTS idx_{table.name}_{'_'.join(index)} "
+                                           f"ON {table.name} ({', '.join(index)})")
+        return table
+
+    # -----------------
+    # One-shot import of legacy files
+    # -----------------
+    async def _needs_import(self, source: str) -> bool:
+        if not os.path.exists(source):
+            return False
+        return not await self.namespace("storage").get(f"imported:{source}")
+
+    def _mark_imported(self, source: str):
+        self.namespace("storage").set(f"imported:{source}", True)
+
+    async def import_json(self, namespace: str, path: str, key: Optional[str] = None):
+        """Copies a legacy JSON file into a namespace: the whole document under `key`,
+        or, without a key, one entry per top-level item. The file is left in place."""
+        if not await self._needs_import(path):
+            return
+        try:
+            document = await self._run(self._read_json, path)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[Storage] Could not import {path}: {e}")
+            return
+        kv = self.namespace(namespace)
+        if key is not None:
+            kv.set(key, document)
+        else:
+            for item_key, value in document.items():
+                kv.set(item_key, value)
+        self._mark_imported(path)
+        await self.flush()
+        print(f"[Storage] Imported {path} into '{namespace}'")
+
+    @staticmethod
+    def _read_json(path: str) -> Any:
+        with open(path, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+
+    async def import_sqlite(self, table: "Table", path: str, source_table: str):
+        """Copies every row of source_table in a legacy database into table (columns matched by name)."""
+        if not await self._needs_import(path):
+            return
+        await self.flush()
+        count = await self._run(self._import_sqlite, table.name, path, source_table)
+        self._mark_imported(path)
+        await self.flush()
+        if count is None:
+            print(f"[Storage] {path} has no table {source_table}, nothing to import into {table.name}")
+        else:
+            print(f"[Storage] Imported {count} rows from {path} into {table.name}")
+
+    def _import_sqlite(self, table_name: str, path: str, source_table: str) -> Optional[int]:
+        """Returns the number of rows copied, or None if the legacy database has no source_table."""
+        conn = self._connection()
+        conn.execute("ATTACH DATABASE ? AS legacy", (path,))
+        try:
+            with conn:
+                columns = [row[1] for row in conn.execute(f"PRAGMA legacy.table_info({source_table})")]
+                if not columns:
+                    return None
+                column_list = ", ".join(columns)
+                cursor = conn.execute(
+                    f"INSERT OR IGNORE INTO {table_name} ({column_list}) SELECT {column_list} FROM legacy.{source_table}"
+                )
+                return cursor.rowcount
+        finally:
+            conn.execute("DETACH DATABASE legacy")
+
+
+class Namespace:
+    """A cog's slice of the key/value table. Values are stored as JSON."""
+
+    def __init__(self, storage: Storage, name: str):
+        self.storage = storage
+        self.name = name
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        row = await self.storage.fetchone(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ?", (self.name, key)
+        )
+        return json.loads(row[0]) if row else default
+
+    async def items(self) -> Dict[str, Any]:
+        rows = await self.storage.fetchall("SELECT key, value FROM kv WHERE namespace = ?", (self.name,))
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, key: str, value: Any):
+        self.storage.write(
+            "INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)", (self.name, key, json.dumps(value))
+        )
+
+    def delete(self, key: str):
+        self.storage.write("DELETE FROM kv WHERE namespace = ? AND key = ?", (self.name, key))
+
+
+class Table:
+    """A namespaced table. Writes are queued; selects filter on column equality."""
+
+    def __init__(self, storage: Storage, name: str, key: Sequence[str]):
+        self.storage = storage
+        self.name = name
+        self.key = tuple(key)
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[str, list]:
+        if not filters:
+            return "", []
+        return " WHERE " + " AND ".join(f"{column} = ?" for column in filters), list(filters.values())
+
+    def upsert(self, row: Dict[str, Any]):
+        """Inserts row, or updates only the columns it names if its key already exists."""
+        columns = list(row)
+        updates = [column for column in columns if column not in self.key]
+        conflict = f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updates)}" if updates else "DO NOTHING"
+        self.storage.write(
+            f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(self.key)}) {conflict}",
+            list(row.values()),
+        )
+
+    def update(self, values: Dict[str, Any], **filters):
+        where, params = self._where(filters)
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        self.storage.write(f"UPDATE {self.name} SET {assignments}{where}", list(values.values()) + params)
+
+    def delete(self, **filters):
+        where, params = self._where(filters)
+        self.storage.write(f"DELETE FROM {self.name}{where}", params)
+
+    async def select(self, *columns: str, **filters) -> List[tuple]:
+        where, params = self._where(filters)
+        return await self.storage.fetchall(f"SELECT {', '.join(columns) or '*'} FROM {self.name}{where}", params)
+
+    async def get(self, *columns: str, **filters) -> Optional[tuple]:
+        rows = await self.select(*columns, **filters)
+        return rows[0] if rows else None
+
+
+async def get_storage(bot) -> Storage:
+    """Returns the bot's shared storage, opening it on first use."""
+    storage = getattr(bot, "storage", None)
+    if storage is None:
+        storage = Storage()
+        bot.storage = storage
+    await storage.open()
+    return storage
@@ -0,0 +1,149 @@
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+
+class ExpiringDict:
+    """A dict whose entries expire `ttl` seconds after they were last written.
+
+    Deadlines are filed into a time wheel of `resolution`-second slots; sweep() walks the
+    slots that have come due and drops every entry whose deadline has passed, so a sweep
+    only touches entries that are actually old. Reads ignore expired entries that have
+    not been swept yet.
+    """
+
+    def __init__(self, name: str, ttl: float, resolution: float = 60.0):
+        self.name = name
+        self.ttl = ttl
+        self.resolution = resolution
+        self._data: Dict[Hashable, Any] = {}
+        self._deadlines: Dict[Hashable, float] = {}
+        self._wheel: Dict[int, List[Hashable]] = {}
+        self._cursor = self._slot(time.monotonic())
+
+    def _slot(self, deadline: float) -> int:
+        return int(deadline // self.resolution)
+
+    def _live(self, key, now: float) -> bool:
+        deadline = self._deadlines.get(key)
+        return deadline is not None and deadline > now
+
+    def __setitem__(self, key, value):
+        deadline = time.monotonic() + self.ttl
+        old = self._deadlines.get(key)
+        # A key only needs a new wheel entry when its deadline moves to a later slot
+        if old is None or self._slot(old) != self._slot(deadline):
+            self._wheel.setdefault(self._slot(deadline), []).append(key)
+        self._data[key] = value
+        self._deadlines[key] = deadline
+
+    def __getitem__(self, key):
+        if not self._live(key, time.monotonic()):
+            raise KeyError(key)
+        return self._data[key]
+
+    def __delitem__(self, key):
+        if not self._live(key, time.monotonic()):
+            raise KeyError(key)
+        self.pop(key)
+
+    def __contains__(self, key) -> bool:
+        return self._live(key, time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        if not self._live(key, time.monotonic()):
+            return default
+        return self._data[key]
+
+    def pop(self, key, default=None):
+        """Removes key; its wheel entry is discarded when its slot is swept."""
+        live = self._live(key, time.monotonic())
+        value = self._data.pop(key, default)
+        self._deadlines.pop(key, None)
+        return value if live else default
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        now = time.monotonic()
+        return ((key, value) for key, value in list(self._data.items()) if self._deadlines[key] > now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drops every entry whose deadline has passed. Returns how many were removed."""
+        now = time.monotonic() if now is None else now
+        removed = 0
+        due = self._slot(now)
+        while self._cursor <= due:
+            for key in self._wheel.pop(self._cursor, ()):
+                deadline = self._deadlines.get(key)
+                if deadline is not None and deadline <= now:
+                    del self._data[key]
+                    del self._deadlines[key]
+                    removed += 1
+                elif deadline is not None and self._slot(deadline) == self._cursor:
+                    # Due later within the current slot; look at it again next sweep
+                    self._wheel.setdefault(self._cursor + 1, []).append(key)
+            self._cursor += 1
+        # Stay on the current slot so entries filed into it later are still visited
+        self._cursor = due
+        if removed > len(self._data):
+            # Dicts never shrink in place; copy them once most of the entries are gone
+            self._data = dict(self._data)
+            self._deadlines = dict(self._deadlines)
+        return removed
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the container and its values (keys are shared, so not counted)."""
+        total = sys.getsizeof(self._data) + sys.getsizeof(self._deadlines) + sys.getsizeof(self._wheel)
+        total += sum(sys.getsizeof(bucket) for bucket in self._wheel.values())
+        total += sum(sys.getsizeof(value) for value in self._data.values())
+        return total
+
+
+# --- Reputation tracker records ---
+class UsageRecord:
+    """Rep command usage for one (user_id, guild_id): cooldown and daily limit."""
+    __slots__ = ("last_used", "daily_count", "current_date")
+
+    def __init__(self, last_used: float, daily_count: int, current_date: str):
+        self.last_used = last_used  # UTC timestamp
+        self.daily_count = daily_count
+        self.current_date = current_date  # EST/EDT YYYY-MM-DD
+
+
+class StreakRecord:
+    """Consecutive up/down votes received by one (user_id, guild_id)."""
+    __slots__ = ("last_direction", "consecutive_count", "last_used")
+
+    def __init__(self, last_direction: bool, consecutive_count: int, last_used: datetime):
+        self.last_direction = last_direction
+        self.consecutive_count = consecutive_count
+        self.last_used = last_used
+
+
+class RepeatRecord:
+    """The last message a user sent, for repeated-message penalties."""
+    __slots__ = ("last_message", "timestamp", "count")
+
+    def __init__(self, last_message: str, timestamp: datetime, count: int = 1):
+        self.last_message = last_message
+        self.timestamp = timestamp
+        self.count = count
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.last_message)
+
+
+class ReactionQuota:
+    """Users a giver has already reacted rep to on one EST date."""
+    __slots__ = ("date", "given", "taken")
+
+    def __init__(self, date: str):
+        self.date = date
+        self.given: Set[int] = set()
+        self.taken: Set[int] = set()
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.given) + sys.getsizeof(self.taken)
@@ -1,74 +1,72 @@
 import discord
-import json
 from discord.ext import commands
 from discord.ext.commands import Context
+from messagepipeline import get_pipeline, MessageContext, TRACK
+from jsonstore import JsonStore
+from storage import get_storage
+from wordmatcher import WordMatcher
+from wordstats import WordStats
+from milestones import MilestoneTracker, WORD_MILESTONES
+
+# Seeds the tracked word list on first run; after that it lives in storage and changes with ~track
+DEFAULT_WORDS = ["freezer", "sex", "lq", "based", "cunny", "mod", "groom", "~lq", "fever", "janny", "nigger", "cirno", "uoh", "meow"]
 
 class WordCounter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.file_name = "word_counts.json"
         self.load_word_counts()
+        self.matcher = WordMatcher(DEFAULT_WORDS)
+        self.milestones = MilestoneTracker(WORD_MILESTONES)
 
-        # Get the ReputationCog instance
-        self.reputation_cog = bot.get_cog("ReputationCog")
-        if self.reputation_cog is None:
-            print("Error: ReputationCog not found.  Make sure it's loaded before WordCounter.")
+    @property
+    def reputation_cog(self):
+        # Looked up lazily since main.py adds ReputationCog after WordCounter
+        return self.bot.get_cog("ReputationCog")
 
     def load_word_counts(self):
-        try:
-            with open(self.file_name, "r") as file:
-                self.word_counts = json.load(file)
-        except FileNotFoundError:
-            self.word_counts = {}
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # IMPORTANT: You need to define your words_to_count list here!
-        # Example:
-        words_to_count = ["freezer", "", "sex", "lq", "based", "cunny", "mod", "groom", "~lq", "fever", "janny", "nigger", "cirno", "uoh", "meow"]
-        # Or, if you want to load it from a file or configuration, do so here.
-
-        if message.content.startswith("~count") or message.author.id == self.bot.user.id:
+        self.store = JsonStore(self.file_name, default={})
+        self.word_counts = self.store.data
+
+    async def cog_load(self):
+        storage = await get_storage(self.bot)
+        self.kv = storage.namespace("wordcounter")
+        self.set_words(await self.kv.get("words", DEFAULT_WORDS))
+        self.stats = WordStats(storage)
+        await self.stats.open()
+        get_pipeline(self.bot).add_stage("word_counter", self.count_words, TRACK, owner=self, bots=True)
+
+    def set_words(self, words):
+        # Built aside and swapped in, so the matcher is only rebuilt when the list changes
+        self.matcher = WordMatcher(word.lower() for word in words)
+
+    async def count_words(self, ctx: MessageContext):
+        message = ctx.message
+        if message.content.startswith("~count"):
             return
-        
-        for word in words_to_count:
-            if word in message.content.lower():
-                if word in self.word_counts:
-                    self.word_counts[word] += 1
-                    
-                    # Convert the current count to a string once for efficiency
-                    current_count_str = str(self.word_counts[word])
-                    rep_gain = 0  # Initialize rep_gain
-
-                    # Check for the most specific "nice" number first
-                    if current_count_str.endswith("42069"):
-                        await message.channel.send(f"@everyone @everyone @everyone GET IN HERE <@{message.author.id}> WAS THE {self.word_counts[word]}TH PERSON TO SAY {word}!")
-                        rep_gain = 100
-                    # Then check for less specific "nice" numbers, using elif to prevent duplicate messages
-                    elif current_count_str.endswith("420") or current_count_str.endswith("69"):
-                        await message.channel.send(f"Nice <@{message.author.id}>! You are the {self.word_counts[word]}th person to say {word}!")
-                        rep_gain = 5
-                    
-                    # Check for multiples of 1000
-                    elif self.word_counts[word] % 1000 == 0:
-                        await message.channel.send(f"Congratulations <@{message.author.id}>! You are the {self.word_counts[word]}th person to say {word}!")
-                        rep_gain = 10
-                    
-                    # NEW: This will now trigger for 100, 200, 300, 400, etc.
-                    elif self.word_counts[word] % 100 == 0:
-                        await message.channel.send(f"Congratulations <@{message.author.id}>! You are the {self.word_counts[word]}th person to say {word}!")
-                        rep_gain = 5
-
-                    # Apply reputation gain if applicable
-                    if rep_gain > 0 and self.reputation_cog:
-                        self.reputation_cog.adjust_rep(message.author.id, message.guild.id, rep_gain)
-                        print(f"User {message.author.id} gained {rep_gain} rep for being the {self.word_counts[word]}th person to say {word}.")
-                    
-                else:
-                    self.word_counts[word] = 1
-        self.save_word_counts()
-
-    @commands.command()
+
+        # One pass over the message finds every tracked word in it
+        found = self.matcher.find_all(ctx.lower)
+        if found:
+            self.stats.record(ctx.guild_id, ctx.author_id, found)
+        for word in found:
+            if word not in self.word_counts:
+                self.word_counts[word] = 1
+                continue
+            count = self.word_counts[word] = self.word_counts[word] + 1
+
+            # One comparison against the word's next milestone until it is reached
+            milestone = self.milestones.advance(word, count)
+            if milestone is None:
+                continue
+            await message.channel.send(milestone.message.format(mention=f"<@{message.author.id}>", count=count, word=word))
+            if milestone.rep > 0 and self.reputation_cog:
+                self.reputation_cog.queue_rep(message.author.id, message.guild.id, milestone.rep)
+                print(f"User {message.author.id} gained {milestone.rep} rep for being the {count}th person to say {word}.")
+        if found:
+            self.save_word_counts()
+
+    @commands.group(invoke_without_command=True)
     async def count(self, ctx):
         """Shows the count of tracked words."""
         message = ""
@@ -78,12 +76,75 @@ class WordCounter(commands.Cog):
             message = "No words have been counted yet."
         await ctx.send(message)
 
+    @count.command(name="top")
+    @commands.guild_only()
+    async def count_top(self, ctx, word: str, limit: int = 10):
+        """Shows who in this server has said a tracked word the most."""
+        word = word.lower()
+        rows = await self.stats.top_users(ctx.guild.id, word, max(1, min(limit, 25)))
+        if not rows:
+            await ctx.send(f"Nobody here has said `{word}` yet.")
+            return
+        lines = []
+        for rank, (user_id, hits) in enumerate(rows, start=1):
+            member = ctx.guild.get_member(user_id)
+            name = member.display_name if member else f"User {user_id}"
+            lines.append(f"**{rank}.** {name}: {hits}")
+        embed = discord.Embed(title=f"Top sayers of {word}", description="\n".join(lines), color=discord.Color.blue())
+        await ctx.send(embed=embed)
+
+    @count.command(name="trend")
+    @commands.guild_only()
+    async def count_trend(self, ctx, word: str, days: int = 14):
+        """Shows how often a tracked word was said here on each of the last days."""
+        word = word.lower()
+        rows = await self.stats.trend(ctx.guild.id, word, max(1, min(days, 60)))
+        peak = max(hits for _, hits in rows)
+        if not peak:
+            await ctx.send(f"Nobody here has said `{word}` in the last {len(rows)} days.")
+            return
+        lines = [f"{day}  {hits:>5}  {'#' * round(hits / peak * 20)}".rstrip() for day, hits in rows]
+        await ctx.send(f"**{word}**, last {len(rows)} days\n```\n" + "\n".join(lines) + "\n```")
+
+    @commands.group(name="track", invoke_without_command=True)
+    async def track_group(self, ctx):
+        """Lists the tracked words."""
+        words = ", ".join(sorted(self.matcher.patterns))
+        await ctx.send(f"Tracked words: {words}")
+
+    @track_group.command(name="add")
+    @commands.has_any_role("I", "II", "III")
+    async def track_add(self, ctx, *, word: str):
+        word = word.lower()
+        if word in self.matcher.patterns:
+            await ctx.send(f"`{word}` is already tracked")
+            return
+        self.set_words(self.matcher.patterns | {word})
+        self.save_words()
+        await ctx.send(f"Now tracking `{word}`")
+
+    @track_group.command(name="remove")
+    @commands.has_any_role("I", "II", "III")
+    async def track_remove(self, ctx, *, word: str):
+        word = word.lower()
+        if word not in self.matcher.patterns:
+            await ctx.send(f"`{word}` is not tracked")
+            return
+        self.set_words(self.matcher.patterns - {word})
+        self.save_words()
+        await ctx.send(f"Stopped tracking `{word}`")
+
+    def save_words(self):
+        self.kv.set("words", sorted(self.matcher.patterns))
+
     def save_word_counts(self):
-        with open(self.file_name, "w") as file:
-            json.dump(self.word_counts, file)
+        # Debounced: bursts of messages share one write
+        self.store.mark_dirty()
 
-    def cog_unload(self):
-        self.save_word_counts()
+    async def cog_unload(self):
+        get_pipeline(self.bot).remove_stages(self)
+        await self.stats.close()
+        await self.store.close()
 
 async def setup(bot):
     await bot.add_cog(WordCounter(bot))
@@ -0,0 +1,201 @@
+"""Aho-Corasick multi-pattern matching for the word trackers, and text normalization for moderation.
+
+    python wordmatcher.py [--sizes 15,500,5000] [--messages 20000]
+
+Running this module benchmarks WordMatcher against the per-word `in` loop it replaced.
+"""
+import argparse
+import random
+import string
+import time
+import unicodedata
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Below this many patterns, one C-level `in` scan per pattern beats walking the automaton
+# in Python (crossover measured with the benchmark below, on chat-length messages)
+SCAN_LIMIT = 100
+
+# -----------------
+# Normalization
+# -----------------
+ZERO_WIDTH = "\u00ad\u180e\u200b\u200c\u200d\u2060\u2061\u2062\u2063\u2064\ufeff"
+# Lowercase Cyrillic and Greek letters that render like Latin ones (after casefold)
+CONFUSABLES = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p", "с": "c",
+    "т": "t", "у": "y", "х": "x", "і": "i", "ї": "i", "ј": "j", "ѕ": "s", "ԁ": "d", "ɡ": "g", "ӏ": "l",
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t",
+    "υ": "u", "χ": "x", "ω": "w",
+}
+LEETSPEAK = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "@": "a", "$": "s", "!": "i"}
+_COMBINING_RANGES = [(0x0300, 0x036F), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x20D0, 0x20FF), (0xFE20, 0xFE2F)]
+_NORMALIZE_TABLE = str.maketrans({
+    **{ch: None for ch in ZERO_WIDTH},
+    **{chr(code): None for start, end in _COMBINING_RANGES for code in range(start, end + 1)},
+    **CONFUSABLES,
+    **LEETSPEAK,
+})
+
+
+def normalize(text: str) -> str:
+    """Folds text to the plain lowercase Latin form moderation lists are matched in.
+
+    Compatibility forms (fullwidth, ligatures, styled math letters) are decomposed and
+    accents, zalgo marks and zero-width characters dropped; confusable Cyrillic/Greek
+    letters and leetspeak digits become the Latin letters they stand for. Patterns and
+    messages go through the same function, so they always meet in the same form.
+    """
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+    return text.casefold().translate(_NORMALIZE_TABLE)
+
+
+class WordMatcher:
+    """Finds every pattern that occurs as a substring of a text in one pass.
+
+    The automaton is built once from the patterns and is never changed afterwards;
+    owners build a new matcher when their list changes and swap the reference, so a
+    message being matched never sees a half-built automaton. Empty patterns are dropped,
+    since they would match every text. Matching is case-sensitive, so callers pass text
+    normalized the same way as the patterns (e.g. both lowercased). Short lists
+    (under SCAN_LIMIT) are matched with substring scans instead of the automaton.
+    """
+
+    __slots__ = ("patterns", "_scan", "_goto", "_fail", "_out", "_alphabet")
+
+    def __init__(self, patterns: Iterable[str], scan_limit: int = SCAN_LIMIT):
+        self.patterns: FrozenSet[str] = frozenset(p for p in patterns if p)
+        self._scan: Optional[Tuple[str, ...]] = None
+        if len(self.patterns) < scan_limit:
+            self._scan = tuple(sorted(self.patterns))
+            return
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(frozenset())
+                state = nxt
+            self._out[state] = self._out[state] | {pattern}
+        self._alphabet: FrozenSet[str] = frozenset(ch for pattern in self.patterns for ch in pattern)
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Patterns ending at the fail target also end here ("~lq" contains "lq")
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find_all(self, text: str) -> Set[str]:
+        """Returns the set of patterns that occur in text."""
+        if self._scan is not None:
+            return {pattern for pattern in self._scan if pattern in text}
+        found: Set[str] = set()
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        state = 0
+        for ch in text:
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def search(self, text: str) -> Optional[str]:
+        """Returns the first pattern found in text, or None; stops at the first hit."""
+        if self._scan is not None:
+            return next((pattern for pattern in self._scan if pattern in text), None)
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        state = 0
+        for ch in text:
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return next(iter(out[state]))
+        return None
+
+
+# -----------------
+# Benchmark
+# -----------------
+def _random_words(count: int, rng: random.Random) -> List[str]:
+    words: Set[str] = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))))
+    return list(words)
+
+
+def _messages(words: List[str], count: int, rng: random.Random) -> List[str]:
+    filler = _random_words(200, rng)
+    messages = []
+    for _ in range(count):
+        tokens = rng.choices(filler, k=rng.randint(3, 15))
+        if rng.random() < 0.2:
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(words))
+        messages.append(" ".join(tokens))
+    return messages
+
+
+def benchmark(sizes: List[int], messages: int):
+    rng = random.Random(1)
+    print(f"{'terms':>7}{'build ms':>10}{'loop us/msg':>13}{'automaton us/msg':>18}{'matcher us/msg':>16}{'speedup':>9}")
+    for size in sizes:
+        words = _random_words(size, rng)
+        texts = _messages(words, messages, rng)
+
+        started = time.perf_counter()
+        forced = WordMatcher(words, scan_limit=0)  # The automaton even for short lists
+        build = time.perf_counter() - started
+        matcher = WordMatcher(words)
+
+        started = time.perf_counter()
+        loop_hits = [{word for word in words if word in text} for text in texts]
+        loop = time.perf_counter() - started
+
+        started = time.perf_counter()
+        automaton_hits = [forced.find_all(text) for text in texts]
+        automaton = time.perf_counter() - started
+
+        started = time.perf_counter()
+        matcher_hits = [matcher.find_all(text) for text in texts]
+        chosen = time.perf_counter() - started
+
+        assert loop_hits == automaton_hits == matcher_hits, "matcher disagrees with the substring loop"
+        print(f"{size:>7}{build * 1e3:>10.1f}{loop / messages * 1e6:>13.2f}{automaton / messages * 1e6:>18.2f}"
+              f"{chosen / messages * 1e6:>16.2f}{loop / chosen:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WordMatcher against a per-word substring loop.")
+    parser.add_argument("--sizes", default="15,500,5000", help="comma-separated pattern counts")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    benchmark([int(size) for size in args.sizes.split(",")], args.messages)
+
+
+if __name__ == "__main__":
+    main()
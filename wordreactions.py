@@ -1,13 +1,21 @@
 import discord
-import json
 from discord.ext import commands
+from messagepipeline import get_pipeline, MessageContext, RESPOND
+from storage import get_storage
 
 class WordReactions(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config_file = "word_reactions.json"
-        self.load_reactions()
-        
+        self.word_reactions = {}
+
+    async def load_reactions(self):
+        """Load word reactions from storage (imported once from the JSON file)"""
+        storage = await get_storage(self.bot)
+        await storage.import_json("wordreactions", self.config_file, key="reactions")
+        self.kv = storage.namespace("wordreactions")
+        self.word_reactions = await self.kv.get("reactions", {})
+
         # Default word reactions - you can customize these
         if not self.word_reactions:
             self.word_reactions = {
@@ -19,36 +27,25 @@ class WordReactions(commands.Cog):
             }
             self.save_reactions()
     
-    def load_reactions(self):
-        """Load word reactions from JSON file"""
-        try:
-            with open(self.config_file, "r") as file:
-                self.word_reactions = json.load(file)
-        except FileNotFoundError:
-            self.word_reactions = {}
-    
     def save_reactions(self):
-        """Save word reactions to JSON file"""
-        try:
-            with open(self.config_file, "w") as file:
-                json.dump(self.word_reactions, file, indent=2)
-        except Exception as e:
-            print(f"Error saving reactions: {e}")
+        """Save word reactions to storage"""
+        self.kv.set("reactions", self.word_reactions)
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def cog_load(self):
+        await self.load_reactions()
+        get_pipeline(self.bot).add_stage("word_reactions", self.react_to_message, RESPOND, owner=self, guild_only=False)
+
+    async def react_to_message(self, ctx: MessageContext):
         """React to messages containing trigger words"""
-        # Ignore bot messages and commands
-        if message.author.bot or message.content.startswith('~'):
+        # Ignore commands
+        if ctx.message.content.startswith('~'):
             return
         
-        message_lower = message.content.lower()
-        
         # Check each word in the message
         for trigger_word, emoji in self.word_reactions.items():
-            if trigger_word.lower() in message_lower:
+            if trigger_word.lower() in ctx.lower:
                 try:
-                    await message.add_reaction(emoji)
+                    await ctx.message.add_reaction(emoji)
                     # Only react once per message to avoid spam
                     break
                 except discord.HTTPException:
@@ -58,9 +55,11 @@ class WordReactions(commands.Cog):
                     print(f"Error adding reaction: {e}")
                     continue
     
-    def cog_unload(self):
+    async def cog_unload(self):
         """Save reactions when cog is unloaded"""
+        get_pipeline(self.bot).remove_stages(self)
         self.save_reactions()
+        await self.kv.storage.flush()
 
 def setup(bot):
     bot.add_cog(WordReactions(bot))
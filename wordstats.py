@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from reputationstore import EST
+from storage import Storage
+
+FLUSH_INTERVAL = 1.0
+FLUSH_MAX_ENTRIES = 500
+
+_ADD_HITS = "INSERT INTO {table} ({columns}, hits) VALUES ({placeholders}, ?) " \
+            "ON CONFLICT ({columns}) DO UPDATE SET hits = hits + excluded.hits"
+
+
+class WordStats:
+    """Tracked word hits per guild, word, user and EST day, kept in the shared storage.
+
+    record() only bumps an in-memory counter, so message handling never waits on SQLite.
+    The buffer is written every FLUSH_INTERVAL seconds (sooner past FLUSH_MAX_ENTRIES keys)
+    as one batch of upserts. Every flush also adds to two rollups, per-user totals and
+    per-day totals, which serve the top-N and trend queries without touching the raw hits.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.pending: Dict[Tuple[int, str, int, str], int] = {}
+        self._flush_wakeup = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def open(self):
+        self.hits = await self.storage.table("wordcounter", "hits", """
+            guild_id INTEGER,
+            word TEXT,
+            user_id INTEGER,
+            day TEXT,               -- EST/EDT date
+            hits INTEGER
+        """, key=("guild_id", "word", "user_id", "day"))
+        self.user_totals = await self.storage.table("wordcounter", "user_totals", """
+            guild_id INTEGER,
+            word TEXT,
+            user_id INTEGER,
+            hits INTEGER
+        """, key=("guild_id", "word", "user_id"), indexes=[("guild_id", "word", "hits")])
+        self.daily = await self.storage.table("wordcounter", "daily", """
+            guild_id INTEGER,
+            word TEXT,
+            day TEXT,               -- EST/EDT date
+            hits INTEGER
+        """, key=("guild_id", "word", "day"))
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flush()
+        await self.storage.flush()
+
+    # -----------------
+    # Recording
+    # -----------------
+    def record(self, guild_id: int, user_id: int, words: Iterable[str]):
+        """Buffers one hit of each word by user_id; written with the next flush."""
+        day = datetime.now(EST).date().isoformat()
+        for word in words:
+            key = (guild_id, word, user_id, day)
+            self.pending[key] = self.pending.get(key, 0) + 1
+        if len(self.pending) >= FLUSH_MAX_ENTRIES:
+            self._flush_wakeup.set()
+
+    def flush(self):
+        """Queues the buffered hits and their rollups; the storage writer commits them together."""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        user_totals: Dict[Tuple[int, str, int], int] = {}
+        daily: Dict[Tuple[int, str, str], int] = {}
+        for (guild_id, word, user_id, day), hits in batch.items():
+            user_key, day_key = (guild_id, word, user_id), (guild_id, word, day)
+            user_totals[user_key] = user_totals.get(user_key, 0) + hits
+            daily[day_key] = daily.get(day_key, 0) + hits
+        self._add_hits(self.hits.name, ("guild_id", "word", "user_id", "day"), batch)
+        self._add_hits(self.user_totals.name, ("guild_id", "word", "user_id"), user_totals)
+        self._add_hits(self.daily.name, ("guild_id", "word", "day"), daily)
+
+    def _add_hits(self, table: str, columns: Tuple[str, ...], counts: Dict[tuple, int]):
+        sql = _ADD_HITS.format(table=table, columns=", ".join(columns), placeholders=", ".join("?" * len(columns)))
+        self.storage.write_many(sql, [(*key, hits) for key, hits in counts.items()])
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            self.flush()
+
+    # -----------------
+    # Queries
+    # -----------------
+    async def top_users(self, guild_id: int, word: str, limit: int = 10) -> List[Tuple[int, int]]:
+        """Returns (user_id, hits) for the users who said word most in a guild."""
+        self.flush()
+        return await self.storage.fetchall(
+            f"SELECT user_id, hits FROM {self.user_totals.name} WHERE guild_id = ? AND word = ? "
+            f"ORDER BY hits DESC LIMIT ?", (guild_id, word, limit)
+        )
+
+    async def trend(self, guild_id: int, word: str, days: int = 14) -> List[Tuple[str, int]]:
+        """Returns (EST date, hits) for each of the last `days` days, oldest first, zeros included."""
+        self.flush()
+        today = datetime.now(EST).date()
+        first = today - timedelta(days=days - 1)
+        rows = await self.storage.fetchall(
+            f"SELECT day, hits FROM {self.daily.name} WHERE guild_id = ? AND word = ? AND day >= ?",
+            (guild_id, word, first.isoformat())
+        )
+        hits_by_day = dict(rows)
+        return [(day.isoformat(), hits_by_day.get(day.isoformat(), 0))
+                for day in (first + timedelta(days=offset) for offset in range(days))]